@@ -0,0 +1,156 @@
+"""
+Benchmark AdaptiveConcurrencyMiddleware against a fixed per-domain concurrency.
+
+A local stand-in server slows down as more requests are in flight and answers
+429 once too many are, like a site with a rate limiter. Each mode crawls the
+same pages in a fresh process and the results are printed as JSON.
+
+Usage: python benchmarks/bench_adaptive_concurrency.py [--pages 400]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Stand-in server behaviour
+BASE_LATENCY = 0.02  # Seconds per request when idle
+LATENCY_PER_EXTRA = 0.01  # Extra seconds per request in flight beyond COMFORTABLE
+COMFORTABLE = 6
+RATE_LIMIT = 10  # More requests in flight than this get a 429
+
+
+def make_server():
+    lock = threading.Lock()
+    state = {"in_flight": 0, "throttled": 0, "served": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+            pass
+
+        def do_GET(self):
+            with lock:
+                state["in_flight"] += 1
+                in_flight = state["in_flight"]
+            try:
+                if in_flight > RATE_LIMIT:
+                    with lock:
+                        state["throttled"] += 1
+                    self.send_response(429)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                time.sleep(
+                    BASE_LATENCY + LATENCY_PER_EXTRA * max(0, in_flight - COMFORTABLE)
+                )
+                body = b"<html><body><p>ok</p></body></html>"
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with lock:
+                    state["served"] += 1
+            finally:
+                with lock:
+                    state["in_flight"] -= 1
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    return server, state
+
+
+def crawl(mode, url, pages):
+    """
+    Run one crawl in this process and print its results as JSON
+    """
+    # pylint: disable=import-outside-toplevel
+    import scrapy
+    from scrapy.crawler import CrawlerProcess
+
+    results = {"ok": 0, "failed": 0}
+
+    class BenchSpider(scrapy.Spider):
+        name = "bench"
+
+        async def start(self):
+            for page in range(pages):
+                yield scrapy.Request(f"{url}/page/{page}", errback=self.failed)
+
+        def parse(self, response):
+            results["ok"] += 1
+
+        def failed(self, failure):
+            results["failed"] += 1
+
+    settings = {
+        "LOG_LEVEL": "WARNING",
+        "ROBOTSTXT_OBEY": False,
+        "HTTPCACHE_ENABLED": False,
+        "TELNETCONSOLE_ENABLED": False,
+        "CONCURRENT_REQUESTS": 32,
+        "CONCURRENT_REQUESTS_PER_DOMAIN": 16,
+        "TWISTED_REACTOR": "twisted.internet.asyncioreactor.AsyncioSelectorReactor",
+    }
+    if mode == "adaptive":
+        settings.update(
+            {
+                "ADAPTIVE_CONCURRENCY_ENABLED": True,
+                "CONCURRENT_REQUESTS_PER_DOMAIN": 32,
+                "DOWNLOADER_MIDDLEWARES": {
+                    "ollama_scraper.middlewares.AdaptiveConcurrencyMiddleware": 560,
+                },
+            }
+        )
+
+    process = CrawlerProcess(settings)
+    process.crawl(BenchSpider)
+    start = time.monotonic()
+    process.start()
+    results["seconds"] = round(time.monotonic() - start, 3)
+    results["pages_per_second"] = round(results["ok"] / results["seconds"], 1)
+    print(json.dumps(results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--mode", choices=["fixed", "adaptive"], help=argparse.SUPPRESS)
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        crawl(args.mode, args.url, args.pages)
+        return
+
+    server, state = make_server()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    report = {}
+    for mode in ("fixed", "adaptive"):
+        state.update(throttled=0, served=0)
+        output = subprocess.run(
+            [sys.executable, __file__, "--mode", mode, "--url", url]
+            + ["--pages", str(args.pages)],
+            cwd=ROOT,
+            env=dict(os.environ, PYTHONPATH=str(ROOT)),
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        report[mode] = dict(json.loads(output.strip().splitlines()[-1]))
+        report[mode]["throttled"] = state["throttled"]
+
+    server.shutdown()
+    print(json.dumps(report, indent=4))
+
+
+if __name__ == "__main__":
+    main()
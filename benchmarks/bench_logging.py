@@ -0,0 +1,82 @@
+"""
+Benchmark the per-call cost of logging through setup_logger's handlers.
+
+A tight loop of logger.info() calls runs against the synchronous file and
+console handlers, against the same handlers attached twice (what calling the
+old setup_logger twice did), and against the queued mode, where a background
+thread does the writing. For the queued modes the time the writer needs to
+catch up is reported separately. Console output goes to /dev/null.
+
+Usage: python benchmarks/bench_logging.py [--calls 100000]
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import logger_config  # noqa: E402
+
+MODES = {
+    "sync": {"queued": False},
+    "sync_set_up_twice": {"queued": False},
+    "queued": {"queued": True},
+    "queued_json": {"queued": True, "log_format": "json"},
+}
+
+
+def bench(mode, calls, logs_path):
+    os.environ["LOGS_PATH"] = logs_path
+    name = f"bench_logging.{mode}"
+    logger = logger_config.setup_logger(name, **MODES[mode])
+    if mode == "sync_set_up_twice":
+        file_handler, console_handler = logger.handlers
+        for duplicate in (
+            logging.FileHandler(file_handler.baseFilename),
+            logging.StreamHandler(),
+        ):
+            duplicate.setFormatter(console_handler.formatter)
+            logger.addHandler(duplicate)
+
+    start = time.perf_counter()
+    for index in range(calls):
+        logger.info("Pulled model %s (%d of %d)", "llama3.1:8b", index, calls)
+    elapsed = time.perf_counter() - start
+
+    drain_start = time.perf_counter()
+    logger_config.flush_logger(name)
+    drained = time.perf_counter() - drain_start
+
+    return {
+        "calls": calls,
+        "seconds": round(elapsed, 4),
+        "us_per_call": round(elapsed / calls * 1e6, 2),
+        "writer_catch_up_seconds": round(drained, 4),
+        "log_bytes": Path(logs_path, f"{name}.log").stat().st_size,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=100000)
+    args = parser.parse_args()
+
+    sys.stderr = open(os.devnull, "w", encoding="utf-8")
+    with tempfile.TemporaryDirectory() as logs_path:
+        results = {mode: bench(mode, args.calls, logs_path) for mode in MODES}
+        sys.stderr = sys.__stderr__
+        sync = results["sync"]["us_per_call"]
+        for result in results.values():
+            result["speedup_vs_sync"] = round(sync / result["us_per_call"], 2)
+        print(json.dumps(results, indent=4))
+
+
+if __name__ == "__main__":
+    main()
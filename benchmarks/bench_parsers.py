@@ -0,0 +1,108 @@
+"""
+Benchmark the spider's HTML parsing backends on saved pages.
+
+The listing page is data/ollama-library.html (from `make curl-ollama-library`)
+if it exists, otherwise the test fixture repeated until it has about as many
+entries as the real library. Each backend parses the pages repeatedly and the
+entries parsed per second are printed as JSON.
+
+Usage: python benchmarks/bench_parsers.py [--listing PATH] [--seconds 2]
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+from scrapy.http import HtmlResponse
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from ollama_scraper.parsers import PARSERS  # noqa: E402
+
+FIXTURES = ROOT / "tests" / "fixtures"
+SAVED_LISTING = ROOT / "data" / "ollama-library.html"
+FIXTURE_COPIES = 70  # 3 entries each, about the size of the real listing
+
+
+def load_listing(path):
+    if path:
+        return Path(path).read_bytes()
+    if SAVED_LISTING.exists():
+        return SAVED_LISTING.read_bytes()
+
+    # Repeat the fixture's entries inside a single page
+    html = (FIXTURES / "library.html").read_text()
+    entries = re.search(r"<ul role=\"list\">(.*)</ul>", html, re.S).group(1)
+    return html.replace(entries, entries * FIXTURE_COPIES).encode()
+
+
+def fresh_response(url, body):
+    # A new response each round so every backend pays for its own tree walk,
+    # not a selector cached on the response from the previous round
+    return HtmlResponse(url, body=body, encoding="utf-8")
+
+
+def measure(parse, url, body, seconds):
+    """Return (entries parsed per second, entries per page) for one parser"""
+    parse(fresh_response(url, body))  # Warm up
+    rounds = entries = 0
+    elapsed = 0.0
+    while elapsed < seconds:
+        response = fresh_response(url, body)
+        response.selector  # Build the lxml tree outside of the timing
+        start = time.perf_counter()
+        result = parse(response)
+        elapsed += time.perf_counter() - start
+        rounds += 1
+        entries += len(result) if isinstance(result, list) else 1
+    return entries / elapsed, entries // rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--listing", help="Saved listing page, defaults to data/ollama-library.html"
+    )
+    parser.add_argument(
+        "--seconds", type=float, default=2.0, help="Time to spend on each measurement"
+    )
+    args = parser.parse_args()
+
+    listing = load_listing(args.listing)
+    variant = (FIXTURES / "variant.html").read_bytes()
+
+    results = {}
+    for backend, (listing_parser, variant_parser) in sorted(PARSERS.items()):
+        listing_rate, listing_entries = measure(
+            listing_parser, "https://ollama.com/library", listing, args.seconds
+        )
+        variant_rate, _ = measure(
+            variant_parser,
+            "https://ollama.com/library/llama3.1:8b",
+            variant,
+            args.seconds,
+        )
+        results[backend] = {
+            "listing_entries_per_page": listing_entries,
+            "listing_entries_per_sec": round(listing_rate),
+            "variant_pages_per_sec": round(variant_rate),
+        }
+
+    baseline = results["css"]
+    for backend, result in results.items():
+        result["listing_speedup"] = round(
+            result["listing_entries_per_sec"] / baseline["listing_entries_per_sec"], 2
+        )
+        result["variant_speedup"] = round(
+            result["variant_pages_per_sec"] / baseline["variant_pages_per_sec"], 2
+        )
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark scheduler memory for the spider's variant requests.
+
+Parses a synthetic 5,000-model listing and compares the requests the spider
+yields, which carry only the model slug and size and share one ModelContext
+per model, with requests that copy the model's listing data into every
+variant's meta. Reports the memory held by the queued requests and their
+pickled size, as stored by disk queues with JOBDIR, as JSON.
+
+Usage: python benchmarks/bench_request_memory.py [--models 5000]
+"""
+
+import argparse
+import gc
+import json
+import pickle
+import sys
+import tracemalloc
+from pathlib import Path
+
+from scrapy.http import HtmlResponse
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from synthetic import synthetic_listing_html  # noqa: E402
+
+from ollama_scraper.spiders.ollama_models import OllamaModelsSpider  # noqa: E402
+
+
+def synthetic_listing(count, seed=0):
+    """Build a listing page with count models of one to six sizes each"""
+    body = synthetic_listing_html(count, seed)
+    return HtmlResponse(
+        "https://ollama.com/library", body=body.encode(), encoding="utf-8"
+    )
+
+
+def copied_meta_requests(spider, response):
+    """Variant requests that carry a copy of the model's listing data, for comparison"""
+    requests = []
+    for model in spider.listing_parser(response):
+        model_url = response.urljoin(model["href"])
+        for param_size in model["parameter_sizes"]:
+            requests.append(
+                response.follow(
+                    f"https://ollama.com/library/{model_url.split('/')[-1]}:{param_size}",
+                    callback=spider.parse_model_page,
+                    meta={
+                        "model_name": model["name"],
+                        "model_desc": model["description"],
+                        "model_url": model_url,
+                        "param_size": param_size,
+                        "variant_count": len(model["parameter_sizes"]),
+                        "capabilities": model["capabilities"],
+                    },
+                )
+            )
+    return requests
+
+
+def measure(build):
+    """Return (result, bytes still allocated by it)"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, allocated
+
+
+def pickled_bytes(requests, spider):
+    return sum(
+        len(pickle.dumps(request.to_dict(spider=spider), protocol=4))
+        for request in requests
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--models", type=int, default=5000, help="Models in the synthetic listing"
+    )
+    args = parser.parse_args()
+
+    response = synthetic_listing(args.models)
+    response.selector  # Parse the page before measuring
+
+    spider = OllamaModelsSpider()
+    shared, shared_bytes = measure(lambda: list(spider.parse(response)))
+    contexts_pickled = len(pickle.dumps(spider.model_contexts, protocol=4))
+
+    copied_spider = OllamaModelsSpider()
+    copied, copied_bytes = measure(
+        lambda: copied_meta_requests(copied_spider, response)
+    )
+
+    results = {
+        "models": args.models,
+        "requests": len(shared),
+        "copied_meta": {
+            "memory_bytes": copied_bytes,
+            "pickled_bytes": pickled_bytes(copied, copied_spider),
+        },
+        "shared_context": {
+            # Includes the ModelContext records kept on the spider
+            "memory_bytes": shared_bytes,
+            "pickled_bytes": pickled_bytes(shared, spider) + contexts_pickled,
+        },
+    }
+    for key in ("memory_bytes", "pickled_bytes"):
+        saved = 1 - results["shared_context"][key] / results["copied_meta"][key]
+        results[f"{key.split('_')[0]}_saved"] = f"{saved:.0%}"
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
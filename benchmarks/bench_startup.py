@@ -0,0 +1,119 @@
+"""
+Benchmark how long each ollama-mgmt subcommand takes to start.
+
+Every command runs in a fresh interpreter, several times, and the median wall
+time is reported next to a bare `python -c pass` so the interpreter's own
+startup can be subtracted. A `python -X importtime` run of each command
+reports the time spent importing the toolkit's modules and their
+dependencies, the slowest of those imports, and whether Scrapy, ollama or
+requests were loaded at all. The library query reads a synthetic
+1,000-model library.json, so everything runs offline.
+
+Usage: python benchmarks/bench_startup.py [--runs 10]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from synthetic import synthetic_library
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ("scrapy", "twisted", "ollama", "requests", "httpx", "tabulate")
+
+
+def commands(library_path):
+    cli = [sys.executable, str(ROOT / "ollama_mgmt.py")]
+    return {
+        "python -c pass": [sys.executable, "-c", "pass"],
+        "library query": cli
+        + ["library", "--file", library_path, "--capability", "tools"],
+        "library --help": cli + ["library", "--help"],
+        "status": cli + ["status"],
+        "update --help": cli + ["update", "--help"],
+        "scrape --help": cli + ["scrape", "--help"],
+    }
+
+
+def wall_time(command, runs, env):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, env=env, capture_output=True, check=False)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def import_times(command, env):
+    """
+    Return {top-level module: cumulative microseconds} for the imports made
+    after the interpreter's own startup (everything past `site`), and the
+    names of every module imported at any depth
+    """
+    result = subprocess.run(
+        [command[0], "-X", "importtime", *command[1:]],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    modules = {}
+    loaded = set()
+    started = False
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not name.startswith(" ") or not cumulative.strip().isdigit():
+            continue
+        name = name[1:]
+        loaded.add(name.strip().split(".")[0])
+        if name == "site":
+            started = True
+        elif started and not name.startswith(" "):
+            modules[name] = int(cumulative)
+    return modules, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="Runs per command")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        library_path = os.path.join(temp_dir, "library.json")
+        with open(library_path, "w", encoding="utf-8") as f:
+            json.dump(synthetic_library(1000), f, indent=4)
+        env = dict(os.environ, LOGS_PATH=temp_dir, PYTHONPATH=str(ROOT))
+        # status must not wait on real services
+        env.update(OLLAMA_URL="http://127.0.0.1:9", OPEN_WEBUI_URL="http://127.0.0.1:9")
+
+        results = {}
+        baseline = None
+        for name, command in commands(library_path).items():
+            seconds = wall_time(command, args.runs, env)
+            baseline = seconds if baseline is None else baseline
+            modules, loaded = import_times(command, env)
+            results[name] = {
+                "median_ms": round(seconds * 1000, 1),
+                "over_bare_python_ms": round((seconds - baseline) * 1000, 1),
+                "import_ms": round(sum(modules.values()) / 1000, 1),
+                "slowest_imports_ms": {
+                    module: round(micros / 1000, 1)
+                    for module, micros in sorted(
+                        modules.items(), key=lambda item: -item[1]
+                    )[:5]
+                },
+                "loaded": [module for module in HEAVY_MODULES if module in loaded],
+            }
+    print(json.dumps(results, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+Benchmark the library tooling and the scraper on synthetic libraries.
+
+For each library size this times library.py's load_model_data,
+process_model_data, print_table and streaming reader, the spider's parse
+callbacks on a synthetic listing and variant page, and MergeModelsPipeline
+merging and writing every variant. Everything runs offline on fixtures from
+synthetic.py. Results are printed as JSON (and written to --output) so runs
+can be compared over time.
+
+Usage: python benchmarks/run_benchmarks.py [--sizes 1000,10000,100000] [--repeat 3] [--output PATH]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# Keep library.py's module-level file logger out of the working tree
+os.environ.setdefault("LOGS_PATH", tempfile.mkdtemp(prefix="ollama-mgmt-logs-"))
+
+from scrapy.http import HtmlResponse, Request  # noqa: E402
+from synthetic import (  # noqa: E402
+    synthetic_library,
+    synthetic_listing_html,
+    synthetic_variant_html,
+)
+
+import library  # noqa: E402
+from ollama_scraper.items import ModelContext  # noqa: E402
+from ollama_scraper.pipelines import MergeModelsPipeline  # noqa: E402
+from ollama_scraper.spiders.ollama_models import OllamaModelsSpider  # noqa: E402
+
+VARIANT_PAGES = 2000  # Variant pages parsed per measurement
+
+
+def best_of(repeat, run):
+    """Return the fastest of repeat runs in seconds, and the last run's result"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def timing(seconds, items, unit):
+    return {
+        "seconds": round(seconds, 4),
+        unit: items,
+        f"{unit}_per_sec": round(items / seconds) if seconds else None,
+    }
+
+
+def quiet_spider():
+    """Return a spider that only logs warnings, so timings don't include log lines"""
+    spider = OllamaModelsSpider()
+    spider.logger.setLevel(logging.WARNING)
+    return spider
+
+
+def bench_library(path, count, repeat):
+    results = {}
+    seconds, models = best_of(repeat, lambda: library.load_model_data(str(path)))
+    results["load_model_data"] = timing(seconds, count, "models")
+
+    seconds, rows = best_of(repeat, lambda: library.process_model_data(models))
+    results["process_model_data"] = timing(seconds, count, "models")
+
+    def print_table():
+        with contextlib.redirect_stdout(io.StringIO()):
+            library.print_table(list(rows))
+
+    seconds, _ = best_of(repeat, print_table)
+    results["print_table"] = timing(seconds, len(rows), "rows")
+
+    def stream():
+        now = time.time()
+        with contextlib.redirect_stdout(io.StringIO()):
+            stream_rows = (
+                library.model_row(model, now, updated_within=90)
+                for model in library.iter_model_data(str(path))
+            )
+            library.print_table_streaming(row for row in stream_rows if row)
+
+    seconds, _ = best_of(repeat, stream)
+    results["stream_and_print"] = timing(seconds, count, "models")
+    return results
+
+
+def bench_spider(count, repeat):
+    results = {}
+    listing = HtmlResponse(
+        "https://ollama.com/library",
+        body=synthetic_listing_html(count).encode(),
+        encoding="utf-8",
+    )
+    listing.selector  # Parse the HTML once, outside the timing, like Scrapy does
+
+    def parse():
+        return list(quiet_spider().parse(listing))
+
+    seconds, requests = best_of(repeat, parse)
+    results["parse_listing"] = timing(seconds, count, "models")
+    results["parse_listing"]["requests"] = len(requests)
+
+    spider = quiet_spider()
+    spider.model_contexts["model-0"] = ModelContext(
+        "model-0", "desc", "https://ollama.com/library/model-0", ["8b"], ["tools"]
+    )
+    body = synthetic_variant_html().encode()
+    request = Request(
+        "https://ollama.com/library/model-0:8b",
+        meta={"model_slug": "model-0", "param_size": "8b"},
+    )
+    pages = min(count, VARIANT_PAGES)
+
+    def parse_pages():
+        for _ in range(pages):
+            response = HtmlResponse(
+                request.url, body=body, encoding="utf-8", request=request
+            )
+            list(spider.parse_model_page(response))
+
+    seconds, _ = best_of(repeat, parse_pages)
+    results["parse_model_page"] = timing(seconds, pages, "pages")
+    return results
+
+
+def bench_pipeline(records, output_dir, repeat):
+    spider = quiet_spider()
+    items = [
+        {
+            "name": record["name"],
+            "description": record["description"],
+            "url": record["url"],
+            "parameter_size": size,
+            "size_gb": size_gb,
+            "last_updated": record["last_updated"],
+            "capabilities": record["capabilities"],
+            "variant_count": len(record["parameter_sizes"]),
+        }
+        for record in records
+        for size, size_gb in record["parameter_sizes"].items()
+    ]
+
+    def merge():
+        pipeline = MergeModelsPipeline(output_path=str(output_dir / "merged.json"))
+        pipeline.open_spider(spider)
+        for item in items:
+            pipeline.process_item(item, spider)
+        return pipeline
+
+    merge_seconds, pipeline = best_of(repeat, merge)
+    close_seconds, _ = best_of(repeat, lambda: pipeline.close_spider(spider))
+    return {
+        "process_item": timing(merge_seconds, len(items), "items"),
+        "close_spider": timing(close_seconds, len(records), "models"),
+    }
+
+
+def run(sizes, repeat):
+    # Time the work, not the log lines it writes
+    logging.getLogger("library_script").setLevel(logging.WARNING)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_dir = Path(temp_dir)
+        for count in sizes:
+            records = synthetic_library(count)
+            path = output_dir / f"library-{count}.json"
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(records, f, indent=4)
+
+            results[str(count)] = {
+                "library_bytes": path.stat().st_size,
+                "library": bench_library(path, count, repeat),
+                "spider": bench_spider(count, repeat),
+                "pipeline": bench_pipeline(records, output_dir, repeat),
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        default="1000,10000,100000",
+        help="Comma-separated numbers of models to benchmark",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Runs per measurement, the best is kept"
+    )
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    args = parser.parse_args()
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": run([int(size) for size in args.sizes.split(",")], args.repeat),
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Generate synthetic library.json and listing HTML fixtures for the benchmarks.
+
+Models get realistic size tags (including "8x7b", "1.5b", "270m" and "e2b"),
+sizes in GB to match, capabilities and relative update dates, from a seeded
+random generator so every run produces the same files.
+
+Usage: python benchmarks/synthetic.py [--models 10000] [--output-dir data/synthetic]
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from normalize import parameter_count, updated_timestamp  # noqa: E402
+
+# Size tag -> typical Q4 download size in GB
+SIZES = {
+    "270m": 0.292,
+    "1b": 0.815,
+    "1.5b": 1.1,
+    "e2b": 5.6,
+    "3b": 2.0,
+    "4b": 3.3,
+    "7b": 4.7,
+    "8b": 4.9,
+    "12b": 8.1,
+    "14b": 9.0,
+    "27b": 17.0,
+    "70b": 43.0,
+    "8x7b": 26.0,
+    "8x22b": 80.0,
+    "405b": 243.0,
+}
+SIZE_TAGS = list(SIZES)
+CAPABILITIES = ["tools", "vision", "thinking", "embedding"]
+UPDATED = [
+    "an hour ago",
+    "yesterday",
+    "{n} days ago",
+    "{n} weeks ago",
+    "{n} months ago",
+    "{n} years ago",
+]
+
+ENTRY = """<li x-test-model><a href="/library/{slug}" class="group w-full">
+<h2><div x-test-model-title><span class="group-hover:underline">{slug}</span></div></h2>
+<p class="max-w-lg">{description}</p>
+<div>{capabilities}{sizes}</div>
+<p><span>Updated&nbsp;<span x-test-updated>{updated}</span></span></p>
+</a></li>
+"""
+
+VARIANT_PAGE = """<!DOCTYPE html><html><body><main>
+<h1 x-test-model-name>{slug}</h1>
+<section><div class="flex"><span x-test-updated>{updated}</span></div>
+<div><p>model</p><p>arch llama · parameters {size} · quantization Q4_K_M</p>
+<p class="text-neutral-500">{size_gb}GB</p></div></section>
+</main></body></html>
+"""
+
+
+def synthetic_models(count, seed=0):
+    """
+    Yield (slug, description, size tags, capabilities, updated) for count
+    models of one to six sizes each
+    """
+    rng = random.Random(seed)
+    for index in range(count):
+        updated = rng.choice(UPDATED).format(n=rng.randint(2, 11))
+        yield (
+            f"model-{index}",
+            f"Synthetic model {index} " + "with a realistic description " * 4,
+            sorted(rng.sample(SIZE_TAGS, rng.randint(1, 6)), key=SIZE_TAGS.index),
+            rng.sample(CAPABILITIES, rng.randint(0, 2)),
+            updated,
+        )
+
+
+def synthetic_library(count, seed=0, scraped_at=None):
+    """Return count library.json records as MergeModelsPipeline writes them"""
+    scraped_at = time.time() if scraped_at is None else scraped_at
+    return [
+        {
+            "name": slug,
+            "description": description,
+            "url": f"https://ollama.com/library/{slug}",
+            "last_updated": updated,
+            "updated_at": updated_timestamp(updated, scraped_at),
+            "capabilities": capabilities,
+            "parameter_sizes": {size: SIZES[size] for size in sizes},
+            "parameter_counts": {size: parameter_count(size) for size in sizes},
+        }
+        for slug, description, sizes, capabilities, updated in synthetic_models(
+            count, seed
+        )
+    ]
+
+
+def synthetic_listing_html(count, seed=0):
+    """Return a library listing page with count models"""
+    entries = [
+        ENTRY.format(
+            slug=slug,
+            description=description,
+            capabilities="".join(
+                f"<span x-test-capability>{cap}</span>" for cap in capabilities
+            ),
+            sizes="".join(f"<span x-test-size>{size}</span>" for size in sizes),
+            updated=updated,
+        )
+        for slug, description, sizes, capabilities, updated in synthetic_models(
+            count, seed
+        )
+    ]
+    return '<html><body><ul role="list">' + "".join(entries) + "</ul></body></html>"
+
+
+def synthetic_variant_html(slug="model-0", size="8b", updated="3 days ago"):
+    """Return a model variant page"""
+    return VARIANT_PAGE.format(
+        slug=slug, size=size, size_gb=SIZES.get(size, 4.9), updated=updated
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--models", type=int, default=10000, help="Models to generate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--output-dir", default=str(ROOT / "data" / "synthetic"), help="Where to write"
+    )
+    args = parser.parse_args()
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    library_path = output_dir / f"library-{args.models}.json"
+    listing_path = output_dir / f"listing-{args.models}.html"
+    with open(library_path, "w", encoding="utf-8") as f:
+        json.dump(synthetic_library(args.models, args.seed), f, indent=4)
+    listing_path.write_text(
+        synthetic_listing_html(args.models, args.seed), encoding="utf-8"
+    )
+    print(f"Wrote {library_path} and {listing_path}")
+
+
+if __name__ == "__main__":
+    main()
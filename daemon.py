@@ -0,0 +1,370 @@
+"""
+Keep the installed models current without re-running the scraper and a full
+update: poll the Ollama library listing, work out which models changed
+upstream since the last poll and pull only the installed variants of those.
+
+Pending pulls are kept in a SQLite work queue, so a restart carries on where
+the last run stopped.
+"""
+
+import argparse
+import json
+import os
+import signal
+import sqlite3
+import threading
+import time
+
+import requests
+
+import metrics
+import update
+from data_config import DATA_DIR, LIBRARY_JSON, MODEL_LIBRARY_URL
+from logger_config import setup_logger
+from normalize import relative_resolution, updated_timestamp
+
+# Set up logger
+logger = setup_logger(__name__)
+
+# Define constants
+DAEMON_INTERVAL = float(os.environ.get("DAEMON_INTERVAL", 3600))  # Seconds per poll
+DAEMON_QUEUE = os.environ.get("DAEMON_QUEUE", f"{DATA_DIR}/daemon.db")
+DAEMON_MAX_ATTEMPTS = int(os.environ.get("DAEMON_MAX_ATTEMPTS", 3))  # Per pull
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS models (
+    name TEXT PRIMARY KEY,
+    last_updated TEXT,
+    updated_at REAL,
+    parameter_sizes TEXT
+);
+CREATE TABLE IF NOT EXISTS queue (
+    name TEXT PRIMARY KEY,
+    reason TEXT,
+    enqueued_at REAL,
+    attempts INTEGER DEFAULT 0,
+    last_error TEXT
+);
+"""
+
+
+class DaemonStore:
+    """
+    The daemon's state in one SQLite file: the pull queue, the listing as of
+    the last poll, and the validators for the next conditional request
+    """
+
+    def __init__(self, path=DAEMON_QUEUE):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def get_meta(self, key):
+        row = self.connection.execute(
+            "SELECT value FROM meta WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def snapshot(self):
+        """Return the models as of the last poll, by name"""
+        return {
+            name: {
+                "last_updated": last_updated,
+                "updated_at": updated_at,
+                "parameter_sizes": json.loads(sizes),
+            }
+            for name, last_updated, updated_at, sizes in self.connection.execute(
+                "SELECT name, last_updated, updated_at, parameter_sizes FROM models"
+            )
+        }
+
+    def save_snapshot(self, models, validators=None):
+        """
+        Replace the snapshot, and the validators for the next conditional
+        request with those of the response it came from
+        """
+        with self.connection:
+            for key, value in (validators or {}).items():
+                self.connection.execute("DELETE FROM meta WHERE key = ?", (key,))
+                if value is not None:
+                    self.connection.execute(
+                        "INSERT INTO meta VALUES (?, ?)", (key, value)
+                    )
+            self.connection.execute("DELETE FROM models")
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO models VALUES (?, ?, ?, ?)",
+                [
+                    (
+                        name,
+                        model["last_updated"],
+                        model["updated_at"],
+                        json.dumps(model["parameter_sizes"]),
+                    )
+                    for name, model in models.items()
+                ],
+            )
+
+    def put(self, name, reason):
+        """Queue a pull, once; returns False if it was already queued"""
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT OR IGNORE INTO queue (name, reason, enqueued_at)"
+                " VALUES (?, ?, ?)",
+                (name, reason, time.time()),
+            )
+        return cursor.rowcount == 1
+
+    def pending(self):
+        """Return the queued model names, oldest first"""
+        return [
+            name
+            for (name,) in self.connection.execute(
+                "SELECT name FROM queue ORDER BY enqueued_at, name"
+            )
+        ]
+
+    def done(self, name):
+        with self.connection:
+            self.connection.execute("DELETE FROM queue WHERE name = ?", (name,))
+
+    def failed(self, name, error):
+        """Count a failed pull and return how many attempts it has had"""
+        with self.connection:
+            self.connection.execute(
+                "UPDATE queue SET attempts = attempts + 1, last_error = ?"
+                " WHERE name = ?",
+                (error, name),
+            )
+        row = self.connection.execute(
+            "SELECT attempts FROM queue WHERE name = ?", (name,)
+        ).fetchone()
+        return row[0] if row else 0
+
+
+def load_library_snapshot(path=None):
+    """
+    Read the last scraped library.json into the same shape as a snapshot, or
+    return {} if there isn't one
+    """
+    path = path or LIBRARY_JSON
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        scraped_at = os.path.getmtime(path)
+    except (OSError, ValueError):
+        return {}
+    return {
+        record["name"]: {
+            "last_updated": record.get("last_updated"),
+            "updated_at": record.get("updated_at")
+            or updated_timestamp(record.get("last_updated"), scraped_at),
+            "parameter_sizes": sorted(record.get("parameter_sizes") or {}),
+        }
+        for record in records
+    }
+
+
+def listing_snapshot(entries, polled_at):
+    """Turn listing entries into a snapshot, with absolute update times"""
+    return {
+        entry["name"]: {
+            "last_updated": entry["last_updated"],
+            "updated_at": updated_timestamp(entry["last_updated"], polled_at),
+            "parameter_sizes": sorted(entry["parameter_sizes"]),
+        }
+        for entry in entries
+        if entry["name"]
+    }
+
+
+def has_changed(previous, current):
+    """
+    Check whether a model changed upstream between two snapshots.
+
+    Relative dates only say "3 days ago", so an update time is only known to
+    within one unit of its string. The model counts as updated once the new
+    time is later than the old one by more than both uncertainties together.
+    """
+    if previous["parameter_sizes"] != current["parameter_sizes"]:
+        return True
+    if previous["updated_at"] is None or current["updated_at"] is None:
+        return False
+    slack = sum(
+        (relative_resolution(model["last_updated"]) or 0) * 86400
+        for model in (previous, current)
+    )
+    return current["updated_at"] - previous["updated_at"] > slack
+
+
+def poll_library(session, store, url=MODEL_LIBRARY_URL):
+    """
+    Fetch the library listing with the validators from the last poll.
+    Returns the listing entries and the response's validators, or None if
+    the listing has not changed.
+    """
+    from scrapy.http import HtmlResponse  # pylint: disable=import-outside-toplevel
+
+    from ollama_scraper.parsers import (  # pylint: disable=import-outside-toplevel
+        lxml_listing,
+    )
+
+    headers = {}
+    if store.get_meta("etag"):
+        headers["If-None-Match"] = store.get_meta("etag")
+    if store.get_meta("last_modified"):
+        headers["If-Modified-Since"] = store.get_meta("last_modified")
+
+    with metrics.timer("ollama_mgmt_daemon_poll_seconds", "Time to poll the library"):
+        response = session.get(url, headers=headers, timeout=30)
+    metrics.inc(
+        "ollama_mgmt_daemon_polls_total",
+        help_text="Library polls by HTTP status",
+        status=response.status_code,
+    )
+    if response.status_code == 304:
+        return None
+    response.raise_for_status()
+    metrics.inc(
+        "ollama_mgmt_http_response_bytes_total",
+        len(response.content),
+        endpoint="library",
+    )
+
+    validators = {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+    entries = lxml_listing(HtmlResponse(url, body=response.content, encoding="utf-8"))
+    return entries, validators
+
+
+def enqueue_changes(store, session, entries, polled_at, validators=None, api_url=None):
+    """
+    Compare a fresh listing with the last snapshot, or with library.json on
+    the first poll, and queue pulls for the installed variants of every model
+    that changed. Returns the names of the changed models.
+
+    The listing only becomes the new snapshot once the pulls are queued, so
+    changes seen while Ollama is unreachable are found again on the next poll.
+    """
+    current = listing_snapshot(entries, polled_at)
+    previous = store.snapshot() or load_library_snapshot()
+    if not previous:
+        logger.info("No previous library to compare against, recorded the listing")
+        store.save_snapshot(current, validators)
+        return []
+
+    changed = sorted(
+        name
+        for name, model in current.items()
+        if name not in previous or has_changed(previous[name], model)
+    )
+    if changed:
+        logger.info("Changed upstream: %s", ", ".join(changed))
+        installed = update.get_models(api_url, session=session)
+        if not installed:
+            logger.warning("No installed models listed, comparing again next poll")
+            return changed
+        for model in installed:
+            if model["name"].split(":")[0] in changed and store.put(
+                model["name"], "changed upstream"
+            ):
+                logger.info("Queued %s", model["name"])
+                metrics.inc("ollama_mgmt_daemon_queued_total", help_text="Queued pulls")
+
+    store.save_snapshot(current, validators)
+    return changed
+
+
+def drain_queue(store, client, max_attempts=DAEMON_MAX_ATTEMPTS):
+    """Pull every queued model in order, keeping failures for the next cycle"""
+    for name in store.pending():
+        result = update.pull_model(client, name)
+        if result["status"] == "success":
+            store.done(name)
+            print(f"- {name} pulled successfully ({result['seconds']:.1f}s)")
+            continue
+        attempts = store.failed(name, result["status"])
+        if attempts >= max_attempts:
+            logger.error(
+                "Giving up on %s after %d attempts: %s",
+                name,
+                attempts,
+                result["status"],
+            )
+            store.done(name)
+        else:
+            logger.warning("Pulling %s failed (%s), will retry", name, result["status"])
+
+
+def run_cycle(store, session, client, url=MODEL_LIBRARY_URL, api_url=None):
+    """Poll once, queue what changed and work through the queue"""
+    try:
+        polled = poll_library(session, store, url)
+    except requests.RequestException as e:
+        logger.error("Error polling the library: %s", e)
+        polled = None
+    if polled is not None:
+        entries, validators = polled
+        enqueue_changes(store, session, entries, time.time(), validators, api_url)
+    drain_queue(store, client)
+
+
+def run(interval=DAEMON_INTERVAL, once=False, stop=None, path=DAEMON_QUEUE):
+    """
+    Poll every `interval` seconds until `stop` is set, keeping one HTTP
+    session and one Ollama client warm across cycles
+    """
+    stop = stop or threading.Event()
+    store = DaemonStore(path)
+    try:
+        with requests.Session() as session:
+            client = update.make_client()
+            while True:
+                run_cycle(store, session, client)
+                if once or stop.wait(interval):
+                    break
+    finally:
+        store.close()
+
+
+def parse_args(args=None):
+    """
+    Parse command line arguments
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=DAEMON_INTERVAL,
+        help="seconds between polls of the library",
+    )
+    parser.add_argument(
+        "--once", action="store_true", help="run a single poll and pull cycle"
+    )
+    return parser.parse_args(args)
+
+
+def main(argv=None):
+    """
+    Run the daemon until it is interrupted or terminated
+    """
+    args = parse_args(argv)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    metrics.start()
+    try:
+        run(args.interval, args.once, stop)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        metrics.dump()
+
+
+if __name__ == "__main__":
+    main()
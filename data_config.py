@@ -2,9 +2,15 @@
 Configuration module for data-related settings and paths.
 """
 
+import json
+import logging
 import os
+import tempfile
+from contextlib import contextmanager
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
 # Base directory is the parent directory of this file
 BASE_DIR = Path(__file__).parent
 
@@ -12,6 +18,11 @@ BASE_DIR = Path(__file__).parent
 # DATA_DIR = f"{BASE_DIR}/data"
 DATA_DIR = BASE_DIR / "data"
 LIBRARY_JSON = f"{DATA_DIR}/library.json"
+LIBRARY_DB = (
+    f"{DATA_DIR}/library.db"  # SQLite index of library.json, see library_index.py
+)
+USAGE_JSON = f"{DATA_DIR}/usage.json"  # Optional {"model:tag": use count} map
+BENCHMARKS_JSON = f"{DATA_DIR}/benchmarks.json"  # Written by inference_benchmark.py
 
 # Model library URL configuration
 MODEL_LIBRARY_URL = os.environ.get("MODEL_LIBRARY_URL", "https://ollama.com/library")
@@ -24,3 +35,48 @@ def setup_data_dirs():
     """
     DATA_DIR.mkdir(exist_ok=True)
     return DATA_DIR
+
+
+def load_json_file(path, default):
+    """
+    Load an optional JSON data file, returning `default` if it's missing
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except (IOError, json.JSONDecodeError) as e:
+        logger.error("Failed to load %s: %s", path, e)
+        return default
+
+
+@contextmanager
+def atomic_path(path):
+    """
+    Yield a temp file path next to `path` and rename it into place once the
+    block finishes without an error, so readers never see a partial file
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    try:
+        yield temp_path
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+@contextmanager
+def atomic_write(path):
+    """
+    Open a temp file next to `path` for writing and rename it into place
+    once written
+    """
+    with atomic_path(path) as temp_path:
+        with open(temp_path, "w", encoding="utf-8") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
@@ -0,0 +1,229 @@
+"""
+A script to update the models on a fleet of Ollama hosts in one run
+"""
+
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from tabulate import tabulate
+
+from logger_config import setup_logger
+from registry import get_manifest
+from update import (
+    PULL_CONCURRENCY,
+    PULL_STREAM,
+    PULL_TIMEOUT,
+    SKIP_UP_TO_DATE,
+    fetch_models,
+    make_client,
+    pull_model,
+    select_models_by_size,
+)
+
+# Set up logger
+logger = setup_logger(__name__)
+
+# Define constants
+OLLAMA_HOSTS = [
+    host.strip()
+    for host in os.environ.get("OLLAMA_HOSTS", "http://localhost:11434").split(",")
+    if host.strip()
+]
+FLEET_CONCURRENCY = int(os.environ.get("FLEET_CONCURRENCY", 4))  # Pulls fleet-wide
+
+
+def get_host_models(host):
+    """
+    Get the installed models of one host, or None if they can't be listed
+    """
+    try:
+        return fetch_models(f"{host}/api")
+    except requests.RequestException as e:
+        logger.error("Error fetching models from %s: %s", host, e)
+        return None
+
+
+def get_fleet_models(hosts):
+    """
+    Get the installed models of every host concurrently. Hosts that can't
+    be listed map to None.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, len(hosts))) as executor:
+        futures = {host: executor.submit(get_host_models, host) for host in hosts}
+        return {host: futures[host].result() for host in hosts}
+
+
+def get_remote_digests(model_names):
+    """
+    Fetch each model's registry digest once for the whole fleet
+    """
+    with requests.Session() as session:
+        return {name: get_manifest(name, session=session)[0] for name in model_names}
+
+
+def plan_fleet(fleet_models, skip_up_to_date=SKIP_UP_TO_DATE):
+    """
+    Work out which models each host should pull. Size selection and registry
+    lookups are done once per distinct model name across the fleet.
+
+    Returns a {host: [model, ...]} mapping for the hosts that were listed.
+    """
+    fleet_models = {
+        host: models for host, models in fleet_models.items() if models is not None
+    }
+    unique_models = {}
+    for models in fleet_models.values():
+        for model in models:
+            unique_models.setdefault(model["name"], model)
+    refresh = {model["name"] for model in select_models_by_size(unique_models.values())}
+    logger.info(
+        "%d distinct models across %d hosts, %d to refresh",
+        len(unique_models),
+        len(fleet_models),
+        len(refresh),
+    )
+
+    remote_digests = get_remote_digests(sorted(refresh)) if skip_up_to_date else {}
+
+    plan = {}
+    for host, models in fleet_models.items():
+        plan[host] = []
+        for model in models:
+            if model["name"] not in refresh:
+                continue
+            remote_digest = remote_digests.get(model["name"])
+            local_digest = model.get("digest", "").removeprefix("sha256:")
+            if remote_digest and remote_digest == local_digest:
+                continue
+            plan[host].append(model)
+    return plan
+
+
+def pull_fleet(
+    plan,
+    concurrency=FLEET_CONCURRENCY,
+    per_host=PULL_CONCURRENCY,
+    timeout=PULL_TIMEOUT,
+    stream=PULL_STREAM,
+):
+    """
+    Pull the planned models on every host in parallel, with at most
+    `per_host` pulls per host and `concurrency` pulls across the fleet.
+
+    Returns a {host: {model_name: result}} mapping.
+    """
+    clients = {host: make_client(host, timeout=timeout, stream=stream) for host in plan}
+    queues = {
+        host: deque(model["name"] for model in models) for host, models in plan.items()
+    }
+    busy = dict.fromkeys(plan, 0)
+    turn = list(plan)
+    results = {host: {} for host in plan}
+    futures = {}
+
+    def start_pulls(executor):
+        # Hand free fleet slots to the hosts in turn, skipping any host that
+        # is already at its own limit, so no slot waits on a busy host
+        while len(futures) < max(1, concurrency):
+            ready = [
+                host for host in turn if queues[host] and busy[host] < max(1, per_host)
+            ]
+            if not ready:
+                return
+            host = ready[0]
+            turn.remove(host)
+            turn.append(host)
+            model_name = queues[host].popleft()
+            busy[host] += 1
+            future = executor.submit(
+                pull_model, clients[host], model_name, stream, timeout or None
+            )
+            futures[future] = (host, model_name)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        start_pulls(executor)
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                host, model_name = futures.pop(future)
+                busy[host] -= 1
+                try:
+                    result = future.result()
+                except Exception as e:  # pylint: disable=broad-exception-caught
+                    logger.error(
+                        "Unexpected error pulling %s on %s: %s", model_name, host, e
+                    )
+                    result = {"status": f"error: {e}", "seconds": 0.0}
+                results[host][model_name] = result
+                logger.info("%s: %s %s", host, model_name, result["status"])
+            start_pulls(executor)
+    return results
+
+
+def print_report(fleet_models, plan, results, wall_time):
+    """
+    Print one consolidated report for the whole fleet
+    """
+    rows = []
+    unreachable = []
+    for host, models in fleet_models.items():
+        if models is None:
+            unreachable.append(host)
+            rows.append([host, "unreachable", "-", "-", "-", "-"])
+            continue
+        host_results = results.get(host, {})
+        pulled = sum(1 for r in host_results.values() if r["status"] == "success")
+        rows.append(
+            [
+                host,
+                len(models),
+                len(plan.get(host, [])),
+                pulled,
+                len(host_results) - pulled,
+                f"{sum(r['seconds'] for r in host_results.values()):.1f}s",
+            ]
+        )
+    headers = ["Host", "Installed", "Planned", "Pulled", "Failed", "Pull Time"]
+    print(tabulate(rows, headers=headers, tablefmt="pretty"))
+
+    failures = [
+        f"- {host}: {name} ({result['status']})"
+        for host, host_results in results.items()
+        for name, result in host_results.items()
+        if result["status"] != "success"
+    ]
+    if failures:
+        print("\nFailed pulls:")
+        print("\n".join(failures))
+    if unreachable:
+        print("\nCould not list the models on:")
+        print("\n".join(f"- {host}" for host in unreachable))
+
+    summed_time = sum(
+        result["seconds"]
+        for host_results in results.values()
+        for result in host_results.values()
+    )
+    print(
+        f"\nUpdated {len(fleet_models) - len(unreachable)} of {len(fleet_models)} "
+        f"hosts in {wall_time:.1f}s wall time "
+        f"({summed_time:.1f}s summed per-model time)"
+    )
+
+
+def main():
+    """
+    Main function to orchestrate the script execution.
+    """
+    start = time.monotonic()
+    fleet_models = get_fleet_models(OLLAMA_HOSTS)
+    plan = plan_fleet(fleet_models)
+    results = pull_fleet(plan)
+    print_report(fleet_models, plan, results, time.monotonic() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+A script to measure how fast each installed model runs on this machine
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+
+import httpx
+import ollama
+
+from data_config import BENCHMARKS_JSON, atomic_write, load_json_file
+from logger_config import setup_logger
+from update import get_models
+
+# Set up logger
+logger = setup_logger(__name__)
+
+# Define constants
+OLLAMA_HOST = os.environ.get("OLLAMA_HOST")  # Default: the ollama client's own
+BENCHMARK_NUM_PREDICT = int(os.environ.get("BENCHMARK_NUM_PREDICT", 128))  # Tokens
+BENCHMARK_TIMEOUT = float(os.environ.get("BENCHMARK_TIMEOUT", 600))  # Seconds
+PROMPTS = [
+    "Explain what a hash table is in two sentences.",
+    "Write a Python function that returns the n-th Fibonacci number.",
+    "List three differences between TCP and UDP.",
+]
+# Fixed sampling so every run generates comparable output
+OPTIONS = {"temperature": 0, "seed": 42}
+
+
+def unload(client, model_name):
+    """
+    Ask Ollama to drop a model from memory so the next request loads it cold
+    """
+    client.generate(model=model_name, keep_alive=0)
+
+
+def run_prompt(client, model_name, prompt, num_predict=BENCHMARK_NUM_PREDICT):
+    """
+    Stream one completion and return its timings. The time to first token is
+    measured here; the rest comes from the counters in Ollama's final event.
+    """
+    start = time.monotonic()
+    first_token = None
+    final = None
+    for event in client.generate(
+        model=model_name,
+        prompt=prompt,
+        stream=True,
+        options=dict(OPTIONS, num_predict=num_predict),
+    ):
+        if first_token is None and event.get("response"):
+            first_token = time.monotonic() - start
+        if event.get("done"):
+            final = event
+    if final is None:
+        raise ollama.ResponseError("stream ended without a final event")
+
+    return {
+        "seconds": time.monotonic() - start,
+        "ttft_seconds": first_token,
+        "load_seconds": (final.get("load_duration") or 0) / 1e9,
+        "eval_count": final.get("eval_count") or 0,
+        "eval_seconds": (final.get("eval_duration") or 0) / 1e9,
+        "prompt_eval_count": final.get("prompt_eval_count") or 0,
+        "prompt_eval_seconds": (final.get("prompt_eval_duration") or 0) / 1e9,
+    }
+
+
+def benchmark_model(client, model_name, prompts=PROMPTS):
+    """
+    Run the prompt set against one model, starting from a cold load, and
+    return its summary
+    """
+    unload(client, model_name)
+    runs = [run_prompt(client, model_name, prompt) for prompt in prompts]
+    unload(client, model_name)
+
+    eval_count = sum(run["eval_count"] for run in runs)
+    eval_seconds = sum(run["eval_seconds"] for run in runs)
+    prompt_count = sum(run["prompt_eval_count"] for run in runs)
+    prompt_seconds = sum(run["prompt_eval_seconds"] for run in runs)
+    # The first prompt pays for the load, so only the others show warm latency
+    warm = [run["ttft_seconds"] for run in runs[1:] if run["ttft_seconds"] is not None]
+    return {
+        "benchmarked_at": int(time.time()),
+        "prompts": len(runs),
+        "cold_load_seconds": round(runs[0]["load_seconds"], 3),
+        "cold_ttft_seconds": (
+            round(runs[0]["ttft_seconds"], 3)
+            if runs[0]["ttft_seconds"] is not None
+            else None
+        ),
+        "ttft_seconds": round(statistics.median(warm), 3) if warm else None,
+        "tokens_per_second": (
+            round(eval_count / eval_seconds, 2) if eval_seconds else None
+        ),
+        "prompt_tokens_per_second": (
+            round(prompt_count / prompt_seconds, 2) if prompt_seconds else None
+        ),
+    }
+
+
+def save_benchmarks(results, path=None):
+    """
+    Write the results to a temp file and rename it into place
+    """
+    with atomic_write(path or BENCHMARKS_JSON) as f:
+        json.dump(results, f, indent=4, sort_keys=True)
+
+
+def benchmark_models(model_names, client, path=None):
+    """
+    Benchmark each model in turn, saving after every model so an interrupted
+    run keeps what it measured. Returns the updated results.
+    """
+    results = load_json_file(path or BENCHMARKS_JSON, {})
+    for model_name in model_names:
+        print(f"Benchmarking {model_name}...")
+        try:
+            summary = benchmark_model(client, model_name)
+        except (ollama.ResponseError, httpx.HTTPError, ConnectionError) as e:
+            logger.error("Error benchmarking %s: %s", model_name, e)
+            continue
+        results[model_name] = summary
+        save_benchmarks(results, path)
+        print(
+            f"- {model_name}: {summary['tokens_per_second']} tokens/s, "
+            f"first token in {summary['ttft_seconds']}s, "
+            f"cold load {summary['cold_load_seconds']}s"
+        )
+    return results
+
+
+def parse_args(args=None):
+    """
+    Parse command line arguments
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "models",
+        nargs="*",
+        help="models to benchmark (default: every installed model)",
+    )
+    return parser.parse_args(args)
+
+
+def main(argv=None):
+    """
+    Main function to orchestrate the script execution.
+    """
+    args = parse_args(argv)
+    model_names = args.models or [model["name"] for model in get_models()]
+    print(f"Benchmarking {len(model_names)} models...")
+    client = ollama.Client(host=OLLAMA_HOST, timeout=BENCHMARK_TIMEOUT or None)
+    benchmark_models(model_names, client)
+    print(f"\nResults saved to {BENCHMARKS_JSON}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,16 +2,30 @@
 This script reads the library.json file and prints the contents in a tabular format.
 """
 
+import argparse
+import itertools
 import json
+import logging
+import os
 import re
+import sqlite3
+import sys
+import time
 
-from tabulate import tabulate
+from data_config import BENCHMARKS_JSON, LIBRARY_DB, LIBRARY_JSON, load_json_file
+from library_index import query_index
+from normalize import parameter_count
 
-from data_config import LIBRARY_JSON
-from logger_config import setup_logger
+# Configured by main(), so importing this module stays cheap
+logger = logging.getLogger("library_script")
 
-# Set up logger
-logger = setup_logger("library_script")
+# Streaming mode
+STREAM_CHUNK_SIZE = 64 * 1024  # Characters read from the file at a time
+STREAM_PAGE_SIZE = int(os.environ.get("STREAM_PAGE_SIZE", 50))  # Rows per table
+RECORD_SEPARATORS = frozenset(" \t\r\n,[]")
+
+# Benchmark table sort orders: column index and whether larger is better
+BENCHMARK_SORTS = {"tokens": (3, True), "ttft": (4, False), "load": (5, False)}
 
 
 def convert_to_days(time_str):
@@ -42,11 +56,32 @@ def convert_to_days(time_str):
     return return_val
 
 
-def load_model_data():
+def model_age_days(model, now=None):
+    """Days since a model was updated, from its precomputed updated_at if it has one."""
+    updated_at = model.get("updated_at")
+    if updated_at is not None:
+        return ((time.time() if now is None else now) - updated_at) / 86400
+    # Libraries scraped before updated_at existed
+    return convert_to_days(model.get("last_updated", "-"))
+
+
+def sorted_sizes(model):
+    """A model's parameter sizes, smallest first, by their parameter counts."""
+    counts = model.get("parameter_counts") or {}
+
+    def size_key(size):
+        count = counts[size] if size in counts else parameter_count(size)
+        # Sizes that aren't counts, like "latest", go last
+        return (count is None, count or 0, size)
+
+    return sorted(model.get("parameter_sizes") or {}, key=size_key)
+
+
+def load_model_data(path=None):
     """Load model data from library.json file."""
     logger.debug("Loading repository data from library.json")
     try:
-        with open(LIBRARY_JSON, "r", encoding="utf-8") as f:
+        with open(path or LIBRARY_JSON, "r", encoding="utf-8") as f:
             model_list = json.load(f)
         logger.info("Loaded %d models", len(model_list))
         return model_list
@@ -55,8 +90,37 @@ def load_model_data():
         raise
 
 
+def iter_model_data(path=None, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Yield models one at a time from a library.json array or a JSONL file,
+    reading it in chunks so memory doesn't grow with the file.
+    """
+    decoder = json.JSONDecoder()
+    with open(path or LIBRARY_JSON, "r", encoding="utf-8") as f:
+        buffer, position = "", 0
+        while True:
+            # Skip the array brackets, commas and newlines between records
+            while position < len(buffer) and buffer[position] in RECORD_SEPARATORS:
+                position += 1
+            try:
+                if position == len(buffer):
+                    raise ValueError("buffer is empty")
+                model, position = decoder.raw_decode(buffer, position)
+            except ValueError:
+                # The next record isn't all in the buffer yet
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    if position < len(buffer):
+                        raise json.JSONDecodeError("Truncated record", buffer, position)
+                    return
+                buffer, position = buffer[position:] + chunk, 0
+                continue
+            yield model
+
+
 def process_model_data(model_list):
     """Process model data and return formatted table data."""
+    now = time.time()
     table_data = []
     for model in model_list:
         name = model.get("name", "Unknown")
@@ -66,26 +130,11 @@ def process_model_data(model_list):
         # description = model.get("description", "-")
         # url = model.get("url", "-")
 
-        # Extract parameter sizes
-        if "parameter_sizes" in model:
-            # Get sizes as comma-separated values
-            try:
-                sizes = ", ".join(
-                    sorted(
-                        model["parameter_sizes"].keys(),
-                        key=lambda x: int(x.replace("b", "").replace("m", "")),
-                    )
-                )
-
-            # Catches odd values like "8x7b"
-            # Can probably be handled better 🤷🏾‍♂️
-            except ValueError:
-                sizes = "-"
-        else:
-            sizes = "-"
+        # Get sizes as comma-separated values
+        sizes = ", ".join(sorted_sizes(model)) or "-"
 
-        # Convert last_updated to days
-        days_ago = convert_to_days(last_updated)
+        # Days since the last update
+        days_ago = model_age_days(model, now)
 
         # Only include models updated in the last 3 months (90 days)
         if days_ago <= 90:
@@ -94,8 +143,65 @@ def process_model_data(model_list):
     return table_data
 
 
+def model_row(model, now, capability=None, max_size=None, updated_within=None):
+    """
+    Return a model's [name, sizes, last_updated, days_ago] row, or None if it
+    doesn't match every given filter.
+    """
+    if capability and capability.lower() not in (model.get("capabilities") or []):
+        return None
+
+    parameter_sizes = model.get("parameter_sizes") or {}
+    sizes = [(size, parameter_sizes[size]) for size in sorted_sizes(model)]
+    if max_size is not None:
+        sizes = [
+            (size, size_gb)
+            for size, size_gb in sizes
+            if size_gb is not None and size_gb <= max_size
+        ]
+        if not sizes:
+            return None
+
+    days_ago = model_age_days(model, now)
+    if updated_within is not None and days_ago > updated_within:
+        return None
+
+    return [
+        model.get("name", "Unknown"),
+        ", ".join(size for size, _ in sizes) or "-",
+        model.get("last_updated") or "-",
+        days_ago,
+    ]
+
+
+def filter_models(model_list, capability=None, max_size=None, updated_within=None):
+    """
+    Answer a query from the loaded library.json when there's no index.
+    Returns the same rows as library_index.query_index().
+    """
+    now = time.time()
+    rows = (
+        model_row(model, now, capability, max_size, updated_within)
+        for model in model_list
+    )
+    return [row for row in rows if row is not None]
+
+
+def query_models(capability=None, max_size=None, updated_within=None):
+    """Answer a query from the index, falling back to library.json."""
+    try:
+        if os.path.getmtime(LIBRARY_DB) < os.path.getmtime(LIBRARY_JSON):
+            raise sqlite3.OperationalError("index is older than library.json")
+        return query_index(LIBRARY_DB, capability, max_size, updated_within)
+    except (OSError, sqlite3.Error) as e:
+        logger.info("Library index unavailable (%s), reading library.json", e)
+    return filter_models(load_model_data(), capability, max_size, updated_within)
+
+
 def print_table(table_data):
     """Print the formatted table data."""
+    from tabulate import tabulate  # Slow to import, and only needed here
+
     headers = ["Model Name", "Parameter Sizes", "Last Updated"]
 
     # Sort the table data by days_ago (ascending) and then by model name
@@ -108,11 +214,173 @@ def print_table(table_data):
     print(tabulate(table_data, headers=headers, tablefmt="pretty"))
 
 
-def main():
+def print_table_streaming(rows, page_size=STREAM_PAGE_SIZE):
+    """
+    Print rows as they arrive, one table per page, sizing the columns to
+    each page instead of the whole library. Rows stay in file order.
+    """
+    from tabulate import tabulate
+
+    headers = ["Model Name", "Parameter Sizes", "Last Updated"]
+    rows = iter(rows)
+    while True:
+        page = [row[:3] for row in itertools.islice(rows, page_size)]
+        if not page:
+            break
+        print(tabulate(page, headers=headers, tablefmt="pretty"), flush=True)
+
+
+def benchmark_rows(benchmarks, model_list, sort="tokens"):
+    """
+    Return [model, size, last_updated, tokens/s, first token, cold load] rows
+    for the benchmarked models, joined with their library entries. Models
+    without a value for the sort column go last.
+    """
+    library = {model.get("name"): model for model in model_list}
+    rows = []
+    for name, result in benchmarks.items():
+        base, _, tag = name.partition(":")
+        model = library.get(base, {})
+        size_gb = (model.get("parameter_sizes") or {}).get(tag)
+        rows.append(
+            [
+                name,
+                f"{size_gb} GB" if size_gb is not None else "-",
+                model.get("last_updated") or "-",
+                result.get("tokens_per_second"),
+                result.get("ttft_seconds"),
+                result.get("cold_load_seconds"),
+            ]
+        )
+
+    if sort == "name":
+        return sorted(rows)
+    column, larger_first = BENCHMARK_SORTS[sort]
+
+    def sort_key(row):
+        value = row[column]
+        if value is None:
+            return (1, 0, row[0])
+        return (0, -value if larger_first else value, row[0])
+
+    return sorted(rows, key=sort_key)
+
+
+def print_benchmarks(rows):
+    """Print the benchmark table."""
+    from tabulate import tabulate
+
+    headers = [
+        "Model",
+        "Size",
+        "Last Updated",
+        "Tokens/s",
+        "First Token (s)",
+        "Cold Load (s)",
+    ]
+    rows = [["-" if value is None else value for value in row] for row in rows]
+    print(tabulate(rows, headers=headers, tablefmt="pretty"))
+
+
+def parse_age(value):
+    """Parse an age like "30d", "2w", "6m", "1y" or "45" (days) into days."""
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)\s*([dwmy]?)", value.strip().lower())
+    if not match:
+        raise argparse.ArgumentTypeError(
+            f"invalid age: {value!r} (try 30d, 2w, 6m or 1y)"
+        )
+    return (
+        float(match.group(1))
+        * {"": 1, "d": 1, "w": 7, "m": 30, "y": 365}[match.group(2)]
+    )
+
+
+def parse_args(args=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--capability", help="only models with this capability, e.g. tools"
+    )
+    parser.add_argument("--max-size", type=float, help="only sizes up to this many GB")
+    parser.add_argument(
+        "--updated-within",
+        type=parse_age,
+        help="only models updated within an age like 30d",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="read and print the library incrementally, a page at a time",
+    )
+    parser.add_argument(
+        "--file", help="library.json or JSONL file to read (default: data/library.json)"
+    )
+    parser.add_argument(
+        "--benchmarks",
+        action="store_true",
+        help="show the installed models' inference benchmarks",
+    )
+    parser.add_argument(
+        "--sort",
+        choices=["tokens", "ttft", "load", "name"],
+        default="tokens",
+        help="benchmark order: fastest generation, first token or load, or name",
+    )
+    return parser.parse_args(args)
+
+
+def main(argv=None):
     """Main function to orchestrate the script execution."""
-    model_list = load_model_data()
-    table_data = process_model_data(model_list)
-    print_table(table_data)
+    from logger_config import setup_logger
+
+    setup_logger("library_script")
+    args = parse_args(argv)
+    query = (
+        args.capability or args.max_size is not None or args.updated_within is not None
+    )
+
+    try:
+        if args.benchmarks:
+            try:
+                model_list = load_model_data(args.file)
+            except (OSError, ValueError):
+                model_list = []
+            benchmarks = load_json_file(BENCHMARKS_JSON, {})
+            print_benchmarks(benchmark_rows(benchmarks, model_list, args.sort))
+            return
+
+        if args.stream:
+            # Filter while reading; without a query show the last 90 days as usual
+            now = time.time()
+            updated_within = args.updated_within if query else 90
+            rows = (
+                model_row(model, now, args.capability, args.max_size, updated_within)
+                for model in iter_model_data(args.file)
+            )
+            print_table_streaming(row for row in rows if row is not None)
+            return
+
+        if query and not args.file:
+            # Query mode answers from the SQLite index without loading the library
+            table_data = query_models(
+                args.capability, args.max_size, args.updated_within
+            )
+        elif query:
+            table_data = filter_models(
+                load_model_data(args.file),
+                args.capability,
+                args.max_size,
+                args.updated_within,
+            )
+        else:
+            model_list = load_model_data(args.file)
+            table_data = process_model_data(model_list)
+        print_table(table_data)
+    except BrokenPipeError:
+        # The reader, e.g. head, has stopped; drop whatever is still buffered
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        sys.exit(0)
 
 
 if __name__ == "__main__":
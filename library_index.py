@@ -0,0 +1,156 @@
+"""
+An indexed SQLite copy of library.json, so library.py can answer queries
+without loading and scanning the whole library
+"""
+
+import sqlite3
+import time
+
+from data_config import atomic_path
+from normalize import parameter_count
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE models (
+    name TEXT PRIMARY KEY,
+    description TEXT,
+    url TEXT,
+    last_updated TEXT,
+    updated_at REAL
+);
+CREATE TABLE capabilities (name TEXT, capability TEXT);
+CREATE TABLE sizes (
+    name TEXT,
+    position INTEGER,
+    parameter_size TEXT,
+    size_gb REAL,
+    parameter_count INTEGER
+);
+CREATE INDEX models_updated_at ON models (updated_at);
+CREATE INDEX capabilities_capability ON capabilities (capability, name);
+CREATE INDEX sizes_size_gb ON sizes (size_gb, name);
+CREATE INDEX sizes_parameter_size ON sizes (parameter_size, name);
+CREATE INDEX sizes_name ON sizes (name, position);
+"""
+
+
+def write_index(path, records, updated_at=None, scraped_at=None):
+    """
+    Build the index for an iterable of library.json records in a temp file
+    and rename it into place. updated_at maps a record to an absolute update
+    timestamp, and defaults to the record's precomputed "updated_at".
+    """
+    scraped_at = time.time() if scraped_at is None else scraped_at
+    with atomic_path(path) as temp_path:
+        connection = sqlite3.connect(temp_path)
+        try:
+            with connection:
+                connection.executescript(SCHEMA)
+                connection.execute(
+                    "INSERT INTO meta VALUES ('scraped_at', ?)", (scraped_at,)
+                )
+                count = 0
+                for record in records:
+                    name = record["name"]
+                    connection.execute(
+                        "INSERT OR REPLACE INTO models VALUES (?, ?, ?, ?, ?)",
+                        (
+                            name,
+                            record.get("description"),
+                            record.get("url"),
+                            record.get("last_updated"),
+                            (
+                                updated_at(record)
+                                if updated_at
+                                else record.get("updated_at")
+                            ),
+                        ),
+                    )
+                    connection.executemany(
+                        "INSERT INTO capabilities VALUES (?, ?)",
+                        [
+                            (name, capability)
+                            for capability in record.get("capabilities") or []
+                        ],
+                    )
+                    counts = record.get("parameter_counts") or {}
+                    connection.executemany(
+                        "INSERT INTO sizes VALUES (?, ?, ?, ?, ?)",
+                        [
+                            (
+                                name,
+                                position,
+                                size,
+                                size_gb,
+                                (
+                                    counts[size]
+                                    if size in counts
+                                    else parameter_count(size)
+                                ),
+                            )
+                            for position, (size, size_gb) in enumerate(
+                                (record.get("parameter_sizes") or {}).items()
+                            )
+                        ],
+                    )
+                    count += 1
+            # Give the query planner statistics for choosing between the indexes
+            connection.execute("ANALYZE")
+        finally:
+            connection.close()
+    return count
+
+
+def query_index(path, capability=None, max_size=None, updated_within=None, now=None):
+    """
+    Return [name, sizes, last_updated, days_ago] rows for the models matching
+    every given filter. max_size is in GB and also limits the sizes listed;
+    updated_within is in days. Raises sqlite3.Error if there is no index.
+    """
+    now = time.time() if now is None else now
+    conditions = []
+    params = []
+    if capability:
+        conditions.append(
+            "EXISTS (SELECT 1 FROM capabilities"
+            " WHERE capabilities.name = models.name AND capability = ?)"
+        )
+        params.append(capability.lower())
+    if max_size is not None:
+        conditions.append(
+            "EXISTS (SELECT 1 FROM sizes AS fits"
+            " WHERE fits.name = models.name AND fits.size_gb <= ?)"
+        )
+        params.append(max_size)
+    if updated_within is not None:
+        conditions.append("models.updated_at >= ?")
+        params.append(now - updated_within * 86400)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    # Open read-only so a missing index is an error rather than a new empty file
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        size_filter = "AND sizes.size_gb <= ?" if max_size is not None else ""
+        rows = connection.execute(
+            f"""SELECT models.name, models.last_updated, models.updated_at, sizes.parameter_size
+            FROM models LEFT JOIN sizes ON sizes.name = models.name {size_filter}
+            {where} ORDER BY models.rowid,
+            sizes.parameter_count IS NULL, sizes.parameter_count, sizes.position""",
+            ([max_size] if max_size is not None else []) + params,
+        ).fetchall()
+    finally:
+        connection.close()
+
+    # One row per size, grouped back into one row per model
+    table_data = []
+    for name, last_updated, updated_at, size in rows:
+        if not table_data or table_data[-1][0] != name:
+            days_ago = (
+                (now - updated_at) / 86400 if updated_at is not None else float("inf")
+            )
+            table_data.append([name, [], last_updated or "-", days_ago])
+        if size is not None:
+            table_data[-1][1].append(size)
+    for row in table_data:
+        row[1] = ", ".join(row[1]) or "-"
+    return table_data
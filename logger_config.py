@@ -2,22 +2,85 @@
 Shared logging configuration
 """
 
+import atexit
+import copy
+import json
 import logging
 import os
+import queue
 
+# Background listeners for queued loggers, by logger name
+_listeners = {}
 
-def setup_logger(name):
+
+class JsonFormatter(logging.Formatter):
+    """Format each record as one JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+def _prepare(record):
+    """Queue records without formatting them, so the writer's formatter sees exc_info"""
+    record = copy.copy(record)
+    record.msg = record.getMessage()
+    record.args = None
+    return record
+
+
+def _env_flag(name):
+    return os.environ.get(name, "").lower() in ("1", "true", "yes")
+
+
+def _stop_listeners():
+    """Flush and stop every queue listener, so no records are lost at exit"""
+    for listener in _listeners.values():
+        listener.stop()
+    _listeners.clear()
+
+
+atexit.register(_stop_listeners)
+
+
+def setup_logger(name, queued=None, max_bytes=None, log_format=None):
     """
     Configure and return a logger with consistent settings.
 
+    Calling it again for the same name returns the configured logger without
+    adding more handlers.
+
     Args:
         name (str): Name of the logger (typically __name__ from the calling module)
-        logs_path (str): Path to logs directory
+        queued (bool): Hand records to a background thread that does the
+            writing (default: LOG_QUEUE environment variable)
+        max_bytes (int): Rotate the log file at this size, 0 to never rotate
+            (default: LOG_MAX_BYTES environment variable)
+        log_format (str): "text" or "json" for JSON lines
+            (default: LOG_FORMAT environment variable)
 
     Returns:
         logging.Logger: Configured logger instance
     """
     logs_path = os.environ.get("LOGS_PATH", "./logs")
+    queued = _env_flag("LOG_QUEUE") if queued is None else queued
+    max_bytes = (
+        int(os.environ.get("LOG_MAX_BYTES", 0)) if max_bytes is None else max_bytes
+    )
+    backup_count = int(os.environ.get("LOG_BACKUP_COUNT", 5))
+    log_format = log_format or os.environ.get("LOG_FORMAT", "text")
+
+    # Create logger
+    logger = logging.getLogger(name)
+    if getattr(logger, "_configured_by_setup_logger", False):
+        return logger
 
     # Create directories if they don't exist
     try:
@@ -26,23 +89,46 @@ def setup_logger(name):
         print(f"Failed to create directory: {e}")
         raise
 
-    # Create logger
-    logger = logging.getLogger(name)
+    # Only the queued and rotating modes need logging.handlers, which is slow
+    # to import for short commands
+    if queued or max_bytes:
+        from logging import handlers  # pylint: disable=import-outside-toplevel
 
     # Configure logging format and handlers
-    formatter = logging.Formatter("%(asctime)s - %(levelname)s: %(message)s")
+    if log_format == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter("%(asctime)s - %(levelname)s: %(message)s")
 
     # File handler
-    file_handler = logging.FileHandler(f"{logs_path}/{name}.log")
+    if max_bytes:
+        file_handler = handlers.RotatingFileHandler(
+            f"{logs_path}/{name}.log", maxBytes=max_bytes, backupCount=backup_count
+        )
+    else:
+        file_handler = logging.FileHandler(f"{logs_path}/{name}.log")
     file_handler.setFormatter(formatter)
 
     # Console handler
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
 
-    # Add handlers to logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    # Add handlers to logger, behind a queue if requested so the caller never
+    # waits on a file write
+    if queued:
+        records = queue.SimpleQueue()
+        listener = handlers.QueueListener(
+            records, file_handler, console_handler, respect_handler_level=True
+        )
+        listener.start()
+        _listeners[name] = listener
+        queue_handler = handlers.QueueHandler(records)
+        queue_handler.prepare = _prepare
+        logger.addHandler(queue_handler)
+    else:
+        logger.addHandler(file_handler)
+        logger.addHandler(console_handler)
+    logger._configured_by_setup_logger = True
 
     # Set default level
     logger.setLevel(logging.INFO)
@@ -62,3 +148,11 @@ def setup_logger(name):
             print(f"Invalid logging level: {env_logging_level}. Defaulting to INFO.")
 
     return logger
+
+
+def flush_logger(name):
+    """Wait for a queued logger's background writer to write everything so far"""
+    listener = _listeners.get(name)
+    if listener:
+        listener.stop()
+        listener.start()
@@ -0,0 +1,165 @@
+"""
+Counters and latency histograms shared by the update script and the scraper,
+rendered in the Prometheus text format. A run can serve them on
+METRICS_PORT while it works and write them to METRICS_FILE when it ends, for
+example into node_exporter's textfile collector directory.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from data_config import atomic_write
+
+# Written when a run ends, "" = off
+METRICS_FILE = os.environ.get("METRICS_FILE", "")
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 0))  # Serves /metrics, 0 = off
+
+# Histogram bucket upper bounds in seconds, from a cached page to a large pull
+BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600)
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class Metrics:
+    """
+    A thread-safe set of counters and histograms, each keyed by name and labels
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.help = {}
+
+    def inc(self, name, value=1, help_text=None, **labels):
+        """Add value to a counter"""
+        with self.lock:
+            self.help.setdefault(name, help_text)
+            series = self.counters.setdefault(name, {})
+            key = _label_key(labels)
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, value, help_text=None, **labels):
+        """Record one value, usually seconds, in a histogram"""
+        with self.lock:
+            self.help.setdefault(name, help_text)
+            series = self.histograms.setdefault(name, {})
+            histogram = series.setdefault(
+                _label_key(labels),
+                {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0},
+            )
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram["buckets"][index] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    @contextmanager
+    def timer(self, name, help_text=None, **labels):
+        """Observe how long the with block took, even when it raises"""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - start, help_text, **labels)
+
+    def value(self, name, **labels):
+        """Return a counter's value, or a histogram's count, for tests and reports"""
+        with self.lock:
+            key = _label_key(labels)
+            if name in self.histograms:
+                return self.histograms[name].get(key, {"count": 0})["count"]
+            return self.counters.get(name, {}).get(key, 0)
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            for name, series in sorted(self.counters.items()):
+                if self.help.get(name):
+                    lines.append(f"# HELP {name} {self.help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+            for name, series in sorted(self.histograms.items()):
+                if self.help.get(name):
+                    lines.append(f"# HELP {name} {self.help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in sorted(series.items()):
+                    for bound, count in zip(self.buckets, histogram["buckets"]):
+                        labels = _format_labels(key, [("le", str(bound))])
+                        lines.append(f"{name}_bucket{labels} {count}")
+                    labels = _format_labels(key, [("le", "+Inf")])
+                    lines.append(f"{name}_bucket{labels} {histogram['count']}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {histogram['sum']}")
+                    lines.append(
+                        f"{name}_count{_format_labels(key)} {histogram['count']}"
+                    )
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write the metrics to a temp file and rename it into place"""
+        with atomic_write(path) as f:
+            f.write(self.render())
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve /metrics from a background thread and return the server"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+                pass
+
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+# The registry every module records into
+registry = Metrics()
+inc = registry.inc
+observe = registry.observe
+timer = registry.timer
+
+
+def start(port=None):
+    """Serve the shared registry on port (default METRICS_PORT) if one is set"""
+    port = METRICS_PORT if port is None else port
+    return registry.serve(port) if port else None
+
+
+def dump(path=None):
+    """Write the shared registry to path (default METRICS_FILE) if one is set"""
+    path = METRICS_FILE if path is None else path
+    if path:
+        registry.write(path)
+    return path
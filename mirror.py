@@ -0,0 +1,367 @@
+"""
+A pull-through mirror for the Ollama model registry that caches blobs by
+digest on local disk, so a fleet-wide update downloads each layer once
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+
+from data_config import DATA_DIR
+from logger_config import setup_logger
+from registry import OLLAMA_REGISTRY_URL
+
+# Set up logger
+logger = setup_logger(__name__)
+
+# Define constants
+MIRROR_PORT = int(os.environ.get("MIRROR_PORT", 8090))
+MIRROR_CACHE_DIR = Path(os.environ.get("MIRROR_CACHE_DIR", DATA_DIR / "blobs"))
+MIRROR_CACHE_SIZE = int(
+    os.environ.get("MIRROR_CACHE_SIZE", 100 * (1024**3))
+)  # Default: 100 GB
+CHUNK_SIZE = 1024 * 1024
+
+BLOB_PATH = re.compile(r"^/v2/(?P<repo>.+)/blobs/(?P<digest>sha256:[0-9a-f]{64})$")
+MANIFEST_PATH = re.compile(r"^/v2/(?P<repo>.+)/manifests/(?P<tag>[^/]+)$")
+RANGE_HEADER = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class BlobCache:
+    """
+    Content-addressed blob store with size-based LRU eviction.
+    A blob's modification time is bumped on every hit and used as its
+    last-access time.
+
+    A pull often reads a freshly fetched blob in several ranged requests, so
+    the first full copy served after a fetch is counted as part of that miss.
+    Only bytes served beyond it are saved.
+    """
+
+    def __init__(self, cache_dir, max_size, upstream=OLLAMA_REGISTRY_URL):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.upstream = upstream
+        self.session = requests.Session()
+        self.lock = threading.Lock()
+        self.fetch_locks = {}
+        self.owed = {}  # Digest -> bytes still to serve for its last fetch
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "bytes_fetched": 0,
+            "bytes_served": 0,
+            "bytes_saved": 0,
+        }
+
+    def path(self, digest):
+        return self.cache_dir / digest.replace(":", "-")
+
+    def count(self, **increments):
+        with self.lock:
+            for key, value in increments.items():
+                self.stats[key] += value
+
+    def get(self, repo, digest):
+        """
+        Return the path of a blob, fetching it from upstream first if it
+        isn't cached. Returns None if the blob can't be fetched.
+        """
+        with self.lock:
+            fetch_lock = self.fetch_locks.setdefault(digest, threading.Lock())
+
+        # Only one request downloads a given blob, the others wait for it
+        with fetch_lock:
+            path = self.path(digest)
+            if path.exists():
+                os.utime(path)
+                return path
+
+            if not self.fetch(repo, digest, path):
+                self.count(misses=1)
+                return None
+            with self.lock:
+                self.owed[digest] = path.stat().st_size
+            self.evict(keep=path)
+            return path
+
+    def record(self, digest, served):
+        """
+        Count a blob response of `served` bytes as a hit, or as a miss while
+        the blob's last fetch hasn't been served in full yet
+        """
+        with self.lock:
+            owed = self.owed.pop(digest, 0)
+            paid = min(owed, served)
+            if owed > paid:
+                self.owed[digest] = owed - paid
+            self.stats["misses" if owed else "hits"] += 1
+            self.stats["bytes_served"] += served
+            self.stats["bytes_saved"] += served - paid
+
+    def head(self, repo, digest):
+        """
+        Return a blob's size from upstream without downloading it, or None
+        """
+        url = f"{self.upstream}/v2/{repo}/blobs/{digest}"
+        try:
+            response = self.session.head(url, allow_redirects=True, timeout=30)
+        except requests.RequestException as e:
+            logger.error("Error checking %s: %s", digest, e)
+            return None
+        if response.status_code != 200 or "Content-Length" not in response.headers:
+            return None
+        return int(response.headers["Content-Length"])
+
+    def fetch(self, repo, digest, path):
+        """
+        Download a blob from upstream, verifying its digest before it enters
+        the cache
+        """
+        url = f"{self.upstream}/v2/{repo}/blobs/{digest}"
+        logger.info("Fetching %s from %s", digest, url)
+        sha256 = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".partial")
+        try:
+            with (
+                os.fdopen(fd, "wb") as f,
+                self.session.get(url, stream=True, timeout=60) as response,
+            ):
+                if response.status_code != 200:
+                    logger.error(
+                        "Failed to fetch %s. Status code: %d",
+                        digest,
+                        response.status_code,
+                    )
+                    return False
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    sha256.update(chunk)
+                    f.write(chunk)
+                    self.count(bytes_fetched=len(chunk))
+
+            if f"sha256:{sha256.hexdigest()}" != digest:
+                logger.error("Digest mismatch for %s, discarding", digest)
+                return False
+            os.replace(temp_path, path)
+            return True
+        except (requests.RequestException, OSError) as e:
+            logger.error("Error fetching %s: %s", digest, e)
+            return False
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def evict(self, keep=None):
+        """
+        Remove least recently used blobs until the cache fits its size limit
+        """
+        blobs = [
+            (entry.stat().st_mtime, entry.stat().st_size, entry)
+            for entry in self.cache_dir.glob("sha256-*")
+        ]
+        total = sum(size for _, size, _ in blobs)
+        for _, size, entry in sorted(blobs):
+            if total <= self.max_size:
+                break
+            if entry == keep:
+                continue
+            logger.info("Evicting %s (%d bytes)", entry.name, size)
+            entry.unlink(missing_ok=True)
+            with self.lock:
+                self.owed.pop(entry.name.replace("-", ":", 1), None)
+            total -= size
+            self.count(evictions=1)
+
+    def cache_bytes(self):
+        return sum(entry.stat().st_size for entry in self.cache_dir.glob("sha256-*"))
+
+
+def parse_range(header, size):
+    """
+    Parse a single "bytes=start-end" Range header into an inclusive
+    (start, end) tuple. Returns None for no range and False if unsatisfiable.
+    """
+    if not header:
+        return None
+    match = RANGE_HEADER.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return False
+    start, end = match.groups()
+    if start == "":
+        # Suffix range: the last N bytes
+        start, end = max(0, size - int(end)), size - 1
+    else:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def make_handler(cache):
+    """
+    Build the mirror's request handler around a BlobCache
+    """
+
+    class MirrorHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+            logger.debug("%s - %s", self.address_string(), format % args)
+
+        def send_json(self, status, data):
+            body = json.dumps(data).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        def do_HEAD(self):
+            self.do_GET()
+
+        def do_GET(self):
+            if self.path == "/mirror/stats":
+                self.send_json(200, dict(cache.stats, cache_bytes=cache.cache_bytes()))
+                return
+
+            match = BLOB_PATH.match(self.path)
+            if match:
+                self.serve_blob(match["repo"], match["digest"])
+                return
+
+            if MANIFEST_PATH.match(self.path):
+                self.proxy_manifest()
+                return
+
+            self.send_json(404, {"errors": [{"code": "NOT_FOUND"}]})
+
+        def proxy_manifest(self):
+            # Manifests are tiny and change when tags move, so always ask
+            try:
+                response = cache.session.get(
+                    f"{cache.upstream}{self.path}",
+                    headers={"Accept": self.headers.get("Accept", "*/*")},
+                    timeout=30,
+                )
+            except requests.RequestException as e:
+                logger.error("Error fetching manifest %s: %s", self.path, e)
+                self.send_json(502, {"errors": [{"code": "UPSTREAM_ERROR"}]})
+                return
+            self.send_response(response.status_code)
+            self.send_header(
+                "Content-Type",
+                response.headers.get("Content-Type", "application/json"),
+            )
+            self.send_header("Content-Length", str(len(response.content)))
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(response.content)
+
+        def serve_blob(self, repo, digest):
+            path = cache.path(digest)
+            if self.command == "HEAD" and not path.exists():
+                # Ollama checks a blob before its ranged GETs, so don't make
+                # the check wait for the whole download
+                self.head_blob(repo, digest)
+                return
+
+            path = cache.get(repo, digest)
+            if path is None:
+                self.send_json(404, {"errors": [{"code": "BLOB_UNKNOWN"}]})
+                return
+
+            size = path.stat().st_size
+            byte_range = parse_range(self.headers.get("Range"), size)
+            if byte_range is False:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.end_headers()
+                return
+
+            start, end = byte_range or (0, size - 1)
+            length = end - start + 1
+            self.send_response(206 if byte_range else 200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(length))
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("Docker-Content-Digest", digest)
+            if byte_range:
+                self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+            self.end_headers()
+            if self.command == "HEAD":
+                return
+
+            with open(path, "rb") as f:
+                f.seek(start)
+                remaining = length
+                while remaining > 0:
+                    chunk = f.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    remaining -= len(chunk)
+
+            cache.record(digest, length - remaining)
+
+        def head_blob(self, repo, digest):
+            size = cache.head(repo, digest)
+            if size is None:
+                self.send_json(404, {"errors": [{"code": "BLOB_UNKNOWN"}]})
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(size))
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("Docker-Content-Digest", digest)
+            self.end_headers()
+
+    return MirrorHandler
+
+
+def make_server(
+    port=MIRROR_PORT,
+    cache_dir=MIRROR_CACHE_DIR,
+    max_size=MIRROR_CACHE_SIZE,
+    upstream=OLLAMA_REGISTRY_URL,
+    address="0.0.0.0",
+):
+    """
+    Create the mirror HTTP server
+    """
+    cache = BlobCache(cache_dir, max_size, upstream=upstream)
+    server = ThreadingHTTPServer((address, port), make_handler(cache))
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    """
+    Main function to orchestrate the script execution.
+    """
+    server = make_server()
+    logger.info(
+        "Mirroring %s on port %d, caching up to %d bytes in %s",
+        OLLAMA_REGISTRY_URL,
+        MIRROR_PORT,
+        MIRROR_CACHE_SIZE,
+        MIRROR_CACHE_DIR,
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Numeric values for the library's display strings. The scraper stores them in
+library.json next to the raw strings so readers can sort and filter without
+parsing anything.
+"""
+
+import re
+
+# Days per unit for relative "updated" strings like "3 weeks ago"
+RELATIVE_UNITS = {
+    "second": 1 / 86400,
+    "minute": 1 / 1440,
+    "hour": 1 / 24,
+    "day": 1,
+    "week": 7,
+    "month": 30,
+    "year": 365,
+}
+
+# Sizes like "8b", "1.5b", "270m", "8x7b" (mixture of experts) or "e2b"
+# (effective parameters), optionally followed by a suffix like "-a3b"
+PARAMETER_SIZE = re.compile(r"(?:(\d+)x)?e?(\d+(?:\.\d+)?)([kmbt])(?![a-z])")
+PARAMETER_UNITS = {"k": 10**3, "m": 10**6, "b": 10**9, "t": 10**12}
+
+RELATIVE_TIME = re.compile(
+    r"(\d+|an?)\s+(second|minute|hour|day|week|month|year)s?\s+ago"
+)
+
+
+def relative_days(time_str):
+    """Convert a relative time string like "3 weeks ago" to days, or None"""
+    if not time_str:
+        return None
+    if time_str.strip().lower() == "yesterday":
+        return 1
+    match = RELATIVE_TIME.match(time_str.strip().lower())
+    if not match:
+        return None
+    number = 1 if match.group(1) in ("a", "an") else int(match.group(1))
+    return number * RELATIVE_UNITS[match.group(2)]
+
+
+def relative_resolution(time_str):
+    """
+    Days covered by one unit of a relative time string, e.g. 30 for
+    "5 months ago", or None
+    """
+    if not time_str:
+        return None
+    if time_str.strip().lower() == "yesterday":
+        return 1
+    match = RELATIVE_TIME.match(time_str.strip().lower())
+    return RELATIVE_UNITS[match.group(2)] if match else None
+
+
+def updated_timestamp(time_str, scraped_at):
+    """Turn a relative "last_updated" string into a Unix timestamp, or None"""
+    days = relative_days(time_str)
+    return int(scraped_at - days * 86400) if days is not None else None
+
+
+def parameter_count(size):
+    """
+    Convert a parameter size tag like "8x7b" or "270m" to a number of
+    parameters, or None
+    """
+    match = PARAMETER_SIZE.match(size.strip().lower()) if size else None
+    if not match:
+        return None
+    experts = int(match.group(1) or 1)
+    return round(experts * float(match.group(2)) * PARAMETER_UNITS[match.group(3)])
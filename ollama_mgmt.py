@@ -0,0 +1,113 @@
+"""
+One command to show the library, update models, scrape ollama.com and check status.
+
+Each subcommand imports what it needs only once it has been chosen, so
+`ollama-mgmt library` never loads Scrapy, ollama or requests.
+"""
+
+# pylint: disable=import-outside-toplevel
+
+import argparse
+import os
+import sys
+
+OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://localhost:11434")
+OPEN_WEBUI_URL = os.environ.get("OPEN_WEBUI_URL", "http://localhost:9595")
+
+
+def run_library(args):
+    """Show the model library"""
+    import library
+
+    library.main(args)
+
+
+def run_update(args):
+    """Pull updates for the installed models"""
+    import update
+
+    update.main(args)
+
+
+def run_scrape(args):
+    """
+    Crawl the Ollama library into library.json
+
+    Arguments are passed to `scrapy crawl ollama_models`, or to the sharded
+    crawl when they include --shards.
+    """
+    os.environ.setdefault("SCRAPY_SETTINGS_MODULE", "ollama_scraper.settings")
+    if any(arg == "--shards" or arg.startswith("--shards=") for arg in args):
+        from ollama_scraper import sharding
+
+        sharding.main(args)
+        return
+
+    from scrapy.cmdline import execute
+
+    execute(["scrapy", "crawl", "ollama_models", *args])
+
+
+def run_benchmark(args):
+    """Measure each installed model's load time, first token and tokens/s"""
+    import inference_benchmark
+
+    inference_benchmark.main(args)
+
+
+def run_daemon(args):
+    """Poll the library and pull installed models that changed upstream"""
+    import daemon
+
+    daemon.main(args)
+
+
+def check(url):
+    """Return the body of a GET request to url, or None if nothing answers"""
+    import urllib.error
+    import urllib.request
+
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.read().decode(errors="replace").strip()
+    except (urllib.error.URLError, OSError):
+        return None
+
+
+def run_status(args):
+    """Show whether Ollama and Open WebUI are running"""
+    argparse.ArgumentParser(prog="ollama-mgmt status").parse_args(args)
+    ollama = check(OLLAMA_URL)
+    open_webui = check(f"{OPEN_WEBUI_URL}/health")
+    print(f"ollama     : {ollama or 'down'}")
+    print(f"open-webui : {'Open-WebUI is running' if open_webui else 'down'}")
+    return 0 if ollama is not None else 1
+
+
+COMMANDS = {
+    "library": run_library,
+    "update": run_update,
+    "scrape": run_scrape,
+    "status": run_status,
+    "daemon": run_daemon,
+    "benchmark": run_benchmark,
+}
+
+
+def main(argv=None):
+    """Dispatch to a subcommand, handing it the rest of the arguments"""
+    parser = argparse.ArgumentParser(
+        prog="ollama-mgmt", description=__doc__.strip().splitlines()[0]
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, command in COMMANDS.items():
+        # Each subcommand parses its own options, --help included
+        subparsers.add_parser(
+            name, help=command.__doc__.strip().splitlines()[0], add_help=False
+        )
+    args, rest = parser.parse_known_args(argv)
+    sys.exit(COMMANDS[args.command](rest))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import os
+
+from scrapy import signals
+
+import metrics
+
+
+class MetricsExtension:
+    """
+    Record every response's download latency and size in the shared metrics,
+    serve them on METRICS_PORT during the crawl and write them to
+    METRICS_FILE once the pipelines have finished
+    """
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        self.path = settings.get("METRICS_FILE") or metrics.METRICS_FILE
+        self.port = settings.getint("METRICS_PORT") or metrics.METRICS_PORT
+        self.server = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        extension = cls(crawler)
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.response_received, signal=signals.response_received)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        return extension
+
+    def shard_suffix(self, spider):
+        shards = getattr(spider, "shards", 1)
+        return spider.shard if shards > 1 else None
+
+    def spider_opened(self, spider):
+        if self.port:
+            # Shards run side by side, so each gets its own port
+            self.server = metrics.start(self.port + (self.shard_suffix(spider) or 0))
+
+    def response_received(self, response, request, spider):
+        callback = getattr(request.callback, "__name__", "parse")
+        cached = "cached" in response.flags
+        metrics.inc(
+            "ollama_scraper_responses_total",
+            help_text="Responses by callback and status",
+            callback=callback,
+            status=response.status,
+            cached=cached,
+        )
+        metrics.inc(
+            "ollama_scraper_response_bytes_total",
+            len(response.body),
+            "Response body bytes by callback",
+            callback=callback,
+            cached=cached,
+        )
+        # Cache hits never reach the download handler, so they have no latency
+        if "download_latency" in request.meta:
+            metrics.observe(
+                "ollama_scraper_download_seconds",
+                request.meta["download_latency"],
+                "Download latency by callback",
+                callback=callback,
+            )
+
+    def spider_closed(self, spider):
+        if self.path:
+            shard = self.shard_suffix(spider)
+            path = self.path
+            if shard is not None:
+                root, extension = os.path.splitext(self.path)
+                path = f"{root}-shard-{shard}{extension}"
+            metrics.dump(path)
+            spider.logger.info("Metrics written to %s", path)
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
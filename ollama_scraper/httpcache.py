@@ -0,0 +1,66 @@
+# HTTP cache policy for the ollama_models crawl
+#
+# See documentation in:
+# https://docs.scrapy.org/en/latest/topics/downloader-middleware.html#httpcache-middleware-settings
+
+from time import time
+
+from scrapy.downloadermiddlewares.httpcache import HttpCacheMiddleware
+from scrapy.extensions.httpcache import RFC2616Policy, rfc1123_to_epoch
+
+# Scrapy 2.19 stores a revalidated page again itself, earlier releases don't
+SCRAPY_STORES_REVALIDATED = hasattr(HttpCacheMiddleware, "_freshen_cached_response")
+
+
+class RevalidatingCachePolicy(RFC2616Policy):
+    """
+    Serve cached pages for HTTPCACHE_FRESHNESS_SECS, then revalidate them
+    with If-None-Match/If-Modified-Since so unchanged pages come back as a
+    small 304 instead of a full download.
+
+    ollama.com doesn't send useful expiry headers, so the freshness window
+    is ours rather than the server's.
+    """
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        self.freshness_secs = settings.getint("HTTPCACHE_FRESHNESS_SECS", 3600)
+
+    def should_cache_response(self, response, request):
+        # Keep every full page: even without validators it serves the
+        # freshness window, and with them it can be revalidated later
+        if response.status == 200:
+            return b"no-store" not in self._parse_cachecontrol(response)
+        return super().should_cache_response(response, request)
+
+    def is_cached_response_fresh(self, cachedresponse, request):
+        date = rfc1123_to_epoch(cachedresponse.headers.get(b"Date"))
+        if date and time() - date < self.freshness_secs:
+            return True
+
+        self._set_conditional_validators(request, cachedresponse)
+        return False
+
+
+class RevalidatingCacheMiddleware(HttpCacheMiddleware):
+    """
+    Store a cached page again after a successful revalidation, with the
+    Date and validators of the 304, so the next HTTPCACHE_FRESHNESS_SECS
+    window starts from the revalidation rather than the last full download.
+    """
+
+    FRESHENED_HEADERS = (b"Date", b"ETag", b"Last-Modified", b"Cache-Control", b"Expires")
+
+    def process_response(self, request, response, spider=None):
+        cachedresponse = request.meta.get("cached_response")
+        # Newer Scrapy releases no longer pass the spider
+        args = (request, response) if spider is None else (request, response, spider)
+        result = super().process_response(*args)
+        if SCRAPY_STORES_REVALIDATED or response.status != 304 or result is not cachedresponse:
+            return result
+
+        for header in self.FRESHENED_HEADERS:
+            if header in response.headers:
+                cachedresponse.headers[header] = response.headers[header]
+        self.storage.store_response(self.crawler.spider, request, cachedresponse)
+        return result
@@ -10,3 +10,18 @@ class OllamaScraperItem(scrapy.Item):
     # define the fields for your item here like:
     # name = scrapy.Field()
     pass
+
+
+class ModelContext:
+    """ Listing data shared by every variant request of one model """
+
+    __slots__ = ("name", "description", "url", "parameter_sizes", "capabilities", "priority")
+
+    def __init__(self, name, description, url, parameter_sizes, capabilities, priority=0):
+        self.name = name
+        self.description = description
+        self.url = url
+        self.parameter_sizes = tuple(parameter_sizes)
+        self.capabilities = tuple(capabilities)
+        self.priority = priority  # Scheduler priority for the model's requests
+
@@ -3,7 +3,12 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
+import asyncio
+import itertools
+from collections import deque
+
 from scrapy import signals
+from scrapy.exceptions import IgnoreRequest, NotConfigured
 
 # useful for handling different item types with a single interface
 from itemadapter import is_item, ItemAdapter
@@ -56,48 +61,230 @@ class OllamaScraperSpiderMiddleware:
         spider.logger.info("Spider opened: %s" % spider.name)
 
 
-class OllamaScraperDownloaderMiddleware:
-    # Not all methods need to be defined. If a method is not defined,
-    # scrapy acts as if the downloader middleware does not modify the
-    # passed objects.
+class AIMDController:
+    """
+    Additive-increase/multiplicative-decrease concurrency for one download slot.
+
+    Concurrency grows by one after every `window` healthy responses and is
+    halved when a response is throttled (429/503), fails, or comes back much
+    slower than the fastest latency seen so far. Decreases are spaced at least
+    one window apart so a burst of failures from the same flight only counts once.
+    """
+
+    def __init__(self, start, minimum, maximum, window, latency_tolerance):
+        self.concurrency = start
+        self.minimum = minimum
+        self.maximum = maximum
+        self.window = window
+        self.latency_tolerance = latency_tolerance
+        self.latency = None  # Smoothed latency
+        self.baseline = None  # Fastest smoothed latency seen
+        self.healthy = 0  # Healthy responses since the last change
+        self.since_decrease = window
+        self.responses = 0
+        self.throttled = 0
+        self.errors = 0
+
+    def record(self, latency=None, throttled=False, error=False):
+        """ Record one outcome and return the reason for a change, or None """
+        self.responses += 1
+        self.since_decrease += 1
+        self.throttled += throttled
+        self.errors += error
+
+        # Throttled and failed responses come back fast, so keep them out of
+        # the latency figures
+        slow = False
+        if latency is not None and not (throttled or error):
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            self.baseline = self.latency if self.baseline is None else min(self.baseline, self.latency)
+            slow = self.latency > self.baseline * self.latency_tolerance
+
+        if throttled or error or slow:
+            self.healthy = 0
+            if self.since_decrease < self.window or self.concurrency <= self.minimum:
+                return None
+            self.concurrency = max(self.minimum, self.concurrency // 2)
+            self.since_decrease = 0
+            if throttled:
+                return "throttled"
+            return "error" if error else "latency %.0f ms" % (self.latency * 1000)
+
+        self.healthy += 1
+        if self.healthy >= self.window and self.concurrency < self.maximum:
+            self.concurrency += 1
+            self.healthy = 0
+            return "healthy"
+        return None
+
+
+class AdaptiveConcurrencyMiddleware:
+    """
+    Tune each domain's in-flight request limit with an AIMDController,
+    looking for the fastest rate the site tolerates.
+
+    The limit is enforced here rather than through the downloader slot's
+    concurrency, which Scrapy only checks loosely while scheduling transfers.
+    Requests wait in process_request() until their domain has a free place.
+
+    A place is given back as soon as the download finishes, from the
+    downloader's own signals, so middlewares further down the response path
+    (a redirect, or an IgnoreRequest for too many of them) can't keep it.
+    Redirected and retried requests queue for a new place like any other.
+    """
+
+    THROTTLE_CODES = {429, 503}
+    META_KEY = "_adaptive_concurrency_slot"
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        settings = crawler.settings
+        self.start = settings.getint("ADAPTIVE_CONCURRENCY_START", 4)
+        self.minimum = settings.getint("ADAPTIVE_CONCURRENCY_MIN", 1)
+        self.maximum = settings.getint("ADAPTIVE_CONCURRENCY_MAX", 32)
+        self.window = settings.getint("ADAPTIVE_CONCURRENCY_WINDOW", 8)
+        self.latency_tolerance = settings.getfloat("ADAPTIVE_CONCURRENCY_LATENCY_TOLERANCE", 3.0)
+        self.controllers = {}
+        self.in_flight = {}
+        self.waiters = {}
+        self.held = {}  # Place token -> domain key, for every place taken
+        self.tokens = itertools.count()
+        self.closed = False
 
     @classmethod
     def from_crawler(cls, crawler):
-        # This method is used by Scrapy to create your spiders.
-        s = cls()
-        crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
+        if not crawler.settings.getbool("ADAPTIVE_CONCURRENCY_ENABLED"):
+            raise NotConfigured
+        s = cls(crawler)
+        crawler.signals.connect(s.response_downloaded, signal=signals.response_downloaded)
+        crawler.signals.connect(s.request_left_downloader, signal=signals.request_left_downloader)
+        crawler.signals.connect(s.request_dropped, signal=signals.request_dropped)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
         return s
 
-    def process_request(self, request, spider):
-        # Called for each request that goes through the downloader
-        # middleware.
+    def controller(self, key):
+        if key not in self.controllers:
+            self.controllers[key] = AIMDController(
+                self.start, self.minimum, self.maximum, self.window, self.latency_tolerance
+            )
+            self.in_flight[key] = 0
+            self.waiters[key] = deque()
+        return self.controllers[key]
+
+    def wake(self, key):
+        """ Let waiting requests go while the domain has free places """
+        free = self.controllers[key].concurrency - self.in_flight[key]
+        while free > 0 and self.waiters[key]:
+            waiter = self.waiters[key].popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    async def process_request(self, request, spider=None):
+        # A redirect or retry copies the meta of the request it came from,
+        # place token included. That request is finished, so any place it
+        # still holds (a cached response being redirected) is given back.
+        self.release(request)
+        if self.closed:
+            raise IgnoreRequest("Spider closed")
 
-        # Must either:
-        # - return None: continue processing this request
-        # - or return a Response object
-        # - or return a Request object
-        # - or raise IgnoreRequest: process_exception() methods of
-        #   installed downloader middleware will be called
+        key = self.crawler.engine.downloader.get_slot_key(request)
+        controller = self.controller(key)
+        while self.in_flight[key] >= controller.concurrency:
+            waiter = asyncio.get_running_loop().create_future()
+            self.waiters[key].append(waiter)
+            await waiter
+        self.in_flight[key] += 1
+        token = next(self.tokens)
+        self.held[token] = key
+        request.meta[self.META_KEY] = token
         return None
 
-    def process_response(self, request, response, spider):
-        # Called with the response returned from the downloader.
+    def release(self, request, **outcome):
+        key = self.held.pop(request.meta.pop(self.META_KEY, None), None)
+        if key is None:
+            return
+        self.in_flight[key] -= 1
+
+        controller = self.controllers[key]
+        before = controller.concurrency
+        reason = controller.record(**outcome) if outcome else None
+        if reason:
+            self.crawler.spider.logger.info(
+                "Concurrency for %s: %d -> %d (%s, %d/%d throttled, %d errors)",
+                key,
+                before,
+                controller.concurrency,
+                reason,
+                controller.throttled,
+                controller.responses,
+                controller.errors,
+            )
+        self.wake(key)
+
+    def response_downloaded(self, response, request, spider):
+        self.release(
+            request,
+            latency=request.meta.get("download_latency"),
+            throttled=response.status in self.THROTTLE_CODES,
+            error=response.status >= 500 and response.status not in self.THROTTLE_CODES,
+        )
 
-        # Must either;
-        # - return a Response object
-        # - return a Request object
-        # - or raise IgnoreRequest
+    def request_left_downloader(self, request, spider):
+        # Still held after response_downloaded only if the download failed
+        self.release(request, error=True)
+
+    def request_dropped(self, request, spider):
+        # e.g. a redirect to a page the dupefilter has already seen
+        self.release(request)
+
+    def process_response(self, request, response, spider=None):
+        # Only cached responses, which never reach the downloader, still hold
+        # a place here. They say nothing about the server.
+        self.release(request)
         return response
 
-    def process_exception(self, request, exception, spider):
-        # Called when a download handler or a process_request()
-        # (from other downloader middleware) raises an exception.
+    def process_exception(self, request, exception, spider=None):
+        # Failures before the download, e.g. from a middleware further down
+        self.release(request)
 
-        # Must either:
-        # - return None: continue processing this exception
-        # - return a Response object: stops process_exception() chain
-        # - return a Request object: stops process_exception() chain
-        pass
+    def spider_closed(self, spider):
+        # Nothing more will be downloaded, so fail whatever is still waiting
+        self.closed = True
+        for waiters in self.waiters.values():
+            while waiters:
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    waiter.set_exception(IgnoreRequest("Spider closed"))
+        for key, controller in self.controllers.items():
+            spider.logger.info(
+                "Adaptive concurrency for %s settled at %d after %d responses "
+                "(%d throttled, %d errors)",
+                key,
+                controller.concurrency,
+                controller.responses,
+                controller.throttled,
+                controller.errors,
+            )
 
-    def spider_opened(self, spider):
-        spider.logger.info("Spider opened: %s" % spider.name)
+
+class CrawlDeadlineMiddleware:
+    """
+    Drop model page requests once the spider's crawl time budget has run out,
+    so the crawl winds down on time. Requests are scheduled by priority, so
+    the ones left over are the least important.
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def process_request(self, request, spider=None):
+        spider = self.crawler.spider
+        if "model_slug" in request.meta and spider.past_deadline():
+            spider.skip_request(request)
+            raise IgnoreRequest("Crawl time budget ran out")
+        return None
@@ -0,0 +1,118 @@
+"""
+Parsers for the library listing and the model variant pages.
+
+"css" is the original backend built on Scrapy's CSS selectors, which runs one
+selector per field per entry. "lxml" finds the entries with a precompiled
+XPath and then walks each entry's element tree once, reading every field on
+the way. Both return the same values.
+"""
+
+import re
+
+from lxml import etree
+
+SIZE_GB = re.compile(r"([\d.]+)\s*GB")
+
+# Precompiled once instead of translating CSS to XPath on every call
+LISTING_ENTRIES = etree.XPath("//a[starts-with(@href, '/library/')]")
+
+
+def listing_entry(name, description, href, parameter_sizes, capabilities, last_updated):
+    """ Build a listing entry with the whitespace and case normalized """
+    return {
+        "name": name.strip() if name else name,
+        "description": description.strip() if description else description,
+        "href": href,
+        "parameter_sizes": [size.strip().lower() for size in parameter_sizes],
+        "capabilities": [cap.strip().lower() for cap in capabilities],
+        "last_updated": last_updated.strip() if last_updated else None,
+    }
+
+
+def variant_size(size_text):
+    return float(size_text) if size_text else None
+
+
+def css_listing(response):
+    """ Extract the listing entries with one CSS selector per field """
+    entries = []
+    for model in response.css("a[href^='/library/']"):
+        entries.append(listing_entry(
+            model.css("span.group-hover\\:underline::text").get(),
+            model.css("p::text").get(),
+            model.attrib["href"],
+            model.css("span[x-test-size]::text").getall(),
+            model.css("span[x-test-capability]::text").getall(),
+            model.css("span[x-test-updated]::text").get(),
+        ))
+    return entries
+
+
+def css_variant(response):
+    """ Extract (size_gb, last_updated) from a variant page with CSS selectors """
+    size_text = response.css("p::text").re_first(SIZE_GB)
+    last_updated = response.css("span[x-test-updated]::text").get()
+    return variant_size(size_text), last_updated.strip() if last_updated else None
+
+
+def text_nodes(element):
+    """ The element's own text nodes, like the ::text pseudo-element """
+    if element.text is not None:
+        yield element.text
+    for child in element:
+        if child.tail is not None:
+            yield child.tail
+
+
+def first_text(element):
+    return next(text_nodes(element), None)
+
+
+def lxml_listing(response):
+    """ Extract the listing entries in a single walk over each entry """
+    entries = []
+    for model in LISTING_ENTRIES(response.selector.root):
+        name = description = last_updated = None
+        sizes = []
+        capabilities = []
+        for element in model.iter("span", "p"):
+            attrib = element.attrib
+            if element.tag == "p":
+                if description is None:
+                    description = first_text(element)
+            elif "x-test-size" in attrib:
+                sizes.extend(text_nodes(element))
+            elif "x-test-capability" in attrib:
+                capabilities.extend(text_nodes(element))
+            elif "x-test-updated" in attrib:
+                if last_updated is None:
+                    last_updated = first_text(element)
+            elif name is None and "group-hover:underline" in attrib.get("class", "").split():
+                name = first_text(element)
+        entries.append(listing_entry(name, description, model.get("href"), sizes, capabilities, last_updated))
+    return entries
+
+
+def lxml_variant(response):
+    """ Extract (size_gb, last_updated) from a variant page in a single walk """
+    size_text = last_updated = None
+    for element in response.selector.root.iter("span", "p"):
+        if element.tag == "p":
+            if size_text is None:
+                for text in text_nodes(element):
+                    match = SIZE_GB.search(text)
+                    if match:
+                        size_text = match.group(1)
+                        break
+        elif last_updated is None and "x-test-updated" in element.attrib:
+            last_updated = first_text(element)
+        if size_text is not None and last_updated is not None:
+            break
+    return variant_size(size_text), last_updated.strip() if last_updated else None
+
+
+# Backend name -> (listing parser, variant parser)
+PARSERS = {
+    "css": (css_listing, css_variant),
+    "lxml": (lxml_listing, lxml_variant),
+}
@@ -1,16 +1,186 @@
 import json
+import logging
+import os
+import sqlite3
+import time
+
+import metrics
+from data_config import atomic_write
+from library_index import write_index
+from normalize import parameter_count, updated_timestamp
+
+
+def write_json_atomic(path, records):
+    """ Write records as a JSON array to a temp file, then rename it into place """
+    with atomic_write(path) as f:
+        # Same layout as json.dump(list, f, indent=4), one record at a time
+        f.write("[")
+        written = 0
+        for record in records:
+            f.write("," if written else "")
+            f.write("\n    " + json.dumps(record, indent=4).replace("\n", "\n    "))
+            written += 1
+        f.write("\n]" if written else "]")
+
+
+def listing_order(records, listing_names, sizes=None):
+    """
+    Order records as the listing shows them, whatever order their responses
+    arrived in. sizes maps a model name to its listed parameter sizes.
+    """
+    position = {name: index for index, name in enumerate(listing_names)}
+    ordered = sorted(records, key=lambda record: position.get(record["name"], len(position)))
+    for record in ordered:
+        listed = (sizes or {}).get(record["name"])
+        if listed:
+            found = record["parameter_sizes"]
+            order = [size for size in listed if size in found] + [size for size in found if size not in listed]
+            record["parameter_sizes"] = {size: found[size] for size in order}
+            if "parameter_counts" in record:
+                counts = record["parameter_counts"]
+                record["parameter_counts"] = {size: counts.get(size) for size in order}
+    return ordered
+
+
+def normalize_record(record, scraped_at):
+    """
+    Return a copy of a whole record with its numeric fields computed from the
+    raw strings: an absolute updated_at and each size's parameter count
+    """
+    return dict(
+        record,
+        updated_at=updated_timestamp(record.get("last_updated"), scraped_at),
+        parameter_counts={size: parameter_count(size) for size in record.get("parameter_sizes", {})},
+    )
+
+
+def index_records(index_path, records, logger):
+    """ Rebuild the SQLite index of library.json; the JSON stays the source of truth """
+    try:
+        count = write_index(index_path, records)
+        logger.info("Indexed %d models in %s", count, index_path)
+    except (sqlite3.Error, OSError) as e:
+        logger.warning("Failed to update the library index %s: %s", index_path, e)
+
+
+def merge_shards(paths, output_path, index_path=None, logger=None):
+    """
+    Merge the partial outputs of a sharded crawl into one library.json and
+    return the stats each shard reported
+    """
+    pipeline = MergeModelsPipeline(output_path)
+    listing_names = []
+    shard_stats = []
+    for path in sorted(paths):
+        with open(path, "r") as f:
+            partial = json.load(f)
+        # Every shard reads the whole listing, so any one of them has its order
+        listing_names = listing_names or partial["listing"]
+        for record in partial["models"]:
+            pipeline.merge_record(record)
+        shard_stats.append(dict(partial["stats"], shard=partial["shard"]))
+
+    records = listing_order(pipeline.models.values(), listing_names)
+    write_json_atomic(output_path, records)
+    if index_path:
+        index_records(index_path, records, logger or logging.getLogger(__name__))
+    return shard_stats
+
 
 class MergeModelsPipeline:
-    def __init__(self):
+    def __init__(self, output_path="./data/library.json", journal_path=None, streaming=False, index_path=None):
         self.models = {}
+        self.output_path = output_path
+        self.index_path = index_path  # SQLite index kept next to the JSON, optional
+
+        # Streaming mode appends each finished model to a JSONL journal and only
+        # keeps models that are still waiting for variants in memory
+        self.streaming = streaming
+        self.journal_path = journal_path or "./data/library.jsonl"
+        self.journal = None
+        self.journaled = set()
+
+        # Counts for a shard's partial output
+        self.variants = 0
+        self.started = None
+
+        # Relative "3 days ago" dates are turned into timestamps against this
+        self.scraped_at = time.time()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        return cls(
+            output_path=settings.get("LIBRARY_OUTPUT", "./data/library.json"),
+            journal_path=settings.get("LIBRARY_JOURNAL", "./data/library.jsonl"),
+            streaming=settings.getbool("LIBRARY_STREAMING"),
+            index_path=settings.get("LIBRARY_INDEX") or None,
+        )
+
+    def open_spider(self, spider):
+        self.started = time.monotonic()
+        if not self.streaming:
+            return
+
+        # Resume from a journal left behind by an interrupted crawl
+        for record in self.read_journal():
+            self.journaled.add(record["name"])
+        if self.journaled:
+            spider.logger.info("Resuming with %d models from the journal", len(self.journaled))
+        spider.journaled_models = self.journaled
+
+        os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+        self.journal = open(self.journal_path, "a+")
+        # Don't append onto a line torn by a crash
+        if self.journal.tell():
+            self.journal.seek(self.journal.tell() - 1)
+            if self.journal.read(1) != "\n":
+                self.journal.write("\n")
+
+    def read_journal(self):
+        """ Yield the complete records in the journal, skipping a torn last line """
+        try:
+            with open(self.journal_path, "r") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            return
+
+    def write_journal(self, record):
+        self.journal.write(json.dumps(record) + "\n")
+        self.journal.flush()
+        self.journaled.add(record["name"])
+        self.models.pop(record["name"], None)
+
+    def merge_record(self, record):
+        """ Merge a whole model record, keeping the first one's model-level fields """
+        model = self.models.setdefault(record["name"], dict(record, parameter_sizes={}, parameter_counts={}))
+        model["parameter_sizes"].update(record["parameter_sizes"])
+        model["parameter_counts"].update((size, parameter_count(size)) for size in record["parameter_sizes"])
 
     def process_item(self, item, spider):
+        # Unchanged models from an incremental crawl arrive as whole records
+        # whose listing text was just refreshed
+        if "record" in item:
+            record = normalize_record(item["record"], self.scraped_at)
+            if self.streaming:
+                self.write_journal(record)
+            else:
+                self.merge_record(record)
+            return item
+
+        self.variants += 1
+
         model_name = item["name"]
         model_desc = item["description"]
         model_url = item["url"]
         param_size = item["parameter_size"]
         size_gb = item["size_gb"]
         last_updated = item["last_updated"]
+        capabilities = item["capabilities"]
 
         # If model is new, initialize it
         if model_name not in self.models:
@@ -19,17 +189,89 @@ class MergeModelsPipeline:
                 "description": model_desc,
                 "url": model_url,
                 "last_updated": last_updated,  # Store last updated at the model level
-                "parameter_sizes": {}
+                "updated_at": updated_timestamp(last_updated, self.scraped_at),
+                "capabilities": capabilities,
+                "parameter_sizes": {},
+                "parameter_counts": {}
             }
 
         # Add parameter size mapping
         self.models[model_name]["parameter_sizes"][param_size] = size_gb
+        self.models[model_name]["parameter_counts"][param_size] = parameter_count(param_size)
+
+        # Journal the model once all of its variants have arrived
+        if self.streaming and len(self.models[model_name]["parameter_sizes"]) >= item.get("variant_count", 1):
+            self.write_journal(self.models[model_name])
 
         return item  # Scrapy requires returning the item
 
-    def close_spider(self, spider):
-        # Save merged output when Scrapy finishes
-        with open("./data/library.json", "w") as f:
-            json.dump(list(self.models.values()), f, indent=4)
+    def settle_skipped(self, spider):
+        """
+        Swap the models a crawl deadline cut short for their previous record,
+        or leave them out, so library.json never holds half a model
+        """
+        previous = getattr(spider, "previous_models", {})
+        for name in getattr(spider, "skipped_models", ()):
+            self.models.pop(name, None)
+            if name in previous and name not in self.journaled:
+                self.merge_record(previous[name])
 
+    def close_spider(self, spider):
+        with metrics.timer("ollama_scraper_library_write_seconds", "Time to write the library at the end of a crawl"):
+            self.write_output(spider)
         spider.logger.info("✅ Data saved to library.json")
+
+    def write_output(self, spider):
+        self.settle_skipped(spider)
+        if self.streaming:
+            # Keep models that never got all their variants rather than lose them
+            for record in list(self.models.values()):
+                self.write_journal(record)
+            self.journal.close()
+            self.compact_journal()
+            if self.index_path:
+                index_records(self.index_path, self.latest_journal_records(), spider.logger)
+            os.remove(self.journal_path)
+        elif getattr(spider, "shards", 1) > 1:
+            self.write_partial(spider)
+        else:
+            # Save merged output when Scrapy finishes
+            records = self.ordered_models(spider)
+            write_json_atomic(self.output_path, records)
+            if self.index_path:
+                index_records(self.index_path, records, spider.logger)
+
+    def ordered_models(self, spider):
+        sizes = {
+            context.name: context.parameter_sizes
+            for context in getattr(spider, "model_contexts", {}).values()
+        }
+        return listing_order(self.models.values(), getattr(spider, "listing_names", []), sizes)
+
+    def write_partial(self, spider):
+        """ Write one shard's models with what merge_shards needs to combine them """
+        partial = {
+            "shard": spider.shard,
+            "shards": spider.shards,
+            "listing": getattr(spider, "listing_names", []),
+            "models": self.ordered_models(spider),
+            "stats": {
+                "models": len(self.models),
+                "variants": self.variants,
+                "elapsed": round(time.monotonic() - self.started, 3),
+            },
+        }
+        with atomic_write(self.output_path) as f:
+            json.dump(partial, f, indent=4)
+
+    def latest_journal_records(self):
+        """ Yield the journal's records, keeping only the last one per model """
+        last_line = {}
+        for index, record in enumerate(self.read_journal()):
+            last_line[record["name"]] = index
+        keep = set(last_line.values())
+        return (record for index, record in enumerate(self.read_journal()) if index in keep)
+
+    def compact_journal(self):
+        """ Rewrite the journal as library.json, keeping the last record per model """
+        write_json_atomic(self.output_path, self.latest_journal_records())
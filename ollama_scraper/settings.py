@@ -20,7 +20,20 @@ NEWSPIDER_MODULE = "ollama_scraper.spiders"
 ROBOTSTXT_OBEY = True
 
 # Configure maximum concurrent requests performed by Scrapy (default: 16)
-#CONCURRENT_REQUESTS = 32
+CONCURRENT_REQUESTS = 32
+# AdaptiveConcurrencyMiddleware sets the real per-domain limit
+CONCURRENT_REQUESTS_PER_DOMAIN = 32
+
+# Adjust per-domain concurrency from observed latency, 429s and errors
+# (additive increase, multiplicative decrease) between MIN and MAX
+ADAPTIVE_CONCURRENCY_ENABLED = True
+ADAPTIVE_CONCURRENCY_START = 4
+ADAPTIVE_CONCURRENCY_MIN = 1
+ADAPTIVE_CONCURRENCY_MAX = 32
+# Healthy responses needed before adding one more request in flight
+ADAPTIVE_CONCURRENCY_WINDOW = 8
+# Back off when smoothed latency exceeds this multiple of the best seen
+ADAPTIVE_CONCURRENCY_LATENCY_TOLERANCE = 3.0
 
 # Configure a delay for requests for the same website (default: 0)
 # See https://docs.scrapy.org/en/latest/topics/settings.html#download-delay
@@ -50,15 +63,25 @@ ROBOTSTXT_OBEY = True
 
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
-#DOWNLOADER_MIDDLEWARES = {
-#    "ollama_scraper.middlewares.OllamaScraperDownloaderMiddleware": 543,
-#}
+# AdaptiveConcurrencyMiddleware sits above RetryMiddleware (550) so it sees
+# 429s before they're retried. CrawlDeadlineMiddleware comes first so dropped
+# requests never wait for a place. RevalidatingCacheMiddleware replaces
+# Scrapy's HttpCacheMiddleware in the same place.
+DOWNLOADER_MIDDLEWARES = {
+    "ollama_scraper.middlewares.CrawlDeadlineMiddleware": 540,
+    "ollama_scraper.middlewares.AdaptiveConcurrencyMiddleware": 560,
+    "scrapy.downloadermiddlewares.httpcache.HttpCacheMiddleware": None,
+    "ollama_scraper.httpcache.RevalidatingCacheMiddleware": 900,
+}
 
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
 #EXTENSIONS = {
 #    "scrapy.extensions.telnet.TelnetConsole": None,
 #}
+EXTENSIONS = {
+    "ollama_scraper.extensions.MetricsExtension": 500,
+}
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
@@ -69,6 +92,21 @@ ITEM_PIPELINES = {
     "ollama_scraper.pipelines.MergeModelsPipeline": 300,
 }
 
+# Where MergeModelsPipeline writes the merged library
+LIBRARY_OUTPUT = "./data/library.json"
+# Stream finished models to a JSONL journal and compact it into LIBRARY_OUTPUT
+# on close; an interrupted crawl resumes from the journal
+LIBRARY_STREAMING = False
+LIBRARY_JOURNAL = "./data/library.jsonl"
+# Prometheus text metrics: written to METRICS_FILE when the crawl ends and
+# served on METRICS_PORT while it runs. Both default to the environment
+# variables of the same name; "" and 0 turn them off.
+METRICS_FILE = ""
+METRICS_PORT = 0
+
+# SQLite index of the library for `library.py --capability ...` queries, "" = off
+LIBRARY_INDEX = "./data/library.db"
+
 # Enable and configure the AutoThrottle extension (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/autothrottle.html
 #AUTOTHROTTLE_ENABLED = True
@@ -84,11 +122,14 @@ ITEM_PIPELINES = {
 
 # Enable and configure HTTP caching (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html#httpcache-middleware-settings
-#HTTPCACHE_ENABLED = True
+HTTPCACHE_ENABLED = True
 #HTTPCACHE_EXPIRATION_SECS = 0
-#HTTPCACHE_DIR = "httpcache"
-#HTTPCACHE_IGNORE_HTTP_CODES = []
-#HTTPCACHE_STORAGE = "scrapy.extensions.httpcache.FilesystemCacheStorage"
+HTTPCACHE_DIR = "httpcache"
+HTTPCACHE_IGNORE_HTTP_CODES = [429, 500, 502, 503, 504]
+HTTPCACHE_STORAGE = "scrapy.extensions.httpcache.FilesystemCacheStorage"
+# Serve cached pages for an hour, then revalidate them with ETag/Last-Modified
+HTTPCACHE_POLICY = "ollama_scraper.httpcache.RevalidatingCachePolicy"
+HTTPCACHE_FRESHNESS_SECS = 3600
 
 # Set settings whose default value is deprecated to a future-proof value
 TWISTED_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
@@ -0,0 +1,97 @@
+"""
+Run the ollama_models crawl as several Scrapy processes and merge the result.
+
+Each shard reads the whole listing but only follows the models whose slug
+hashes to it, so the parsing of variant pages is spread across CPU cores.
+Every shard writes a partial output; once all of them have finished, the
+partials are merged into one library.json with the same rules as a
+single-process crawl.
+
+Usage: python -m ollama_scraper.sharding [--shards 4] [scrapy crawl options]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from ollama_scraper import settings
+from ollama_scraper.pipelines import merge_shards
+
+ROOT = Path(__file__).resolve().parent.parent
+SHARD_DIR = ROOT / "data" / "shards"
+
+
+def shard_command(shard, shards, output_path, extra_args=()):
+    return [
+        sys.executable, "-m", "scrapy", "crawl", "ollama_models",
+        "-a", f"shard={shard}",
+        "-a", f"shards={shards}",
+        "-s", f"LIBRARY_OUTPUT={output_path}",
+        "-s", "LIBRARY_STREAMING=false",
+        *extra_args,
+    ]
+
+
+def crawl_shards(shards, output_path, shard_dir=SHARD_DIR, extra_args=(), command=shard_command, index_path=None):
+    """
+    Crawl with one process per shard and merge their partial outputs.
+    Returns (per-shard stats, elapsed seconds), or (None, elapsed) if a shard
+    failed, in which case output_path is left untouched.
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    partials = [Path(shard_dir) / f"shard-{shard}-of-{shards}.json" for shard in range(shards)]
+    for partial in partials:
+        partial.unlink(missing_ok=True)
+
+    start = time.monotonic()
+    processes = [
+        subprocess.Popen(command(shard, shards, partial, extra_args), cwd=ROOT)
+        for shard, partial in enumerate(partials)
+    ]
+    failed = [shard for shard, process in enumerate(processes) if process.wait() != 0]
+    failed += [shard for shard, partial in enumerate(partials) if shard not in failed and not partial.exists()]
+    if failed:
+        print(f"Shards {sorted(failed)} failed, not writing {output_path}")
+        return None, time.monotonic() - start
+
+    stats = merge_shards(partials, output_path, index_path=index_path)
+    elapsed = time.monotonic() - start
+    for partial in partials:
+        partial.unlink()
+    return stats, elapsed
+
+
+def print_report(stats, elapsed):
+    """ Print variants per second for each shard and for the whole crawl """
+    for shard in stats:
+        rate = shard["variants"] / shard["elapsed"] if shard["elapsed"] else 0
+        print(
+            f"Shard {shard['shard']}: {shard['models']} models, {shard['variants']} variants "
+            f"in {shard['elapsed']:.1f}s ({rate:.1f} variants/s)"
+        )
+    total = sum(shard["variants"] for shard in stats)
+    print(
+        f"Total: {sum(shard['models'] for shard in stats)} models, {total} variants "
+        f"in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.1f} variants/s)"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crawl the Ollama library with several Scrapy processes")
+    parser.add_argument("--shards", type=int, default=os.cpu_count() or 1, help="Number of crawler processes")
+    parser.add_argument("--output", default=settings.LIBRARY_OUTPUT, help="Merged library.json to write")
+    args, extra_args = parser.parse_known_args(argv)
+
+    stats, elapsed = crawl_shards(
+        args.shards, args.output, extra_args=extra_args, index_path=settings.LIBRARY_INDEX or None
+    )
+    if stats is None:
+        sys.exit(1)
+    print_report(stats, elapsed)
+
+
+if __name__ == "__main__":
+    main()
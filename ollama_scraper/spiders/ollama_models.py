@@ -1,5 +1,27 @@
-import scrapy
+import json
 import logging
+import os
+import re
+import time
+import zlib
+
+import scrapy
+
+import metrics
+from data_config import LIBRARY_JSON
+from normalize import relative_days
+from ollama_scraper.items import ModelContext
+from ollama_scraper.parsers import PARSERS
+
+# Request priorities: pinned models first, then the most recently updated
+PINNED_PRIORITY = 100000
+UNKNOWN_AGE_DAYS = 10000
+
+
+def shard_of(model_slug, shards):
+    """ Assign a model slug to one of shards crawler processes, the same way every run """
+    return zlib.crc32(model_slug.encode()) % shards
+
 
 class OllamaModelsSpider(scrapy.Spider):
     name = "ollama_models"
@@ -8,9 +30,49 @@ class OllamaModelsSpider(scrapy.Spider):
     # Set up logger
     logger = logging.getLogger(__name__)
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, incremental=False, tags_page=False, parser="lxml", shard=0, shards=1,
+                 pinned="", time_budget=0, **kwargs):
         super().__init__(*args, **kwargs)
         self.models_scraped = 0  # Counter for processed models
+        self.models_carried = 0  # Counter for unchanged models in incremental mode
+
+        # Incremental mode only follows variant pages for new or changed models
+        self.incremental = str(incremental).lower() in ("1", "true", "yes")
+        self.previous_models = {}
+        self.previous_scrape = None
+        if self.incremental:
+            self.load_previous_library()
+
+        # Read every size of a model from its one tags page, not one page per size
+        self.tags_page = str(tags_page).lower() in ("1", "true", "yes")
+
+        # HTML parsing backend for the listing and variant pages ("lxml" or "css")
+        if parser not in PARSERS:
+            raise ValueError(f"Unknown parser {parser!r}, expected one of {sorted(PARSERS)}")
+        self.parser = parser
+        self.listing_parser, self.variant_parser = PARSERS[parser]
+
+        # A sharded crawl only follows the models whose slug hashes to this shard
+        self.shard = int(shard)
+        self.shards = int(shards)
+        if not 0 <= self.shard < self.shards:
+            raise ValueError(f"Shard {self.shard} is out of range for {self.shards} shards")
+        self.listing_names = []  # Every model in listing order, for the merge
+        self.models_other_shards = 0
+
+        # Models to crawl before all others, e.g. -a pinned=llama3.1,gemma3
+        self.pinned = {name.strip() for name in str(pinned).split(",") if name.strip()}
+
+        # Stop starting model page requests this many seconds in, 0 = no limit
+        self.time_budget = float(time_budget)
+        self.deadline = time.monotonic() + self.time_budget if self.time_budget > 0 else None
+        self.skipped_models = {}  # Model name -> requests dropped at the deadline
+        if self.deadline and not self.incremental:
+            # Models cut short keep their previous record
+            self.load_previous_library()
+
+        # One shared record per model slug; variant requests only carry slug and size
+        self._model_contexts = {}
 
         # Configure a custom logger
         self.logger = logging.getLogger(self.name)  # Use spider name for log namespace
@@ -20,84 +82,245 @@ class OllamaModelsSpider(scrapy.Spider):
         logging.getLogger("scrapy").setLevel(logging.WARNING)
 
 
+    @property
+    def model_contexts(self):
+        """ Model records by slug, kept in the job state when crawling with JOBDIR """
+        state = getattr(self, "state", None)
+        if state is None:
+            return self._model_contexts
+        return state.setdefault("model_contexts", self._model_contexts)
+
+    def load_previous_library(self):
+        """ Load the last library.json to compare the listing against """
+        try:
+            with open(LIBRARY_JSON, "r", encoding="utf-8") as f:
+                self.previous_models = {model["name"]: model for model in json.load(f)}
+            self.previous_scrape = os.path.getmtime(LIBRARY_JSON)
+        except (IOError, ValueError) as e:
+            self.logger.warning("No previous library to compare against (%s), crawling everything", e)
+
+    def is_unchanged(self, previous, parameter_sizes, capabilities, last_updated):
+        """ Check a listing entry against the model's previous record """
+        if previous is None or self.previous_scrape is None:
+            return False
+        if sorted(previous.get("parameter_sizes", {})) != sorted(parameter_sizes):
+            return False
+        if sorted(previous.get("capabilities") or []) != sorted(capabilities):
+            return False
+
+        # Relative dates drift every day, so compare the age the listing
+        # reports with the time since the previous crawl instead
+        days_ago = relative_days(last_updated)
+        days_since_scrape = (time.time() - self.previous_scrape) / 86400
+        return days_ago is not None and days_ago > days_since_scrape + 1
+
+    def request_priority(self, model_name, last_updated):
+        """ Schedule pinned models first, then the most recently updated """
+        if model_name in self.pinned:
+            return PINNED_PRIORITY
+        days = relative_days(last_updated)
+        return -int(days if days is not None else UNKNOWN_AGE_DAYS)
+
+    def past_deadline(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def skip_request(self, request):
+        """ Record a model page request dropped because the time budget ran out """
+        model = self.model_contexts.get(request.meta["model_slug"])
+        name = model.name if model else request.meta["model_slug"]
+        self.skipped_models[name] = self.skipped_models.get(name, 0) + 1
+
+    def count_cached(self, response):
+        """ Track bytes served from the HTTP cache instead of the network """
+        if "cached" in response.flags and getattr(self, "crawler", None):
+            self.crawler.stats.inc_value("httpcache/bytes_saved", len(response.body))
+
     def parse(self, response):
         self.logger.info("Scraping %s", response.url)
+        self.count_cached(response)
 
-        # Select all model elements from the page
-        model_entries = response.css("a[href^='/library/']")
+        # Extract every model entry from the page
+        model_entries = self.listing_parser(response)
         if model_entries:
             self.logger.info("Found %d model entries.", len(model_entries))
         else:
             self.logger.critical("No model entries found - check if page structure has changed")
 
         for model in model_entries:
-            model_name = model.css("span.group-hover\\:underline::text").get()
-            if model_name:
-                model_name = model_name.strip()
+            model_name = model["name"]
+            model_desc = model["description"]
+            model_base_url = response.urljoin(model["href"])  # Base model URL
+            model_slug = model_base_url.split("/")[-1]  # Extract the model name slug
 
-            model_desc = model.css("p::text").get()
-            if model_desc:
-                model_desc = model_desc.strip()
+            # Available parameter sizes (e.g., ["1.5b", "7b", "8b"]) and capabilities (e.g., ["tools"])
+            parameter_sizes = model["parameter_sizes"]
+            capabilities = model["capabilities"]
 
-            model_base_url = response.urljoin(model.attrib["href"])  # Base model URL
-            model_slug = model_base_url.split("/")[-1]  # Extract the model name slug
+            self.listing_names.append(model_name)
+            if self.shards > 1 and shard_of(model_slug, self.shards) != self.shard:
+                self.models_other_shards += 1
+                continue
 
-            # Extract available parameter sizes (e.g., ["1.5b", "7b", "8b"])
-            parameter_sizes = model.css("span[x-test-size]::text").getall()
-            parameter_sizes = [size.strip().lower() for size in parameter_sizes]  # Normalize
+            if self.incremental:
+                last_updated = model["last_updated"]
+                previous = self.previous_models.get(model_name)
+                if self.is_unchanged(previous, parameter_sizes, capabilities, last_updated):
+                    # Carry the previous record forward with the fresh listing text
+                    self.models_carried += 1
+                    yield {
+                        "record": dict(
+                            previous,
+                            description=model_desc,
+                            last_updated=last_updated,
+                            capabilities=capabilities,
+                        )
+                    }
+                    continue
 
-            # Extract capabilities (e.g., ["tools", "chat"])
-            capabilities = model.css("span[x-test-capability]::text").getall()
-            capabilities = [cap.strip().lower() for cap in capabilities]  # Normalize
+            # Models already journaled by an interrupted streaming crawl
+            if model_name in getattr(self, "journaled_models", ()):
+                continue
 
-            # Generate a new URL for each parameter size and request it
-            for param_size in parameter_sizes:
-                model_variant_url = f"https://ollama.com/library/{model_slug}:{param_size}"
-                self.models_scraped += 1  # Increment model count
+            priority = self.request_priority(model_name, model["last_updated"])
+            self.model_contexts[model_slug] = ModelContext(
+                model_name, model_desc, model_base_url, parameter_sizes, capabilities, priority
+            )
 
+            if self.tags_page:
                 yield response.follow(
-                    model_variant_url,
-                    callback=self.parse_model_page,
-                    meta={
-                        'model_name': model_name,
-                        'model_desc': model_desc,
-                        'model_url': model_base_url,
-                        'param_size': param_size,
-                        'capabilities': capabilities
-                    }
+                    f"https://ollama.com/library/{model_slug}/tags",
+                    callback=self.parse_tags_page,
+                    priority=priority,
+                    meta={'model_slug': model_slug}
                 )
+                continue
+
+            # Generate a new URL for each parameter size and request it
+            for param_size in parameter_sizes:
+                yield self.variant_request(response, model_slug, param_size)
+
+    def variant_request(self, response, model_slug, param_size):
+        """ Request one variant page, carrying only the model slug and size """
+        self.models_scraped += 1  # Increment model count
+        return response.follow(
+            f"https://ollama.com/library/{model_slug}:{param_size}",
+            callback=self.parse_model_page,
+            priority=self.model_contexts[model_slug].priority,
+            meta={'model_slug': model_slug, 'param_size': param_size}
+        )
 
     def parse_model_page(self, response):
-        model_name = response.meta["model_name"]
-        model_desc = response.meta["model_desc"]
-        model_url = response.meta["model_url"]
-        param_size = response.meta["param_size"]
-        capabilities = response.meta["capabilities"]
+        self.count_cached(response)
 
-        # Extract size in GB for the specific parameter size
-        model_size_text = response.css("p::text").re_first(r"([\d.]+)\s*GB")
-        model_size = float(model_size_text) if model_size_text else None
+        model = self.model_contexts[response.meta["model_slug"]]
+        param_size = response.meta["param_size"]
 
-        # Extract last updated time
-        last_updated = response.css("span[x-test-updated]::text").get()
-        if last_updated:
-            last_updated = last_updated.strip()
+        # Extract size in GB for the specific parameter size and last updated time
+        with metrics.timer("ollama_scraper_variant_parse_seconds", "Time to parse a variant page"):
+            model_size, last_updated = self.variant_parser(response)
 
         yield {
-            "name": model_name,
-            "description": model_desc,
-            "url": model_url,
+            "name": model.name,
+            "description": model.description,
+            "url": model.url,
             "parameter_size": param_size,
             "size_gb": model_size,
             "last_updated": last_updated,
-            "capabilities": capabilities
+            "capabilities": list(model.capabilities),
+            "variant_count": len(model.parameter_sizes)
         }
 
+    def parse_tags_page(self, response):
+        """ Extract every size of a model from its tags listing """
+        self.count_cached(response)
+
+        model_slug = response.meta["model_slug"]
+        model = self.model_contexts[model_slug]
+        variants = {}
+        for link in response.css(f"a[href^='/library/{model_slug}:']"):
+            tag = link.attrib["href"].split(":", 1)[1]
+            # The tag's row holds its size, digest and update time
+            row_text = " ".join(
+                link.xpath("ancestor::div[contains(@class, 'group')][1]//text()").getall()
+            )
+            size = re.search(r"([\d.]+)\s*(GB|MB)", row_text)
+            digest = re.search(r"\b([0-9a-f]{12})\b", row_text)
+            updated = re.search(r"((?:\d+|an?)\s+\w+?s?\s+ago|yesterday)", row_text)
+            quantization = re.search(r"(q\d\w*|fp16|bf16|fp32)$", tag, re.IGNORECASE)
+            size_gb = None
+            if size:
+                size_gb = float(size.group(1))
+                if size.group(2) == "MB":
+                    size_gb = round(size_gb / 1000, 3)
+            variants[tag] = {
+                "size_gb": size_gb,
+                "digest": digest.group(1) if digest else None,
+                "quantization": quantization.group(1) if quantization else None,
+                "last_updated": updated.group(1) if updated else None,
+            }
+
+        # Size tags like "1b" share a digest with a tag that names the quantization
+        quantizations = {v["digest"]: v["quantization"] for v in variants.values() if v["quantization"]}
+        for variant in variants.values():
+            if not variant["quantization"]:
+                variant["quantization"] = quantizations.get(variant["digest"])
+
+        for param_size in model.parameter_sizes:
+            variant = variants.get(param_size)
+            if variant is None:
+                # Not on the tags page, so fall back to the variant's own page
+                self.logger.warning("%s:%s missing from tags page", model_slug, param_size)
+                yield self.variant_request(response, model_slug, param_size)
+                continue
+
+            self.models_scraped += 1
+            yield {
+                "name": model.name,
+                "description": model.description,
+                "url": model.url,
+                "parameter_size": param_size,
+                "size_gb": variant["size_gb"],
+                "last_updated": variant["last_updated"],
+                "capabilities": list(model.capabilities),
+                "digest": variant["digest"],
+                "quantization": variant["quantization"],
+                "variant_count": len(model.parameter_sizes),
+            }
+
     def closed(self, reason):
         """ Logs a final summary message when the spider closes """
         self.logger.info("Processed %d models.", self.models_scraped)
+        if self.incremental:
+            self.logger.info("Carried forward %d unchanged models.", self.models_carried)
+        if self.shards > 1:
+            self.logger.info(
+                "Shard %d of %d skipped %d models belonging to other shards.",
+                self.shard, self.shards, self.models_other_shards,
+            )
+
+        if self.skipped_models:
+            self.logger.warning(
+                "Crawl time budget of %ds ran out: skipped %d requests for %d models (%s). "
+                "They kept their previous record where there was one.",
+                self.time_budget,
+                sum(self.skipped_models.values()),
+                len(self.skipped_models),
+                ", ".join(sorted(self.skipped_models)),
+            )
+
+        if getattr(self, "crawler", None):
+            stats = self.crawler.stats
+            fresh = stats.get_value("httpcache/hit", 0)
+            revalidated = stats.get_value("httpcache/revalidate", 0)
+            self.logger.info(
+                "HTTP cache: %d hits (%d revalidated with 304), %d misses, %d bytes saved",
+                fresh + revalidated,
+                revalidated,
+                stats.get_value("httpcache/miss", 0),
+                stats.get_value("httpcache/bytes_saved", 0),
+            )
 
-        if self.models_scraped == 0:
+        if self.models_scraped == 0 and self.models_carried == 0:
             self.logger.critical("❌ No models were scraped. Has the site structure changed?")
         else:
             self.logger.info("Scraping process complete.")
@@ -0,0 +1,77 @@
+"""
+Helpers for talking to the Ollama model registry
+"""
+
+import hashlib
+import os
+
+import requests
+
+from logger_config import setup_logger
+
+# Set up logger
+logger = setup_logger(__name__)
+
+# Define constants
+OLLAMA_REGISTRY_URL = os.environ.get(
+    "OLLAMA_REGISTRY_URL", "https://registry.ollama.ai"
+)
+MANIFEST_MEDIA_TYPE = "application/vnd.docker.distribution.manifest.v2+json"
+
+
+def parse_model_name(model_name):
+    """
+    Split a model name such as "llama3:8b" or "user/model:tag" into its
+    (registry URL, namespace, model, tag) parts
+    """
+    registry_url = OLLAMA_REGISTRY_URL
+    namespace = "library"
+    tag = "latest"
+
+    path, _, name_tag = model_name.rpartition("/")
+    model, _, explicit_tag = name_tag.partition(":")
+    if explicit_tag:
+        tag = explicit_tag
+
+    parts = path.split("/") if path else []
+    if len(parts) == 2:
+        registry_url = f"https://{parts[0]}"
+        namespace = parts[1]
+    elif len(parts) == 1:
+        namespace = parts[0]
+
+    return registry_url, namespace, model, tag
+
+
+def manifest_url(model_name):
+    """
+    Build the registry manifest URL for a model name
+    """
+    registry_url, namespace, model, tag = parse_model_name(model_name)
+    return f"{registry_url}/v2/{namespace}/{model}/manifests/{tag}"
+
+
+def get_manifest(model_name, session=None):
+    """
+    Fetch a model's manifest from the registry and return a
+    (digest, manifest) tuple, or (None, None) if it can't be fetched.
+
+    The digest is the hex sha256 of the raw manifest body, which is the
+    same value Ollama reports as the installed model's digest.
+    """
+    http = session or requests
+    url = manifest_url(model_name)
+    try:
+        logger.debug("Fetching manifest from %s", url)
+        response = http.get(url, headers={"Accept": MANIFEST_MEDIA_TYPE}, timeout=30)
+        if response.status_code == 200:
+            digest = hashlib.sha256(response.content).hexdigest()
+            return digest, response.json()
+        logger.error(
+            "Failed to fetch manifest for %s. Status code: %d",
+            model_name,
+            response.status_code,
+        )
+    except (requests.RequestException, ValueError) as e:
+        logger.error("Error fetching manifest for %s: %s", model_name, e)
+    return None, None
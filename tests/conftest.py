@@ -0,0 +1,83 @@
+"""
+Shared fixtures, including local stand-in HTTP servers for Ollama and the
+model registry
+"""
+
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Keep the module-level loggers out of the working tree
+os.environ.setdefault("LOGS_PATH", tempfile.mkdtemp(prefix="ollama-mgmt-logs-"))
+
+
+def make_handler(routes):
+    """
+    Build a request handler that answers from a {(method, path): response}
+    table. A response is either a (status, body) tuple or a callable that
+    receives the handler and writes the whole response itself.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+            pass
+
+        def respond(self):
+            response = routes.get((self.command, self.path))
+            if callable(response):
+                response(self)
+                return
+            status, body = response if response else (404, b"")
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        def do_GET(self):
+            self.respond()
+
+        def do_HEAD(self):
+            self.respond()
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            self.body = self.rfile.read(length)
+            self.respond()
+
+    return Handler
+
+
+@pytest.fixture
+def stand_in():
+    """
+    Start local stand-in servers; call with a routes table, get back its URL
+    """
+    servers = []
+
+    def start(routes):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(routes))
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def unused_url():
+    """
+    A URL that nothing is listening on
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), BaseHTTPRequestHandler)
+    port = server.server_address[1]
+    server.server_close()
+    return f"http://127.0.0.1:{port}"
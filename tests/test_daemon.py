@@ -0,0 +1,180 @@
+import json
+import time
+from pathlib import Path
+
+import ollama
+import requests
+
+import daemon
+
+LISTING = (Path(__file__).parent / "fixtures" / "library.html").read_bytes()
+INSTALLED = {"models": [{"name": "llama3.1:8b"}, {"name": "gemma3:1b"}]}
+DAY = 86400
+
+
+def library_server(stand_in, seen_headers):
+    """
+    Serve the listing fixture with an ETag, answering 304 when it matches
+    """
+
+    def listing(handler):
+        seen_headers.append(dict(handler.headers))
+        if handler.headers.get("If-None-Match") == '"v1"':
+            handler.send_response(304)
+            handler.end_headers()
+            return
+        handler.send_response(200)
+        handler.send_header("ETag", '"v1"')
+        handler.send_header("Content-Length", str(len(LISTING)))
+        handler.end_headers()
+        handler.wfile.write(LISTING)
+
+    return stand_in({("GET", "/library"): listing}) + "/library"
+
+
+def ollama_server(stand_in, pulled, status=200):
+    """
+    Answer /api/tags with the installed models and record every pull
+    """
+
+    def pull(handler):
+        pulled.append(json.loads(handler.body)["model"])
+        body = json.dumps({"status": "success"}).encode()
+        handler.send_response(status)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    return stand_in(
+        {
+            ("GET", "/api/tags"): (200, json.dumps(INSTALLED).encode()),
+            ("POST", "/api/pull"): pull,
+        }
+    )
+
+
+def write_library(path, updated_days):
+    """
+    A library.json scraped now, with each model's age in days
+    """
+    path.write_text(
+        json.dumps(
+            [
+                {
+                    "name": name,
+                    "last_updated": f"{days} days ago",
+                    "updated_at": int(time.time() - days * DAY),
+                    "parameter_sizes": dict.fromkeys(sizes, 1.0),
+                }
+                for name, days, sizes in updated_days
+            ]
+        )
+    )
+
+
+def cycle(store, library_url, ollama_url):
+    with requests.Session() as session:
+        daemon.run_cycle(
+            store,
+            session,
+            ollama.Client(host=ollama_url),
+            url=library_url,
+            api_url=f"{ollama_url}/api",
+        )
+
+
+def test_pulls_installed_models_that_changed(monkeypatch, stand_in, tmp_path):
+    # The listing says llama3.1 was updated 3 days ago, mixtral 5 months ago
+    # and gemma3 2 weeks ago
+    library = tmp_path / "library.json"
+    write_library(
+        library,
+        [
+            ("llama3.1", 20, ["8b", "70b", "405b"]),
+            ("mixtral", 200, ["8x7b", "8x22b"]),
+            ("gemma3", 14, ["270m", "1b", "4b"]),
+        ],
+    )
+    monkeypatch.setattr(daemon, "LIBRARY_JSON", str(library))
+    headers, pulled = [], []
+    library_url = library_server(stand_in, headers)
+    ollama_url = ollama_server(stand_in, pulled)
+    store = daemon.DaemonStore(str(tmp_path / "daemon.db"))
+
+    cycle(store, library_url, ollama_url)
+    cycle(store, library_url, ollama_url)
+
+    # mixtral changed too, but it isn't installed
+    assert pulled == ["llama3.1:8b"]
+    assert store.pending() == []
+    assert "If-None-Match" not in headers[0]
+    assert headers[1]["If-None-Match"] == '"v1"'
+
+
+def test_first_poll_without_a_library_only_records_the_listing(
+    monkeypatch, stand_in, tmp_path
+):
+    monkeypatch.setattr(daemon, "LIBRARY_JSON", str(tmp_path / "none.json"))
+    pulled = []
+    library_url = library_server(stand_in, [])
+    ollama_url = ollama_server(stand_in, pulled)
+    store = daemon.DaemonStore(str(tmp_path / "daemon.db"))
+
+    cycle(store, library_url, ollama_url)
+
+    assert pulled == []
+    assert sorted(store.snapshot()) == ["gemma3", "llama3.1", "mixtral"]
+
+
+def test_queue_survives_a_restart(stand_in, tmp_path):
+    path = str(tmp_path / "daemon.db")
+    store = daemon.DaemonStore(path)
+    store.put("llama3.1:8b", "changed upstream")
+    assert not store.put("llama3.1:8b", "changed upstream")
+    pulled = []
+
+    daemon.drain_queue(store, ollama.Client(host=ollama_server(stand_in, [], 500)))
+    store.close()
+
+    restarted = daemon.DaemonStore(path)
+    assert restarted.pending() == ["llama3.1:8b"]
+    daemon.drain_queue(restarted, ollama.Client(host=ollama_server(stand_in, pulled)))
+    assert pulled == ["llama3.1:8b"]
+    assert restarted.pending() == []
+
+
+def test_gives_up_after_max_attempts(stand_in, tmp_path):
+    store = daemon.DaemonStore(str(tmp_path / "daemon.db"))
+    store.put("gemma3:1b", "changed upstream")
+    client = ollama.Client(host=ollama_server(stand_in, [], 500))
+
+    daemon.drain_queue(store, client, max_attempts=2)
+    assert store.pending() == ["gemma3:1b"]
+    daemon.drain_queue(store, client, max_attempts=2)
+    assert store.pending() == []
+
+
+def test_has_changed_allows_for_relative_date_resolution():
+    now = time.time()
+
+    def snapshot(last_updated, polled_at, sizes=("8b",)):
+        return {
+            "last_updated": last_updated,
+            "updated_at": daemon.updated_timestamp(last_updated, polled_at),
+            "parameter_sizes": list(sizes),
+        }
+
+    # The same update seen a few hours apart
+    assert not daemon.has_changed(
+        snapshot("3 days ago", now - 5 * 3600), snapshot("3 days ago", now)
+    )
+    assert not daemon.has_changed(
+        snapshot("19 hours ago", now - 3600), snapshot("20 hours ago", now)
+    )
+    # A new release
+    assert daemon.has_changed(
+        snapshot("3 days ago", now - 3600), snapshot("an hour ago", now)
+    )
+    assert daemon.has_changed(
+        snapshot("3 days ago", now), snapshot("3 days ago", now, ("8b", "70b"))
+    )
@@ -0,0 +1,85 @@
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+from scrapy.exceptions import IgnoreRequest
+from scrapy.http import HtmlResponse
+
+from ollama_scraper.middlewares import CrawlDeadlineMiddleware
+from ollama_scraper.pipelines import MergeModelsPipeline
+from ollama_scraper.spiders import ollama_models
+from ollama_scraper.spiders.ollama_models import PINNED_PRIORITY, OllamaModelsSpider
+from tests.test_spider import listing_response
+
+
+def priorities(spider):
+    return {
+        request.url.rsplit("/", 1)[1]: request.priority
+        for request in spider.parse(listing_response())
+    }
+
+
+def test_recently_updated_models_come_first():
+    result = priorities(OllamaModelsSpider())
+
+    # Updated 3 days, 2 weeks and 5 months ago
+    assert result["llama3.1:8b"] > result["gemma3:1b"] > result["mixtral:8x7b"]
+
+
+def test_pinned_models_come_before_everything():
+    result = priorities(OllamaModelsSpider(pinned="mixtral, gemma3"))
+
+    assert result["mixtral:8x22b"] == result["gemma3:270m"] == PINNED_PRIORITY
+    assert result["llama3.1:405b"] < PINNED_PRIORITY
+
+
+def test_deadline_drops_model_pages_and_keeps_previous_records(monkeypatch, tmp_path):
+    library_json = tmp_path / "library.json"
+    previous = {
+        "name": "llama3.1",
+        "description": "old",
+        "url": "https://ollama.com/library/llama3.1",
+        "last_updated": "1 month ago",
+        "capabilities": ["tools"],
+        "parameter_sizes": {"8b": 4.7, "70b": 40.0, "405b": 229.0},
+    }
+    library_json.write_text(json.dumps([previous]))
+    monkeypatch.setattr(ollama_models, "LIBRARY_JSON", str(library_json))
+
+    spider = OllamaModelsSpider(time_budget=60)
+    middleware = CrawlDeadlineMiddleware(SimpleNamespace(spider=spider))
+    output = tmp_path / "out.json"
+    pipeline = MergeModelsPipeline(output_path=str(output))
+    pipeline.open_spider(spider)
+    requests = list(spider.parse(listing_response()))
+
+    # llama3.1:8b and mixtral:8x7b finish before the budget runs out
+    for request in requests:
+        if request.url.endswith(("llama3.1:8b", "mixtral:8x7b")):
+            assert middleware.process_request(request) is None
+            response = HtmlResponse(request.url, body=b"<p>5.0GB</p>", request=request)
+            for item in spider.parse_model_page(response):
+                pipeline.process_item(item, spider)
+
+    spider.deadline = time.monotonic() - 1
+    for request in requests:
+        if not request.url.endswith(("llama3.1:8b", "mixtral:8x7b")):
+            with pytest.raises(IgnoreRequest):
+                middleware.process_request(request)
+    pipeline.close_spider(spider)
+    spider.closed("finished")
+
+    assert spider.skipped_models == {"llama3.1": 2, "mixtral": 1, "gemma3": 3}
+    # llama3.1 was cut short and falls back to its previous record, while
+    # mixtral and gemma3 have none to fall back to and are left out
+    counts = {"8b": 8 * 10**9, "70b": 70 * 10**9, "405b": 405 * 10**9}
+    assert json.loads(output.read_text()) == [dict(previous, parameter_counts=counts)]
+
+
+def test_requests_pass_without_a_budget():
+    spider = OllamaModelsSpider()
+    middleware = CrawlDeadlineMiddleware(SimpleNamespace(spider=spider))
+
+    for request in spider.parse(listing_response()):
+        assert middleware.process_request(request) is None
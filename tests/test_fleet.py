@@ -0,0 +1,114 @@
+import hashlib
+import json
+import time
+
+import fleet
+import registry
+
+
+def ollama_routes(models, pulls):
+    """
+    Stand-in Ollama routes that list `models` and record pulled names
+    """
+
+    def pull(handler):
+        pulls.append(json.loads(handler.body)["model"])
+        body = b'{"status": "success"}\n'
+        handler.send_response(200)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    return {
+        ("GET", "/api/tags"): (200, json.dumps({"models": models}).encode()),
+        ("POST", "/api/pull"): pull,
+    }
+
+
+def test_fleet_update_dedupes_registry_lookups(monkeypatch, stand_in):
+    body = b'{"layers": []}'
+    current = hashlib.sha256(body).hexdigest()
+    manifest_hits = []
+
+    def manifest(handler):
+        manifest_hits.append(handler.path)
+        handler.send_response(200)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    monkeypatch.setattr(
+        registry,
+        "OLLAMA_REGISTRY_URL",
+        stand_in({("GET", "/v2/library/a/manifests/1b"): manifest}),
+    )
+    first_pulls, second_pulls = [], []
+    first = stand_in(
+        ollama_routes([{"name": "a:1b", "size": 1, "digest": "old"}], first_pulls)
+    )
+    second = stand_in(
+        ollama_routes([{"name": "a:1b", "size": 1, "digest": current}], second_pulls)
+    )
+
+    fleet_models = fleet.get_fleet_models([first, second])
+    plan = fleet.plan_fleet(fleet_models, skip_up_to_date=True)
+    results = fleet.pull_fleet(plan, concurrency=2, stream=False)
+
+    assert len(manifest_hits) == 1
+    assert first_pulls == ["a:1b"] and second_pulls == []
+    assert results[first]["a:1b"]["status"] == "success"
+    assert results[second] == {}
+
+
+def test_fleet_report_shows_unreachable_hosts(stand_in, unused_url, capsys):
+    pulls = []
+    reachable = stand_in(ollama_routes([], pulls))
+
+    fleet_models = fleet.get_fleet_models([reachable, unused_url])
+    plan = fleet.plan_fleet(fleet_models)
+    results = fleet.pull_fleet(plan, stream=False)
+    fleet.print_report(fleet_models, plan, results, 0.0)
+
+    assert fleet_models == {reachable: [], unused_url: None}
+    assert unused_url not in plan
+    output = capsys.readouterr().out
+    assert "unreachable" in output
+    assert f"Could not list the models on:\n- {unused_url}" in output
+    assert "Updated 1 of 2 hosts" in output
+
+
+def test_busy_host_does_not_hold_fleet_slots(stand_in):
+    spans = {}
+
+    def timed_pull(delay):
+        def pull(handler):
+            model = json.loads(handler.body)["model"]
+            start = time.monotonic()
+            time.sleep(delay)
+            spans[model] = (start, time.monotonic())
+            body = b'{"status": "success"}\n'
+            handler.send_response(200)
+            handler.send_header("Content-Length", str(len(body)))
+            handler.end_headers()
+            handler.wfile.write(body)
+
+        return {("POST", "/api/pull"): pull}
+
+    slow = stand_in(timed_pull(0.5))
+    fast = stand_in(timed_pull(0.05))
+    plan = {
+        slow: [{"name": "slow1:1b"}, {"name": "slow2:1b"}],
+        fast: [{"name": "fast1:1b"}, {"name": "fast2:1b"}],
+    }
+
+    results = fleet.pull_fleet(plan, concurrency=2, per_host=1, stream=False)
+
+    assert all(
+        result["status"] == "success"
+        for host_results in results.values()
+        for result in host_results.values()
+    )
+    # The fast host's second pull doesn't wait for a slot held by a pull
+    # queued behind the slow host's first one
+    assert spans["fast2:1b"][1] < spans["slow1:1b"][1]
+    assert spans["slow2:1b"][0] >= spans["slow1:1b"][1]
@@ -0,0 +1,97 @@
+from email.utils import formatdate
+from time import time
+
+import pytest
+from scrapy import Spider
+from scrapy.downloadermiddlewares.httpcache import HttpCacheMiddleware
+from scrapy.http import HtmlResponse, Request
+from scrapy.settings import Settings
+from scrapy.utils.test import get_crawler
+
+from ollama_scraper import httpcache
+from ollama_scraper.httpcache import RevalidatingCachePolicy
+
+URL = "https://ollama.com/library"
+
+
+def cached_response(age, **headers):
+    headers["Date"] = formatdate(time() - age, usegmt=True)
+    return HtmlResponse(URL, body=b"<html></html>", headers=headers)
+
+
+def policy(freshness=3600):
+    return RevalidatingCachePolicy(Settings({"HTTPCACHE_FRESHNESS_SECS": freshness}))
+
+
+def test_fresh_within_window():
+    assert policy().is_cached_response_fresh(cached_response(60), Request(URL))
+
+
+def test_stale_response_sets_validators():
+    request = Request(URL)
+    response = cached_response(
+        7200, ETag='"abc"', **{"Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"}
+    )
+
+    assert not policy().is_cached_response_fresh(response, request)
+    assert request.headers[b"If-None-Match"] == b'"abc"'
+    assert request.headers[b"If-Modified-Since"] == b"Mon, 01 Jan 2024 00:00:00 GMT"
+
+
+def test_not_modified_keeps_cached_response():
+    not_modified = HtmlResponse(URL, status=304)
+
+    assert policy().is_cached_response_valid(
+        cached_response(7200), not_modified, Request(URL)
+    )
+
+
+def test_caches_pages_without_expiry_headers():
+    assert policy().should_cache_response(cached_response(0), Request(URL))
+    assert not policy().should_cache_response(
+        cached_response(0, **{"Cache-Control": "no-store"}), Request(URL)
+    )
+
+
+@pytest.mark.parametrize("scrapy_stores_revalidated", [True, False])
+def test_revalidation_restarts_freshness_window(
+    monkeypatch, tmp_path, scrapy_stores_revalidated
+):
+    monkeypatch.setattr(
+        httpcache, "SCRAPY_STORES_REVALIDATED", scrapy_stores_revalidated
+    )
+    if not scrapy_stores_revalidated:
+        # Like Scrapy before 2.19, keep the stored page as it was
+        monkeypatch.setattr(
+            HttpCacheMiddleware, "_freshen_cached_response", lambda *args: None
+        )
+    crawler = get_crawler(
+        Spider,
+        {
+            "HTTPCACHE_ENABLED": True,
+            "HTTPCACHE_DIR": str(tmp_path),
+            "HTTPCACHE_POLICY": "ollama_scraper.httpcache.RevalidatingCachePolicy",
+            "HTTPCACHE_FRESHNESS_SECS": 3600,
+        },
+    )
+    crawler.spider = Spider.from_crawler(crawler, "ollama_models")
+    middleware = httpcache.RevalidatingCacheMiddleware.from_crawler(crawler)
+    middleware.spider_opened(crawler.spider)
+
+    # Downloaded two hours ago, so it has to be revalidated
+    first = Request(URL)
+    assert middleware.process_request(first) is None
+    middleware.process_response(first, cached_response(7200, ETag='"abc"'))
+
+    stale = Request(URL)
+    assert middleware.process_request(stale) is None
+    assert stale.headers[b"If-None-Match"] == b'"abc"'
+    not_modified = HtmlResponse(
+        URL, status=304, headers={"Date": formatdate(time(), usegmt=True)}
+    )
+    assert middleware.process_response(stale, not_modified).status == 200
+
+    # The revalidated page is fresh again without another request
+    fresh = middleware.process_request(Request(URL))
+    assert fresh is not None and "cached" in fresh.flags
+    assert fresh.headers[b"ETag"] == b'"abc"'
@@ -0,0 +1,120 @@
+import json
+
+import ollama
+
+import inference_benchmark
+import library
+
+
+def generate_server(stand_in, requests_seen, eval_count=50, load_seconds=2.0):
+    """
+    A stand-in /api/generate: unload requests get a bare done event, prompts
+    stream three tokens and a final event with Ollama's counters
+    """
+    loaded = set()
+
+    def generate(handler):
+        request = json.loads(handler.body)
+        requests_seen.append(request)
+        model = request["model"]
+        if not request.get("prompt"):
+            loaded.discard(model)
+            events = [{"model": model, "response": "", "done": True}]
+        else:
+            events = [
+                {"model": model, "response": token, "done": False}
+                for token in ("Hello", ",", " world")
+            ]
+            events.append(
+                {
+                    "model": model,
+                    "response": "",
+                    "done": True,
+                    "load_duration": 0 if model in loaded else int(load_seconds * 1e9),
+                    "eval_count": eval_count,
+                    "eval_duration": int(0.5 * 1e9),
+                    "prompt_eval_count": 10,
+                    "prompt_eval_duration": int(0.1 * 1e9),
+                }
+            )
+            loaded.add(model)
+        body = "".join(json.dumps(event) + "\n" for event in events).encode()
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/x-ndjson")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    return stand_in({("POST", "/api/generate"): generate})
+
+
+def test_benchmark_model_reads_ollamas_counters(stand_in):
+    seen = []
+    client = ollama.Client(host=generate_server(stand_in, seen))
+
+    summary = inference_benchmark.benchmark_model(client, "gemma3:1b")
+
+    assert summary["prompts"] == 3
+    assert summary["cold_load_seconds"] == 2.0
+    assert summary["tokens_per_second"] == 100.0
+    assert summary["prompt_tokens_per_second"] == 100.0
+    assert summary["ttft_seconds"] is not None
+    # Unloaded before and after, with fixed sampling for every prompt
+    assert [request.get("keep_alive") for request in seen] == [0, None, None, None, 0]
+    assert all(request["options"]["seed"] == 42 for request in seen[1:4])
+
+
+def test_benchmark_models_keeps_earlier_results(stand_in, tmp_path, unused_url):
+    path = tmp_path / "benchmarks.json"
+    path.write_text(json.dumps({"old:1b": {"tokens_per_second": 1.0}}))
+    client = ollama.Client(host=generate_server(stand_in, []))
+
+    inference_benchmark.benchmark_models(["gemma3:1b"], client, str(path))
+    inference_benchmark.benchmark_models(
+        ["llama3.1:8b"], ollama.Client(host=unused_url), str(path)
+    )
+
+    results = json.loads(path.read_text())
+    assert sorted(results) == ["gemma3:1b", "old:1b"]
+    assert results["gemma3:1b"]["tokens_per_second"] == 100.0
+
+
+def test_library_shows_and_sorts_benchmarks():
+    benchmarks = {
+        "gemma3:1b": {"tokens_per_second": 90.0, "ttft_seconds": 0.05},
+        "llama3.1:8b": {"tokens_per_second": 30.0, "ttft_seconds": 0.02},
+        "custom:latest": {},
+    }
+    models = [
+        {
+            "name": "gemma3",
+            "last_updated": "2 weeks ago",
+            "parameter_sizes": {"1b": 0.815},
+        }
+    ]
+
+    rows = library.benchmark_rows(benchmarks, models)
+    by_ttft = library.benchmark_rows(benchmarks, models, sort="ttft")
+
+    assert [row[0] for row in rows] == ["gemma3:1b", "llama3.1:8b", "custom:latest"]
+    assert rows[0][:4] == ["gemma3:1b", "0.815 GB", "2 weeks ago", 90.0]
+    assert [row[0] for row in by_ttft] == [
+        "llama3.1:8b",
+        "gemma3:1b",
+        "custom:latest",
+    ]
+
+
+def test_library_benchmarks_command(monkeypatch, tmp_path, capsys):
+    path = tmp_path / "benchmarks.json"
+    inference_benchmark.save_benchmarks(
+        {"gemma3:1b": {"tokens_per_second": 90.0}}, str(path)
+    )
+    monkeypatch.setattr(library, "BENCHMARKS_JSON", str(path))
+    monkeypatch.setattr(library, "LIBRARY_JSON", str(tmp_path / "missing.json"))
+
+    library.main(["--benchmarks", "--sort", "name"])
+
+    output = capsys.readouterr().out
+    assert "Tokens/s" in output
+    assert "gemma3:1b" in output and "90.0" in output
@@ -0,0 +1,162 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+import library
+from library_index import write_index
+from tests.test_library_index import RECORDS
+
+
+@pytest.fixture
+def library_files(monkeypatch, tmp_path):
+    library_json = tmp_path / "library.json"
+    library_db = tmp_path / "library.db"
+    library_json.write_text(json.dumps(RECORDS))
+    monkeypatch.setattr(library, "LIBRARY_JSON", str(library_json))
+    monkeypatch.setattr(library, "LIBRARY_DB", str(library_db))
+    return library_json, library_db
+
+
+def test_parse_age():
+    assert library.parse_age("30d") == 30
+    assert library.parse_age("2w") == 14
+    assert library.parse_age("1y") == 365
+    assert library.parse_age("45") == 45
+    with pytest.raises(argparse.ArgumentTypeError):
+        library.parse_age("soon")
+
+
+def test_filter_models_matches_the_index_rules():
+    rows = library.filter_models(RECORDS, capability="tools", max_size=50)
+
+    assert rows == [
+        ["llama3.1", "8b, 70b", "3 days ago", 3],
+        ["mixtral", "8x7b", "5 months ago", 150],
+    ]
+    assert library.filter_models(RECORDS, updated_within=30)[1][0] == "gemma3"
+
+
+def test_query_uses_the_index(library_files, monkeypatch):
+    library_json, library_db = library_files
+    write_index(str(library_db), [dict(RECORDS[0], name="from-index")])
+    monkeypatch.setattr(library, "load_model_data", pytest.fail)
+
+    rows = library.query_models(capability="tools")
+
+    assert [row[0] for row in rows] == ["from-index"]
+
+
+def test_query_falls_back_to_json(library_files):
+    library_json, library_db = library_files
+
+    # No index at all
+    assert [row[0] for row in library.query_models(capability="vision")] == ["gemma3"]
+
+    # An index older than library.json
+    write_index(str(library_db), [])
+    os.utime(library_db, (0, 0))
+    assert [row[0] for row in library.query_models(capability="vision")] == ["gemma3"]
+
+
+def test_process_model_data_sorts_every_size_form():
+    model = {
+        "name": "mixed",
+        "last_updated": "3 days ago",
+        "parameter_sizes": {
+            "8x7b": 26.0,
+            "1.5b": 1.1,
+            "latest": 4.7,
+            "270m": 0.3,
+            "8b": 4.9,
+        },
+    }
+
+    ((name, sizes, last_updated, days_ago),) = library.process_model_data([model])
+
+    assert sizes == "270m, 1.5b, 8b, 8x7b, latest"
+    assert days_ago == 3
+
+
+def test_process_model_data_uses_precomputed_fields():
+    now = time.time()
+    model = {
+        "name": "fresh",
+        # The raw string went stale, but the timestamp from the scrape didn't
+        "last_updated": "2 days ago",
+        "updated_at": now - 100 * 86400,
+        "parameter_sizes": {"big": 40.0, "small": 1.0},
+        "parameter_counts": {"big": 70 * 10**9, "small": 10**9},
+    }
+
+    assert library.process_model_data([model]) == []
+    ((_, sizes, _, days_ago),) = library.filter_models([model])
+    assert sizes == "small, big"
+    assert 99.9 < days_ago < 100.1
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64 * 1024])
+def test_iter_model_data_reads_arrays_and_jsonl(tmp_path, chunk_size):
+    array = tmp_path / "library.json"
+    array.write_text(json.dumps(RECORDS, indent=4))
+    lines = tmp_path / "library.jsonl"
+    lines.write_text("".join(json.dumps(record) + "\n" for record in RECORDS))
+
+    assert list(library.iter_model_data(str(array), chunk_size)) == RECORDS
+    assert list(library.iter_model_data(str(lines), chunk_size)) == RECORDS
+
+
+def test_iter_model_data_rejects_a_truncated_file(tmp_path):
+    path = tmp_path / "library.json"
+    path.write_text(json.dumps(RECORDS)[:-20])
+
+    with pytest.raises(json.JSONDecodeError):
+        list(library.iter_model_data(str(path), chunk_size=16))
+
+
+def test_iter_model_data_memory_does_not_grow_with_the_file(tmp_path):
+    path = tmp_path / "library.json"
+    path.write_text(json.dumps([dict(RECORDS[0], name=f"m{i}") for i in range(50000)]))
+
+    tracemalloc.start()
+    count = sum(1 for _ in library.iter_model_data(str(path)))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert count == 50000
+    # A few read chunks, not the 7 MB file
+    assert peak < 1024 * 1024
+
+
+def test_print_table_streaming_pages(capsys):
+    rows = ([f"m{i}", "8b", "3 days ago", 3] for i in range(5))
+
+    library.print_table_streaming(rows, page_size=2)
+
+    output = capsys.readouterr().out
+    assert output.count("Model Name") == 3
+    assert output.index("m0") < output.index("m4")
+
+
+def test_stream_output_can_be_piped_to_head(tmp_path):
+    path = tmp_path / "library.json"
+    model = dict(RECORDS[0], updated_at=time.time())
+    path.write_text(json.dumps([dict(model, name=f"m{i}") for i in range(50000)]))
+
+    pipeline = subprocess.run(
+        f"{sys.executable} library.py --stream --file {path} | head -n 5",
+        shell=True,
+        capture_output=True,
+        text=True,
+        cwd=Path(library.__file__).parent,
+        timeout=60,
+    )
+
+    assert len(pipeline.stdout.splitlines()) == 5
+    assert "Traceback" not in pipeline.stderr
@@ -0,0 +1,74 @@
+import sqlite3
+
+import pytest
+
+from library_index import query_index, write_index
+
+NOW = 1_700_000_000
+DAY = 86400
+
+RECORDS = [
+    {
+        "name": "llama3.1",
+        "last_updated": "3 days ago",
+        "capabilities": ["tools"],
+        "parameter_sizes": {"8b": 4.9, "70b": 43.0, "405b": 243.0},
+    },
+    {
+        "name": "mixtral",
+        "last_updated": "5 months ago",
+        "capabilities": ["tools"],
+        "parameter_sizes": {"8x7b": 26.0, "8x22b": 80.0},
+    },
+    {
+        "name": "gemma3",
+        "last_updated": "2 weeks ago",
+        "capabilities": ["vision"],
+        "parameter_sizes": {"270m": 0.292, "1b": 0.815, "4b": 3.3},
+    },
+]
+AGES = {"llama3.1": 3, "mixtral": 150, "gemma3": 14}
+
+
+@pytest.fixture
+def index(tmp_path):
+    path = str(tmp_path / "library.db")
+    count = write_index(path, RECORDS, lambda record: NOW - AGES[record["name"]] * DAY)
+    assert count == 3
+    return path
+
+
+def names(rows):
+    return sorted(row[0] for row in rows)
+
+
+def test_query_without_filters_returns_everything(index):
+    rows = query_index(index, now=NOW)
+
+    assert names(rows) == ["gemma3", "llama3.1", "mixtral"]
+    assert ["gemma3", "270m, 1b, 4b", "2 weeks ago", 14.0] in rows
+
+
+def test_query_combines_filters(index):
+    assert names(query_index(index, capability="TOOLS", now=NOW)) == [
+        "llama3.1",
+        "mixtral",
+    ]
+    assert names(
+        query_index(index, capability="tools", updated_within=30, now=NOW)
+    ) == ["llama3.1"]
+
+
+def test_max_size_limits_models_and_listed_sizes(index):
+    rows = query_index(index, max_size=8, now=NOW)
+
+    assert sorted(rows) == [
+        ["gemma3", "270m, 1b, 4b", "2 weeks ago", 14.0],
+        ["llama3.1", "8b", "3 days ago", 3.0],
+    ]
+
+
+def test_missing_index_raises(tmp_path):
+    with pytest.raises(sqlite3.Error):
+        query_index(str(tmp_path / "missing.db"))
+    assert not (tmp_path / "missing.db").exists()
@@ -0,0 +1,81 @@
+import json
+import logging
+import logging.handlers
+import threading
+
+import logger_config
+
+
+def logger_name(tmp_path, monkeypatch, name):
+    monkeypatch.setenv("LOGS_PATH", str(tmp_path))
+    return f"test_logger_config.{name}"
+
+
+def test_setup_logger_twice_does_not_duplicate_lines(tmp_path, monkeypatch):
+    name = logger_name(tmp_path, monkeypatch, "twice")
+
+    logger = logger_config.setup_logger(name)
+    assert logger_config.setup_logger(name) is logger
+    logger.info("hello")
+
+    assert len(logger.handlers) == 2
+    assert (tmp_path / f"{name}.log").read_text().count("hello") == 1
+
+
+def test_queued_logger_writes_in_the_background(tmp_path, monkeypatch):
+    name = logger_name(tmp_path, monkeypatch, "queued")
+    writers = []
+    original_emit = logging.FileHandler.emit
+
+    def emit(self, record):
+        if self.baseFilename == str(tmp_path / f"{name}.log"):
+            writers.append(threading.current_thread())
+        original_emit(self, record)
+
+    monkeypatch.setattr(logging.FileHandler, "emit", emit)
+
+    logger = logger_config.setup_logger(name, queued=True)
+    logger.info("first")
+    logger_config.setup_logger(name, queued=True).info("second")
+    logger_config.flush_logger(name)
+
+    assert [type(handler) for handler in logger.handlers] == [
+        logging.handlers.QueueHandler
+    ]
+    lines = (tmp_path / f"{name}.log").read_text().splitlines()
+    assert [line.rsplit(": ", 1)[1] for line in lines] == ["first", "second"]
+    assert writers and threading.main_thread() not in writers
+
+
+def test_json_lines_format(tmp_path, monkeypatch):
+    name = logger_name(tmp_path, monkeypatch, "json")
+
+    logger = logger_config.setup_logger(name, queued=True, log_format="json")
+    logger.warning("pulled %s", "llama3")
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("failed")
+    logger_config.flush_logger(name)
+
+    lines = [json.loads(line) for line in (tmp_path / f"{name}.log").open()]
+    assert lines[0]["level"] == "WARNING"
+    assert lines[0]["message"] == "pulled llama3"
+    assert lines[0]["logger"] == name
+    assert "ValueError: boom" in lines[1]["exception"]
+
+
+def test_size_based_rotation(tmp_path, monkeypatch):
+    name = logger_name(tmp_path, monkeypatch, "rotating")
+    monkeypatch.setenv("LOG_BACKUP_COUNT", "2")
+
+    logger = logger_config.setup_logger(name, max_bytes=1000)
+    for index in range(100):
+        logger.info("line %d", index)
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        f"{name}.log",
+        f"{name}.log.1",
+        f"{name}.log.2",
+    ]
+    assert (tmp_path / f"{name}.log").stat().st_size <= 1000
@@ -0,0 +1,127 @@
+import json
+import urllib.request
+from types import SimpleNamespace
+
+import ollama
+import pytest
+from scrapy.http import HtmlResponse, Request
+
+import metrics
+import update
+from ollama_scraper.extensions import MetricsExtension
+from ollama_scraper.spiders.ollama_models import OllamaModelsSpider
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """
+    A fresh shared registry for each test
+    """
+    fresh = metrics.Metrics(buckets=(0.1, 1))
+    monkeypatch.setattr(metrics, "registry", fresh)
+    monkeypatch.setattr(metrics, "inc", fresh.inc)
+    monkeypatch.setattr(metrics, "observe", fresh.observe)
+    monkeypatch.setattr(metrics, "timer", fresh.timer)
+    return fresh
+
+
+def test_render_prometheus_text(registry):
+    registry.inc("pulls_total", help_text="Model pulls", status="success")
+    registry.inc("pulls_total", 2, status="success")
+    registry.inc("pulls_total", status='say "hi"')
+    registry.observe("pull_seconds", 0.05)
+    registry.observe("pull_seconds", 5)
+
+    assert registry.render().splitlines() == [
+        "# HELP pulls_total Model pulls",
+        "# TYPE pulls_total counter",
+        'pulls_total{status="say \\"hi\\""} 1',
+        'pulls_total{status="success"} 3',
+        "# TYPE pull_seconds histogram",
+        'pull_seconds_bucket{le="0.1"} 1',
+        'pull_seconds_bucket{le="1"} 1',
+        'pull_seconds_bucket{le="+Inf"} 2',
+        "pull_seconds_sum 5.05",
+        "pull_seconds_count 2",
+    ]
+
+
+def test_timer_records_when_the_block_raises(registry):
+    with pytest.raises(ValueError):
+        with registry.timer("work_seconds", step="parse"):
+            raise ValueError
+
+    assert registry.value("work_seconds", step="parse") == 1
+
+
+def test_dump_and_serve(registry, tmp_path):
+    registry.inc("runs_total")
+    path = tmp_path / "metrics" / "update.prom"
+
+    assert metrics.dump(str(path)) == str(path)
+    server = registry.serve(0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            served = response.read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert path.read_text() == served == "# TYPE runs_total counter\nruns_total 1\n"
+    assert metrics.dump("") == ""
+    assert metrics.start(port=0) is None
+
+
+def test_update_records_listing_and_pulls(registry, stand_in, unused_url):
+    body = json.dumps({"models": [{"name": "a:1b"}]}).encode()
+    url = stand_in({("GET", "/api/tags"): (200, body)})
+
+    assert update.get_models(f"{url}/api") == [{"name": "a:1b"}]
+    update.get_models(f"{unused_url}/api")
+    update.pull_model(ollama.Client(host=unused_url), "a:1b")
+
+    assert registry.value("ollama_mgmt_get_models_seconds") == 2
+    assert registry.value("ollama_mgmt_get_models_errors_total") == 1
+    assert registry.value("ollama_mgmt_http_response_bytes_total", endpoint="tags") == (
+        len(body)
+    )
+    assert registry.value("ollama_mgmt_pulls_total", status="error") == 1
+    assert registry.value("ollama_mgmt_pull_seconds", status="error") == 1
+
+
+def extension(**settings):
+    crawler = SimpleNamespace(
+        settings=SimpleNamespace(
+            get=lambda name: settings.get(name),
+            getint=lambda name: settings.get(name, 0),
+        )
+    )
+    return MetricsExtension(crawler)
+
+
+def test_extension_records_responses_and_writes_per_shard(registry, tmp_path):
+    spider = OllamaModelsSpider(shard=1, shards=2)
+    request = Request(
+        "https://ollama.com/library/a:1b",
+        callback=spider.parse_model_page,
+        meta={"download_latency": 0.5},
+    )
+    response = HtmlResponse(request.url, body=b"<p>1GB</p>", request=request)
+    cached = HtmlResponse(request.url, body=b"<p>1GB</p>", flags=["cached"])
+    ext = extension(METRICS_FILE=str(tmp_path / "scrape.prom"))
+
+    ext.response_received(response, request, spider)
+    ext.response_received(cached, Request(request.url), spider)
+    ext.spider_closed(spider)
+
+    latency = registry.value(
+        "ollama_scraper_download_seconds", callback="parse_model_page"
+    )
+    assert latency == 1
+    assert registry.value(
+        "ollama_scraper_response_bytes_total", callback="parse", cached=True
+    ) == len(b"<p>1GB</p>")
+    assert "ollama_scraper_responses_total" in (
+        (tmp_path / "scrape-shard-1.prom").read_text()
+    )
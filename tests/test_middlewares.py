@@ -0,0 +1,138 @@
+import json
+import os
+import subprocess
+import sys
+
+from ollama_scraper.middlewares import AIMDController
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def controller(**kwargs):
+    settings = dict(start=4, minimum=1, maximum=6, window=2, latency_tolerance=3.0)
+    settings.update(kwargs)
+    return AIMDController(**settings)
+
+
+def test_grows_by_one_per_healthy_window():
+    aimd = controller()
+
+    reasons = [aimd.record(latency=0.1) for _ in range(4)]
+
+    assert reasons == [None, "healthy", None, "healthy"]
+    assert aimd.concurrency == 6
+
+
+def test_never_grows_past_maximum():
+    aimd = controller(start=6)
+
+    for _ in range(10):
+        aimd.record(latency=0.1)
+
+    assert aimd.concurrency == 6
+
+
+def test_halves_on_throttling_once_per_window():
+    aimd = controller(start=8, maximum=8)
+
+    assert aimd.record(latency=0.01, throttled=True) == "throttled"
+    assert aimd.record(latency=0.01, throttled=True) is None
+    assert aimd.concurrency == 4
+    assert aimd.throttled == 2
+
+
+def test_halves_when_latency_climbs():
+    aimd = controller(start=4, window=1)
+    aimd.record(latency=0.1)
+
+    reason = aimd.record(latency=2.0)
+
+    assert reason.startswith("latency")
+    assert aimd.concurrency == 2
+
+
+def test_throttled_responses_do_not_set_latency_baseline():
+    aimd = controller()
+    aimd.record(latency=0.001, throttled=True)
+
+    assert aimd.baseline is None
+
+
+def test_never_drops_below_minimum():
+    aimd = controller(start=1, window=1)
+
+    aimd.record(error=True)
+
+    assert aimd.concurrency == 1
+
+
+def crawl(url):
+    """
+    Crawl /c, then /a and /b from its links, one request at a time, and print
+    the pages reached. Runs in its own process for a fresh reactor.
+    """
+    # pylint: disable=import-outside-toplevel
+    import scrapy
+    from scrapy.crawler import CrawlerProcess
+
+    reached = []
+
+    class RedirectSpider(scrapy.Spider):
+        name = "redirects"
+
+        async def start(self):
+            yield scrapy.Request(f"{url}/c")
+
+        def parse(self, response):
+            reached.append(response.url[len(url) :])
+            if response.url.endswith("/c"):
+                yield scrapy.Request(f"{url}/a", priority=1)
+                yield scrapy.Request(f"{url}/b")
+
+    process = CrawlerProcess(
+        {
+            "LOG_LEVEL": "WARNING",
+            "ROBOTSTXT_OBEY": False,
+            "TELNETCONSOLE_ENABLED": False,
+            "CLOSESPIDER_TIMEOUT": 20,
+            "ADAPTIVE_CONCURRENCY_ENABLED": True,
+            "ADAPTIVE_CONCURRENCY_START": 1,
+            "ADAPTIVE_CONCURRENCY_MAX": 1,
+            "DOWNLOADER_MIDDLEWARES": {
+                "ollama_scraper.middlewares.AdaptiveConcurrencyMiddleware": 560,
+            },
+            "TWISTED_REACTOR": "twisted.internet.asyncioreactor.AsyncioSelectorReactor",
+        }
+    )
+    process.crawl(RedirectSpider)
+    process.start()
+    print(json.dumps(reached))
+
+
+def test_redirect_to_a_seen_page_gives_its_place_back(stand_in):
+    page = (200, b"<html></html>")
+
+    def redirect(handler):
+        handler.send_response(302)
+        handler.send_header("Location", "/c")
+        handler.send_header("Content-Length", "0")
+        handler.end_headers()
+
+    url = stand_in({("GET", "/a"): redirect, ("GET", "/b"): page, ("GET", "/c"): page})
+
+    # The redirect to /c is dropped by the dupefilter. With only one place,
+    # /b is never downloaded if the redirect keeps it.
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"from tests.test_middlewares import crawl; crawl({url!r})",
+        ],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        timeout=60,
+        check=True,
+    )
+
+    assert json.loads(result.stdout.splitlines()[-1]) == ["/c", "/b"]
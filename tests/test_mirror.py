@@ -0,0 +1,141 @@
+import hashlib
+import threading
+
+import pytest
+import requests
+
+import mirror
+
+
+def blob(content):
+    return f"sha256:{hashlib.sha256(content).hexdigest()}"
+
+
+@pytest.fixture
+def start_mirror(tmp_path):
+    """
+    Start a mirror in front of an upstream URL; returns its URL
+    """
+    servers = []
+
+    def start(upstream, max_size=1024):
+        server = mirror.make_server(
+            port=0,
+            cache_dir=tmp_path / "blobs",
+            max_size=max_size,
+            upstream=upstream,
+            address="127.0.0.1",
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def upstream_blobs(stand_in, contents, fetched):
+    """
+    Start a stand-in registry serving blobs and recording each fetch
+    """
+
+    def serve(content):
+        def respond(handler):
+            handler.send_response(200)
+            handler.send_header("Content-Length", str(len(content)))
+            handler.end_headers()
+            if handler.command == "GET":
+                fetched.append(handler.path)
+                handler.wfile.write(content)
+
+        return respond
+
+    routes = {}
+    for content in contents:
+        for method in ("GET", "HEAD"):
+            routes[(method, f"/v2/library/a/blobs/{blob(content)}")] = serve(content)
+    return stand_in(routes)
+
+
+def test_mirror_fetches_blob_once(stand_in, start_mirror):
+    content = b"0123456789" * 10
+    fetched = []
+    url = start_mirror(upstream_blobs(stand_in, [content], fetched))
+    blob_url = f"{url}/v2/library/a/blobs/{blob(content)}"
+
+    assert requests.get(blob_url, timeout=5).content == content
+    assert requests.get(blob_url, timeout=5).content == content
+
+    stats = requests.get(f"{url}/mirror/stats", timeout=5).json()
+    assert len(fetched) == 1
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["bytes_saved"] == len(content)
+
+
+def test_first_pull_in_ranges_saves_nothing(stand_in, start_mirror):
+    content = bytes(range(250)) * 4
+    fetched = []
+    url = start_mirror(upstream_blobs(stand_in, [content], fetched))
+    blob_url = f"{url}/v2/library/a/blobs/{blob(content)}"
+
+    # Ollama checks the blob, then downloads it in ranges
+    head = requests.head(blob_url, timeout=5)
+    assert head.status_code == 200
+    assert head.headers["Content-Length"] == str(len(content))
+    assert fetched == []
+    ranges = [
+        requests.get(
+            blob_url, headers={"Range": f"bytes={start}-{start + 249}"}, timeout=5
+        )
+        for start in range(0, 1000, 250)
+    ]
+    assert b"".join(response.content for response in ranges) == content
+
+    stats = requests.get(f"{url}/mirror/stats", timeout=5).json()
+    assert len(fetched) == 1
+    assert stats["hits"] == 0 and stats["misses"] == 4
+    assert stats["bytes_fetched"] == stats["bytes_served"] == len(content)
+    assert stats["bytes_saved"] == 0
+
+    # A second pull is served from the cache
+    requests.head(blob_url, timeout=5)
+    requests.get(blob_url, timeout=5)
+    stats = requests.get(f"{url}/mirror/stats", timeout=5).json()
+    assert stats["hits"] == 1 and stats["bytes_saved"] == len(content)
+
+
+def test_mirror_serves_ranges(stand_in, start_mirror):
+    content = b"0123456789"
+    url = start_mirror(upstream_blobs(stand_in, [content], []))
+    blob_url = f"{url}/v2/library/a/blobs/{blob(content)}"
+
+    response = requests.get(blob_url, headers={"Range": "bytes=2-5"}, timeout=5)
+    assert response.status_code == 206
+    assert response.content == b"2345"
+    assert response.headers["Content-Range"] == "bytes 2-5/10"
+
+    response = requests.get(blob_url, headers={"Range": "bytes=20-"}, timeout=5)
+    assert response.status_code == 416
+
+
+def test_mirror_evicts_least_recently_used(stand_in, start_mirror, tmp_path):
+    first, second = b"a" * 600, b"b" * 600
+    url = start_mirror(upstream_blobs(stand_in, [first, second], []), max_size=1000)
+
+    for content in (first, second):
+        requests.get(f"{url}/v2/library/a/blobs/{blob(content)}", timeout=5)
+
+    cached = {path.name for path in (tmp_path / "blobs").iterdir()}
+    assert cached == {blob(second).replace(":", "-")}
+
+
+def test_mirror_rejects_digest_mismatch(stand_in, start_mirror):
+    digest = blob(b"expected")
+    upstream = stand_in({("GET", f"/v2/library/a/blobs/{digest}"): (200, b"other")})
+    url = start_mirror(upstream)
+
+    response = requests.get(f"{url}/v2/library/a/blobs/{digest}", timeout=5)
+    assert response.status_code == 404
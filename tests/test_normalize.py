@@ -0,0 +1,30 @@
+import pytest
+
+from normalize import parameter_count, relative_days, updated_timestamp
+
+
+@pytest.mark.parametrize(
+    "size, count",
+    [
+        ("8b", 8 * 10**9),
+        ("1.5b", 1_500_000_000),
+        ("270m", 270_000_000),
+        ("8x7b", 56 * 10**9),
+        ("8x22b", 176 * 10**9),
+        ("e2b", 2 * 10**9),
+        ("30b-a3b", 30 * 10**9),
+        ("405B", 405 * 10**9),
+        ("latest", None),
+        ("fp16", None),
+        ("", None),
+    ],
+)
+def test_parameter_count(size, count):
+    assert parameter_count(size) == count
+
+
+def test_updated_timestamp():
+    assert updated_timestamp("2 weeks ago", 1_700_000_000) == 1_700_000_000 - 14 * 86400
+    assert updated_timestamp("an hour ago", 1_700_000_000) == 1_700_000_000 - 3600
+    assert updated_timestamp("-", 1_700_000_000) is None
+    assert relative_days(None) is None
@@ -0,0 +1,71 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import ollama_mgmt
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_library_runs_without_heavy_imports(tmp_path):
+    library = tmp_path / "library.json"
+    library.write_text(
+        json.dumps(
+            [
+                {
+                    "name": "gemma3",
+                    "last_updated": "2 days ago",
+                    "capabilities": ["vision"],
+                    "parameter_sizes": {"4b": 3.3},
+                }
+            ]
+        )
+    )
+    script = (
+        "import sys, ollama_mgmt\n"
+        "try:\n"
+        "    ollama_mgmt.main(sys.argv[1:])\n"
+        "finally:\n"
+        "    heavy = {'scrapy', 'twisted', 'ollama', 'requests', 'httpx'}\n"
+        "    print('loaded:', sorted(heavy & set(sys.modules)))\n"
+    )
+
+    result = subprocess.run(
+        [sys.executable, "-c", script, "library", "--file", str(library)],
+        cwd=ROOT,
+        env=dict(os.environ, LOGS_PATH=str(tmp_path)),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert "gemma3" in result.stdout
+    assert "loaded: []" in result.stdout
+
+
+def test_status_reports_running_services(monkeypatch, stand_in, unused_url, capsys):
+    url = stand_in({("GET", "/"): (200, b"Ollama is running")})
+    monkeypatch.setattr(ollama_mgmt, "OLLAMA_URL", url)
+    monkeypatch.setattr(ollama_mgmt, "OPEN_WEBUI_URL", unused_url)
+
+    with pytest.raises(SystemExit) as exit_info:
+        ollama_mgmt.main(["status"])
+
+    assert exit_info.value.code == 0
+    assert capsys.readouterr().out.splitlines() == [
+        "ollama     : Ollama is running",
+        "open-webui : down",
+    ]
+
+
+def test_subcommands_get_the_remaining_arguments(monkeypatch):
+    seen = []
+    monkeypatch.setitem(ollama_mgmt.COMMANDS, "update", seen.append)
+
+    with pytest.raises(SystemExit):
+        ollama_mgmt.main(["update", "--plan", "--help"])
+
+    assert seen == [["--plan", "--help"]]
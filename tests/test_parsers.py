@@ -0,0 +1,66 @@
+import pytest
+from scrapy.http import HtmlResponse
+
+from ollama_scraper.parsers import PARSERS
+from ollama_scraper.spiders.ollama_models import OllamaModelsSpider
+from tests.test_spider import fixture_response, listing_response
+
+
+@pytest.mark.parametrize("backend", sorted(PARSERS))
+def test_listing_parsers(backend):
+    listing, _ = PARSERS[backend]
+
+    entries = listing(listing_response())
+
+    assert [entry["name"] for entry in entries] == ["llama3.1", "mixtral", "gemma3"]
+    assert entries[1] == {
+        "name": "mixtral",
+        "description": "A set of Mixture of Experts (MoE) model with open weights by Mistral AI.",
+        "href": "/library/mixtral",
+        "parameter_sizes": ["8x7b", "8x22b"],
+        "capabilities": ["tools"],
+        "last_updated": "5 months ago",
+    }
+
+
+@pytest.mark.parametrize("backend", sorted(PARSERS))
+def test_variant_parsers(backend):
+    _, variant = PARSERS[backend]
+    response = fixture_response(
+        "variant.html", "https://ollama.com/library/llama3.1:8b"
+    )
+
+    assert variant(response) == (4.9, "3 days ago")
+
+
+def test_backends_agree_on_nested_and_missing_text():
+    body = b"""<html><body>
+    <a href="/library/odd"><span class="x group-hover:underline"><b>bold</b> odd </span>
+    <p></p><p>second <i>para</i> tail</p>
+    <span x-test-size> 7B <!-- note --> 13b</span></a>
+    <a href="/library/bare"></a>
+    <p>no size here</p><p>about <em>1.2</em> 3.4 GB</p>
+    </body></html>"""
+    response = HtmlResponse("https://ollama.com/library", body=body, encoding="utf-8")
+
+    (css_listing, css_variant), (lxml_listing, lxml_variant) = (
+        PARSERS["css"],
+        PARSERS["lxml"],
+    )
+    assert lxml_listing(response) == css_listing(response)
+    assert lxml_variant(response) == css_variant(response) == (3.4, None)
+
+
+def test_spider_backends_yield_the_same_requests():
+    def crawl(parser):
+        return [
+            (request.url, request.meta)
+            for request in OllamaModelsSpider(parser=parser).parse(listing_response())
+        ]
+
+    assert crawl("lxml") == crawl("css")
+
+
+def test_spider_rejects_unknown_parser():
+    with pytest.raises(ValueError):
+        OllamaModelsSpider(parser="regex")
@@ -0,0 +1,124 @@
+import json
+
+from library_index import query_index
+from ollama_scraper.pipelines import MergeModelsPipeline
+from ollama_scraper.spiders.ollama_models import OllamaModelsSpider
+
+
+def variant(name, size, size_gb):
+    return {
+        "name": name,
+        "description": f"{name} description",
+        "url": f"https://ollama.com/library/{name}",
+        "parameter_size": size,
+        "size_gb": size_gb,
+        "last_updated": "3 days ago",
+        "capabilities": ["tools"],
+    }
+
+
+def test_merges_variants_and_carried_records():
+    pipeline = MergeModelsPipeline()
+    spider = OllamaModelsSpider()
+    carried = {
+        "name": "mixtral",
+        "last_updated": "2 days ago",
+        "parameter_sizes": {"8x7b": 26.0},
+    }
+
+    pipeline.process_item(variant("llama3.1", "8b", 4.9), spider)
+    pipeline.process_item(variant("llama3.1", "70b", 43.0), spider)
+    pipeline.process_item({"record": carried}, spider)
+
+    assert pipeline.models["llama3.1"]["parameter_sizes"] == {"8b": 4.9, "70b": 43.0}
+    assert pipeline.models["llama3.1"]["capabilities"] == ["tools"]
+    assert pipeline.models["mixtral"] == dict(
+        carried,
+        updated_at=int(pipeline.scraped_at - 2 * 86400),
+        parameter_counts={"8x7b": 56 * 10**9},
+    )
+
+
+def test_close_writes_same_layout_as_json_dump(tmp_path):
+    output = tmp_path / "library.json"
+    pipeline = MergeModelsPipeline(output_path=str(output))
+    spider = OllamaModelsSpider()
+
+    pipeline.process_item(variant("llama3.1", "8b", 4.9), spider)
+    pipeline.process_item(variant("gemma3", "1b", 0.8), spider)
+    pipeline.close_spider(spider)
+
+    expected = json.dumps(list(pipeline.models.values()), indent=4)
+    assert output.read_text() == expected
+
+
+def test_streaming_journals_finished_models(tmp_path):
+    output = tmp_path / "library.json"
+    journal = tmp_path / "library.jsonl"
+    pipeline = MergeModelsPipeline(str(output), str(journal), streaming=True)
+    spider = OllamaModelsSpider()
+    pipeline.open_spider(spider)
+
+    pipeline.process_item(dict(variant("llama3.1", "8b", 4.9), variant_count=2), spider)
+    assert journal.read_text() == ""
+    pipeline.process_item(
+        dict(variant("llama3.1", "70b", 43.0), variant_count=2), spider
+    )
+    assert json.loads(journal.read_text())["parameter_sizes"] == {
+        "8b": 4.9,
+        "70b": 43.0,
+    }
+    assert pipeline.models == {}
+
+    pipeline.close_spider(spider)
+
+    assert [model["name"] for model in json.loads(output.read_text())] == ["llama3.1"]
+    assert not journal.exists()
+
+
+def test_streaming_resumes_from_torn_journal(tmp_path):
+    output = tmp_path / "library.json"
+    journal = tmp_path / "library.jsonl"
+    journal.write_text(json.dumps({"name": "mixtral"}) + '\n{"name": "gem')
+    pipeline = MergeModelsPipeline(str(output), str(journal), streaming=True)
+    spider = OllamaModelsSpider()
+    pipeline.open_spider(spider)
+
+    assert spider.journaled_models == {"mixtral"}
+
+    pipeline.process_item(dict(variant("gemma3", "1b", 0.8), variant_count=1), spider)
+    pipeline.close_spider(spider)
+
+    names = [model["name"] for model in json.loads(output.read_text())]
+    assert names == ["mixtral", "gemma3"]
+
+
+def test_close_rebuilds_the_index(tmp_path):
+    output = tmp_path / "library.json"
+    index = tmp_path / "library.db"
+    pipeline = MergeModelsPipeline(output_path=str(output), index_path=str(index))
+    spider = OllamaModelsSpider()
+
+    pipeline.process_item(variant("llama3.1", "8b", 4.9), spider)
+    pipeline.process_item(variant("llama3.1", "70b", 43.0), spider)
+    pipeline.close_spider(spider)
+
+    (row,) = query_index(str(index), capability="tools", max_size=8, updated_within=7)
+    assert row[:3] == ["llama3.1", "8b", "3 days ago"]
+    assert 2.9 < row[3] < 3.1
+
+
+def test_streaming_close_indexes_the_compacted_journal(tmp_path):
+    output = tmp_path / "library.json"
+    index = tmp_path / "library.db"
+    journal = tmp_path / "library.jsonl"
+    pipeline = MergeModelsPipeline(
+        str(output), str(journal), streaming=True, index_path=str(index)
+    )
+    spider = OllamaModelsSpider()
+    pipeline.open_spider(spider)
+
+    pipeline.process_item(dict(variant("gemma3", "1b", 0.8), variant_count=1), spider)
+    pipeline.close_spider(spider)
+
+    assert [row[0] for row in query_index(str(index))] == ["gemma3"]
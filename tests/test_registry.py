@@ -0,0 +1,59 @@
+import hashlib
+import json
+
+import registry
+
+
+def test_parse_model_name_with_tag(monkeypatch):
+    monkeypatch.setattr(registry, "OLLAMA_REGISTRY_URL", "https://registry.test")
+    assert registry.parse_model_name("llama3:8b") == (
+        "https://registry.test",
+        "library",
+        "llama3",
+        "8b",
+    )
+
+
+def test_parse_model_name_defaults_to_latest(monkeypatch):
+    monkeypatch.setattr(registry, "OLLAMA_REGISTRY_URL", "https://registry.test")
+    assert registry.parse_model_name("llama3")[3] == "latest"
+
+
+def test_parse_model_name_with_user_namespace(monkeypatch):
+    monkeypatch.setattr(registry, "OLLAMA_REGISTRY_URL", "https://registry.test")
+    assert registry.parse_model_name("user/model:tag") == (
+        "https://registry.test",
+        "user",
+        "model",
+        "tag",
+    )
+
+
+def test_parse_model_name_with_host():
+    assert registry.parse_model_name("host.example.com/ns/model:tag") == (
+        "https://host.example.com",
+        "ns",
+        "model",
+        "tag",
+    )
+
+
+def test_get_manifest_returns_body_digest(monkeypatch, stand_in):
+    body = json.dumps({"layers": [{"digest": "sha256:aa", "size": 1}]}).encode()
+    url = stand_in({("GET", "/v2/library/llama3/manifests/8b"): (200, body)})
+    monkeypatch.setattr(registry, "OLLAMA_REGISTRY_URL", url)
+
+    digest, manifest = registry.get_manifest("llama3:8b")
+
+    assert digest == hashlib.sha256(body).hexdigest()
+    assert manifest["layers"][0]["digest"] == "sha256:aa"
+
+
+def test_get_manifest_missing(monkeypatch, stand_in):
+    monkeypatch.setattr(registry, "OLLAMA_REGISTRY_URL", stand_in({}))
+    assert registry.get_manifest("llama3:8b") == (None, None)
+
+
+def test_get_manifest_unreachable(monkeypatch, unused_url):
+    monkeypatch.setattr(registry, "OLLAMA_REGISTRY_URL", unused_url)
+    assert registry.get_manifest("llama3:8b") == (None, None)
@@ -0,0 +1,123 @@
+import json
+import random
+import sys
+
+from scrapy.http import HtmlResponse
+
+from ollama_scraper import sharding
+from ollama_scraper.pipelines import MergeModelsPipeline, merge_shards
+from ollama_scraper.spiders.ollama_models import OllamaModelsSpider, shard_of
+from tests.test_spider import listing_response
+
+
+def crawl(output, seed, shard=0, shards=1):
+    """Run the spider and pipeline over the fixtures, answering variants in a random order"""
+    spider = OllamaModelsSpider(shard=shard, shards=shards)
+    pipeline = MergeModelsPipeline(output_path=str(output))
+    pipeline.scraped_at = 1_700_000_000  # Same timestamps in every run
+    pipeline.open_spider(spider)
+
+    requests = list(spider.parse(listing_response()))
+    random.Random(seed).shuffle(requests)
+    for request in requests:
+        body = f"<p>{len(request.url) / 10}GB</p><span x-test-updated>3 days ago</span>"
+        response = HtmlResponse(
+            request.url, body=body.encode(), encoding="utf-8", request=request
+        )
+        for item in spider.parse_model_page(response):
+            pipeline.process_item(item, spider)
+
+    pipeline.close_spider(spider)
+    return spider
+
+
+def test_shard_of_partitions_slugs_stably():
+    slugs = [f"model-{index}" for index in range(100)]
+
+    shards = [shard_of(slug, 3) for slug in slugs]
+
+    assert shards == [shard_of(slug, 3) for slug in slugs]
+    assert set(shards) == {0, 1, 2}
+
+
+def test_shards_split_the_listing():
+    followed = []
+    for shard in range(2):
+        spider = OllamaModelsSpider(shard=shard, shards=2)
+        followed += [
+            request.meta["model_slug"] for request in spider.parse(listing_response())
+        ]
+        assert spider.listing_names == ["llama3.1", "mixtral", "gemma3"]
+
+    assert sorted(set(followed)) == ["gemma3", "llama3.1", "mixtral"]
+    assert len(followed) == 8
+
+
+def test_single_process_output_follows_the_listing(tmp_path):
+    first, second = tmp_path / "first.json", tmp_path / "second.json"
+
+    crawl(first, seed=1)
+    crawl(second, seed=2)
+
+    models = json.loads(first.read_text())
+    assert [model["name"] for model in models] == ["llama3.1", "mixtral", "gemma3"]
+    assert list(models[2]["parameter_sizes"]) == ["270m", "1b", "4b"]
+    assert second.read_text() == first.read_text()
+
+
+def test_merged_shards_match_a_single_process_crawl(tmp_path):
+    single = tmp_path / "single.json"
+    crawl(single, seed=1)
+
+    partials = [tmp_path / f"shard-{shard}.json" for shard in range(3)]
+    for shard, partial in enumerate(partials):
+        crawl(partial, seed=1, shard=shard, shards=3)
+    merged = tmp_path / "library.json"
+    stats = merge_shards(partials, str(merged))
+
+    assert merged.read_text() == single.read_text()
+    assert [shard["shard"] for shard in stats] == [0, 1, 2]
+    assert sum(shard["variants"] for shard in stats) == 8
+
+
+def fake_shard(fail=None):
+    def command(shard, shards, output_path, extra_args=()):
+        partial = {
+            "shard": shard,
+            "shards": shards,
+            "listing": ["a", "b"],
+            "models": [{"name": "ab"[shard], "parameter_sizes": {"1b": 1.0}}],
+            "stats": {"models": 1, "variants": 1, "elapsed": 0.5},
+        }
+        script = (
+            f"import json, sys; json.dump({partial!r}, open({str(output_path)!r}, 'w'))"
+        )
+        if shard == fail:
+            script = "import sys; sys.exit(1)"
+        return [sys.executable, "-c", script]
+
+    return command
+
+
+def test_crawl_shards_merges_the_partials(tmp_path):
+    output = tmp_path / "library.json"
+
+    stats, _ = sharding.crawl_shards(
+        2, str(output), tmp_path / "shards", command=fake_shard()
+    )
+
+    assert [model["name"] for model in json.loads(output.read_text())] == ["a", "b"]
+    assert len(stats) == 2
+    assert list((tmp_path / "shards").iterdir()) == []
+
+
+def test_crawl_shards_keeps_output_when_a_shard_fails(tmp_path):
+    output = tmp_path / "library.json"
+    output.write_text("[]")
+
+    stats, _ = sharding.crawl_shards(
+        2, str(output), tmp_path / "shards", command=fake_shard(fail=1)
+    )
+
+    assert stats is None
+    assert output.read_text() == "[]"
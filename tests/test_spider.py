@@ -0,0 +1,177 @@
+import json
+import os
+import pickle
+from pathlib import Path
+
+from scrapy.http import HtmlResponse, Request
+
+from ollama_scraper.items import ModelContext
+from ollama_scraper.spiders import ollama_models
+from ollama_scraper.spiders.ollama_models import OllamaModelsSpider, relative_days
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def fixture_response(name, url, meta=None):
+    request = Request(url, meta=meta or {})
+    body = (FIXTURES / name).read_bytes()
+    return HtmlResponse(url, body=body, encoding="utf-8", request=request)
+
+
+def listing_response():
+    return fixture_response("library.html", "https://ollama.com/library")
+
+
+def test_relative_days():
+    assert relative_days("3 days ago") == 3
+    assert relative_days("2 weeks ago") == 14
+    assert relative_days("an hour ago") == 1 / 24
+    assert relative_days("yesterday") == 1
+    assert relative_days("-") is None
+
+
+def test_parse_follows_every_variant():
+    requests = list(OllamaModelsSpider().parse(listing_response()))
+
+    assert [request.url for request in requests] == [
+        "https://ollama.com/library/llama3.1:8b",
+        "https://ollama.com/library/llama3.1:70b",
+        "https://ollama.com/library/llama3.1:405b",
+        "https://ollama.com/library/mixtral:8x7b",
+        "https://ollama.com/library/mixtral:8x22b",
+        "https://ollama.com/library/gemma3:270m",
+        "https://ollama.com/library/gemma3:1b",
+        "https://ollama.com/library/gemma3:4b",
+    ]
+
+
+def test_incremental_parse_carries_unchanged_models(monkeypatch, tmp_path):
+    library_json = tmp_path / "library.json"
+    previous = [
+        {
+            "name": "mixtral",
+            "description": "old",
+            "url": "https://ollama.com/library/mixtral",
+            "last_updated": "5 months ago",
+            "capabilities": ["tools"],
+            "parameter_sizes": {"8x7b": 26.0, "8x22b": 80.0},
+        },
+        {
+            "name": "gemma3",
+            "description": "old",
+            "url": "https://ollama.com/library/gemma3",
+            "last_updated": "2 weeks ago",
+            "capabilities": ["vision"],
+            "parameter_sizes": {"1b": 0.8, "4b": 3.3},
+        },
+    ]
+    library_json.write_text(json.dumps(previous))
+    # The previous crawl ran two days ago
+    scraped = library_json.stat().st_mtime - 2 * 86400
+    os.utime(library_json, (scraped, scraped))
+    monkeypatch.setattr(ollama_models, "LIBRARY_JSON", str(library_json))
+
+    results = list(OllamaModelsSpider(incremental="true").parse(listing_response()))
+
+    records = [result["record"] for result in results if isinstance(result, dict)]
+    urls = [result.url for result in results if isinstance(result, Request)]
+    assert [record["name"] for record in records] == ["mixtral"]
+    assert records[0]["description"].startswith("A set of Mixture of Experts")
+    # llama3.1 is new and gemma3 gained a 270m size
+    assert all("mixtral" not in url for url in urls)
+    assert len(urls) == 6
+
+
+def test_parse_model_page():
+    spider = OllamaModelsSpider()
+    spider.model_contexts["llama3.1"] = ModelContext(
+        "llama3.1",
+        "desc",
+        "https://ollama.com/library/llama3.1",
+        ["8b", "70b"],
+        ["tools"],
+    )
+    response = fixture_response(
+        "variant.html",
+        "https://ollama.com/library/llama3.1:8b",
+        {"model_slug": "llama3.1", "param_size": "8b"},
+    )
+
+    (item,) = spider.parse_model_page(response)
+
+    assert item["size_gb"] == 4.9
+    assert item["last_updated"] == "3 days ago"
+    assert item["parameter_size"] == "8b"
+    assert item["description"] == "desc"
+    assert item["capabilities"] == ["tools"]
+    assert item["variant_count"] == 2
+
+
+def test_variant_requests_share_one_model_context():
+    spider = OllamaModelsSpider()
+
+    requests = list(spider.parse(listing_response()))
+
+    assert {tuple(request.meta) for request in requests} == {
+        ("model_slug", "param_size")
+    }
+    assert sorted(spider.model_contexts) == ["gemma3", "llama3.1", "mixtral"]
+    gemma3 = spider.model_contexts["gemma3"]
+    assert gemma3.parameter_sizes == ("270m", "1b", "4b")
+    assert gemma3.capabilities == ("vision",)
+    assert not hasattr(gemma3, "__dict__")
+
+
+def test_model_contexts_live_in_the_job_state():
+    spider = OllamaModelsSpider()
+    # Set by Scrapy's SpiderState extension when resuming a JOBDIR crawl
+    context = ModelContext(
+        "mixtral", "desc", "https://ollama.com/library/mixtral", ["8x7b"], []
+    )
+    spider.state = {"model_contexts": pickle.loads(pickle.dumps({"mixtral": context}))}
+    response = fixture_response(
+        "variant.html",
+        "https://ollama.com/library/mixtral:8x7b",
+        {"model_slug": "mixtral", "param_size": "8x7b"},
+    )
+
+    (item,) = spider.parse_model_page(response)
+
+    assert item["name"] == "mixtral"
+    assert item["url"] == "https://ollama.com/library/mixtral"
+
+
+def test_tags_page_mode_requests_one_page_per_model():
+    requests = list(OllamaModelsSpider(tags_page="true").parse(listing_response()))
+
+    assert [request.url for request in requests] == [
+        "https://ollama.com/library/llama3.1/tags",
+        "https://ollama.com/library/mixtral/tags",
+        "https://ollama.com/library/gemma3/tags",
+    ]
+
+
+def test_parse_tags_page_yields_every_size():
+    spider = OllamaModelsSpider()
+    spider.model_contexts["gemma3"] = ModelContext(
+        "gemma3",
+        "desc",
+        "https://ollama.com/library/gemma3",
+        ["270m", "1b", "4b", "12b"],
+        ["vision"],
+    )
+    response = fixture_response(
+        "tags.html", "https://ollama.com/library/gemma3/tags", {"model_slug": "gemma3"}
+    )
+
+    results = list(spider.parse_tags_page(response))
+
+    items = {item["parameter_size"]: item for item in results if isinstance(item, dict)}
+    assert items["270m"]["size_gb"] == 0.292
+    assert items["4b"]["size_gb"] == 3.3
+    assert items["4b"]["digest"] == "a2af6cc3eb7f"
+    assert items["1b"]["last_updated"] == "2 weeks ago"
+    assert items["1b"]["quantization"] == "q4_K_M"
+    # 12b isn't on the tags page, so it falls back to the variant page
+    (fallback,) = [result for result in results if isinstance(result, Request)]
+    assert fallback.url == "https://ollama.com/library/gemma3:12b"
@@ -0,0 +1,320 @@
+import hashlib
+import json
+import threading
+import time
+
+import ollama
+
+import registry
+import update
+
+
+def manifest(*blobs, config=None):
+    """
+    Build a raw manifest body from (digest, size) pairs
+    """
+    data = {"layers": [{"digest": digest, "size": size} for digest, size in blobs]}
+    if config:
+        data["config"] = {"digest": config[0], "size": config[1]}
+    return json.dumps(data).encode()
+
+
+def installed(name, body=b"", size=1):
+    """
+    Build an /api/tags model entry whose digest matches a manifest body
+    """
+    return {"name": name, "size": size, "digest": hashlib.sha256(body).hexdigest()}
+
+
+def test_select_outdated_models_skips_matching_digest(monkeypatch, stand_in):
+    body = manifest(("sha256:aa", 1))
+    url = stand_in({("GET", "/v2/library/a/manifests/1b"): (200, body)})
+    monkeypatch.setattr(registry, "OLLAMA_REGISTRY_URL", url)
+
+    assert update.select_outdated_models([installed("a:1b", body)]) == []
+
+
+def test_select_outdated_models_keeps_changed_digest(monkeypatch, stand_in):
+    body = manifest(("sha256:aa", 1))
+    url = stand_in({("GET", "/v2/library/a/manifests/1b"): (200, body)})
+    monkeypatch.setattr(registry, "OLLAMA_REGISTRY_URL", url)
+    model = installed("a:1b", b"older manifest")
+
+    assert update.select_outdated_models([model]) == [model]
+
+
+def test_select_outdated_models_keeps_missing_manifest(monkeypatch, stand_in):
+    monkeypatch.setattr(registry, "OLLAMA_REGISTRY_URL", stand_in({}))
+    model = installed("a:1b")
+
+    assert update.select_outdated_models([model]) == [model]
+
+
+def test_select_outdated_models_keeps_unreachable_registry(monkeypatch, unused_url):
+    monkeypatch.setattr(registry, "OLLAMA_REGISTRY_URL", unused_url)
+    model = installed("a:1b")
+
+    assert update.select_outdated_models([model]) == [model]
+
+
+def streaming_pull(events, delay=0.0, requests_seen=None):
+    """
+    Build a stand-in /api/pull handler that streams progress events
+    """
+
+    def respond(handler):
+        if requests_seen is not None:
+            requests_seen.append(json.loads(handler.body))
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/x-ndjson")
+        handler.end_headers()
+        try:
+            for event in events:
+                handler.wfile.write(json.dumps(event).encode() + b"\n")
+                handler.wfile.flush()
+                time.sleep(delay)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    return respond
+
+
+def progress(completed, total=1000):
+    return {
+        "status": "pulling aa",
+        "digest": "sha256:aa",
+        "total": total,
+        "completed": completed,
+    }
+
+
+def test_pull_model_streaming_counts_bytes(stand_in):
+    events = [progress(0), progress(400), progress(1000), {"status": "success"}]
+    url = stand_in({("POST", "/api/pull"): streaming_pull(events)})
+
+    result = update.pull_model_streaming(ollama.Client(host=url), "a:1b")
+
+    assert result["status"] == "success"
+    assert result["bytes"] == 1000
+
+
+def test_pull_model_streaming_retries_stalls(monkeypatch, stand_in):
+    monkeypatch.setattr(update, "PULL_STALL_TIMEOUT", 0.2)
+    monkeypatch.setattr(update, "PULL_RETRIES", 1)
+    seen = []
+    events = [progress(100)] * 30
+    url = stand_in({("POST", "/api/pull"): streaming_pull(events, 0.05, seen)})
+
+    result = update.pull_model_streaming(ollama.Client(host=url), "a:1b")
+
+    assert result["status"] == "stalled"
+    assert len(seen) == 2
+
+
+def test_pull_model_streaming_stall_check_disabled(monkeypatch, stand_in):
+    monkeypatch.setattr(update, "PULL_STALL_TIMEOUT", 0)
+    events = [progress(100)] * 3 + [{"status": "success"}]
+    url = stand_in({("POST", "/api/pull"): streaming_pull(events, 0.05)})
+
+    result = update.pull_model_streaming(ollama.Client(host=url), "a:1b")
+
+    assert result["status"] == "success"
+
+
+def test_pull_model_reports_unreachable_host(unused_url):
+    result = update.pull_model(ollama.Client(host=unused_url), "a:1b", stream=True)
+
+    assert result["status"].startswith("error")
+
+
+def test_plan_pulls_subtracts_local_blobs(monkeypatch, stand_in):
+    body = manifest(("sha256:local", 10), ("sha256:new", 20), config=("sha256:cfg", 5))
+    registry_url = stand_in({("GET", "/v2/library/a/manifests/1b"): (200, body)})
+    ollama_url = stand_in({("HEAD", "/api/blobs/sha256:local"): (200, b"")})
+    monkeypatch.setattr(registry, "OLLAMA_REGISTRY_URL", registry_url)
+    monkeypatch.setattr(update, "OLLAMA_API_URL", f"{ollama_url}/api")
+
+    batches, up_to_date, too_large = update.plan_pulls([installed("a:1b")])
+
+    assert up_to_date == [] and too_large == []
+    assert batches[0][0]["new_blobs"] == {"sha256:new": 20, "sha256:cfg": 5}
+    assert batches[0][0]["new_bytes"] == 25
+
+
+def test_plan_pulls_batches_shared_blobs(monkeypatch, stand_in):
+    registry_url = stand_in(
+        {
+            ("GET", "/v2/library/a/manifests/1b"): (
+                200,
+                manifest(("sha256:shared", 100), ("sha256:a", 1)),
+            ),
+            ("GET", "/v2/library/b/manifests/1b"): (
+                200,
+                manifest(("sha256:shared", 100)),
+            ),
+        }
+    )
+    monkeypatch.setattr(registry, "OLLAMA_REGISTRY_URL", registry_url)
+    monkeypatch.setattr(update, "OLLAMA_API_URL", f"{stand_in({})}/api")
+
+    batches, _, _ = update.plan_pulls([installed("a:1b"), installed("b:1b")])
+
+    assert [[entry["model"]["name"] for entry in batch] for batch in batches] == [
+        ["a:1b"],
+        ["b:1b"],
+    ]
+    assert batches[0][0]["new_bytes"] == 101
+    assert batches[1][0]["new_bytes"] == 0
+
+
+def test_plan_pulls_limits_new_bytes(monkeypatch, stand_in):
+    registry_url = stand_in(
+        {("GET", "/v2/library/a/manifests/1b"): (200, manifest(("sha256:a", 50)))}
+    )
+    monkeypatch.setattr(registry, "OLLAMA_REGISTRY_URL", registry_url)
+    monkeypatch.setattr(update, "OLLAMA_API_URL", f"{stand_in({})}/api")
+
+    batches, _, too_large = update.plan_pulls([installed("a:1b")], max_new_bytes=10)
+
+    assert batches == []
+    assert too_large[0]["new_bytes"] == 50
+
+
+def test_plan_pulls_unavailable_manifest(monkeypatch, stand_in):
+    monkeypatch.setattr(registry, "OLLAMA_REGISTRY_URL", stand_in({}))
+    monkeypatch.setattr(update, "OLLAMA_API_URL", f"{stand_in({})}/api")
+
+    batches, _, _ = update.plan_pulls([installed("a:1b")])
+
+    assert batches[0][0]["new_bytes"] is None
+
+
+def test_select_models_by_budget_prefers_used_and_pinned(monkeypatch, tmp_path):
+    gb = 1024**3
+    library_json = tmp_path / "library.json"
+    library_json.write_text(
+        json.dumps(
+            [
+                {"name": "fresh", "last_updated": "1 day ago"},
+                {"name": "stale", "last_updated": "2 years ago"},
+            ]
+        )
+    )
+    usage_json = tmp_path / "usage.json"
+    usage_json.write_text(json.dumps({"used:7b": 5}))
+    monkeypatch.setattr(update, "LIBRARY_JSON", str(library_json))
+    monkeypatch.setattr(update, "USAGE_JSON", str(usage_json))
+    models = [
+        {"name": "fresh:7b", "size": 4 * gb},
+        {"name": "stale:7b", "size": 4 * gb},
+        {"name": "used:7b", "size": 4 * gb},
+        {"name": "pinned:7b", "size": 4 * gb},
+    ]
+
+    keep, remove = update.select_models_by_budget(
+        models, budget=13 * gb, pinned=["pinned:7b"]
+    )
+
+    assert [model["name"] for model in keep] == ["pinned:7b", "fresh:7b", "used:7b"]
+    assert [model["name"] for model in remove] == ["stale:7b"]
+
+
+def test_mirror_name(monkeypatch):
+    monkeypatch.setattr(update, "OLLAMA_MIRROR", "mirror.local:8090")
+
+    assert update.mirror_name("llama3:8b") == "mirror.local:8090/library/llama3:8b"
+    assert update.mirror_name("user/model") == "mirror.local:8090/user/model:latest"
+
+
+def slow_pull(delay, seen, slow_models=None):
+    """
+    Build a stand-in /api/pull handler that answers after `delay` seconds,
+    recording the most pulls it had in flight at once
+    """
+    lock = threading.Lock()
+    seen.update(in_flight=0, most=0)
+
+    def respond(handler):
+        model = json.loads(handler.body)["model"]
+        with lock:
+            seen["in_flight"] += 1
+            seen["most"] = max(seen["most"], seen["in_flight"])
+        time.sleep(delay * 5 if model in (slow_models or ()) else delay)
+        with lock:
+            seen["in_flight"] -= 1
+        body = json.dumps({"status": "success"}).encode()
+        try:
+            handler.send_response(200)
+            handler.send_header("Content-Length", str(len(body)))
+            handler.end_headers()
+            handler.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    return respond
+
+
+def test_pull_models_overlaps_up_to_concurrency(monkeypatch, stand_in, capsys):
+    seen = {}
+    url = stand_in({("POST", "/api/pull"): slow_pull(0.2, seen)})
+    monkeypatch.setenv("OLLAMA_HOST", url)
+    models = [{"name": f"m{number}:1b"} for number in range(4)]
+
+    results = update.pull_models(models, concurrency=2)
+
+    assert sorted(results) == [model["name"] for model in models]
+    assert all(result["status"] == "success" for result in results.values())
+    assert seen["most"] == 2
+    # Four 0.2s pulls two at a time: about 0.4s wall for 0.8s summed
+    summary = capsys.readouterr().out.strip().splitlines()[-1]
+    assert "with 2 workers" in summary
+    overlap = float(summary.rsplit(", ", 1)[1].split("x")[0])
+    assert 1.5 < overlap <= 2.1
+
+
+def test_pull_models_times_out_one_model(monkeypatch, stand_in):
+    seen = {}
+    url = stand_in({("POST", "/api/pull"): slow_pull(0.1, seen, {"slow:1b"})})
+    monkeypatch.setenv("OLLAMA_HOST", url)
+
+    results = update.pull_models(
+        [{"name": "slow:1b"}, {"name": "fast:1b"}], concurrency=2, timeout=0.3
+    )
+
+    assert results["slow:1b"]["status"] == "timed out"
+    assert results["fast:1b"]["status"] == "success"
+
+
+def test_pull_models_reports_a_failed_worker(monkeypatch, stand_in):
+    url = stand_in({("POST", "/api/pull"): slow_pull(0, {})})
+    monkeypatch.setenv("OLLAMA_HOST", url)
+    pull_model = update.pull_model
+
+    def failing_pull(client, model_name, *args):
+        if model_name == "broken:1b":
+            raise RuntimeError("worker crashed")
+        return pull_model(client, model_name, *args)
+
+    monkeypatch.setattr(update, "pull_model", failing_pull)
+
+    results = update.pull_models(
+        [{"name": "broken:1b"}, {"name": "fine:1b"}], concurrency=2
+    )
+
+    assert results["broken:1b"]["status"] == "error: worker crashed"
+    assert results["fine:1b"]["status"] == "success"
+
+
+def test_order_models():
+    models = [
+        {"name": "a", "size": 300, "modified_at": "2024-05-01T10:00:00+00:00"},
+        {"name": "b", "size": 100, "modified_at": "2024-07-01T10:00:00+00:00"},
+        {"name": "c", "size": 200, "modified_at": "2024-06-01T10:00:00+00:00"},
+    ]
+
+    def names(order):
+        return [model["name"] for model in update.order_models(models, order)]
+
+    assert names("smallest") == ["b", "c", "a"]
+    assert names("recent") == ["b", "c", "a"]
+    assert names("default") == names("unknown") == ["a", "b", "c"]
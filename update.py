@@ -2,12 +2,21 @@
 A script to update all models based on a size filter
 """
 
+import argparse
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
 
+import httpx
 import ollama
 import requests
 
+import metrics
+from data_config import LIBRARY_JSON, USAGE_JSON, load_json_file
+from library import model_age_days
 from logger_config import setup_logger
+from registry import get_manifest, parse_model_name
 
 # Set up logger
 logger = setup_logger(__name__)
@@ -15,28 +24,65 @@ logger = setup_logger(__name__)
 # Define constants
 OLLAMA_API_URL = os.environ.get("OLLAMA_API_URL", "http://localhost:11434/api")
 MAX_MODEL_SIZE = int(os.environ.get("MAX_MODEL_SIZE", 10 * (1024**3)))  # Default: 10 GB
+MAX_PULL_BYTES = int(os.environ.get("MAX_PULL_BYTES", MAX_MODEL_SIZE))  # New blob bytes
+PULL_CONCURRENCY = int(os.environ.get("PULL_CONCURRENCY", 1))  # Default: one at a time
+PULL_TIMEOUT = float(os.environ.get("PULL_TIMEOUT", 0))  # Seconds per model, 0 = none
+PULL_ORDER = os.environ.get("PULL_ORDER", "default")  # default, smallest, recent
+SKIP_UP_TO_DATE = os.environ.get("SKIP_UP_TO_DATE", "false").lower() == "true"
+OLLAMA_MIRROR = os.environ.get("OLLAMA_MIRROR", "")  # host:port of mirror.py, optional
+DISK_BUDGET = int(os.environ.get("DISK_BUDGET", 0))  # Bytes for all models, 0 = none
+PINNED_MODELS = [
+    name.strip()
+    for name in os.environ.get("PINNED_MODELS", "").split(",")
+    if name.strip()
+]
+BUDGET_UNIT = 100 * (1024**2)  # Model sizes are rounded up to 100 MB for selection
+PULL_STREAM = os.environ.get("PULL_STREAM", "false").lower() == "true"
+PULL_STALL_TIMEOUT = float(os.environ.get("PULL_STALL_TIMEOUT", 60))  # Seconds
+PULL_RETRIES = int(os.environ.get("PULL_RETRIES", 1))  # Retries after a stall
+PULL_PROGRESS_INTERVAL = float(os.environ.get("PULL_PROGRESS_INTERVAL", 10))  # Seconds
 
 
-def get_models():
+def get_models(api_url=None, session=None):
     """
-    Get all the models currently installed in the Ollama server
+    Get all the models currently installed in the Ollama server, over
+    `session` if one is given so its connection is reused. Returns [] if the
+    server can't be reached.
     """
     try:
-        logger.debug("Fetching models from %s", OLLAMA_API_URL)
-        response = requests.get(f"{OLLAMA_API_URL}/tags", timeout=30)
-        if response.status_code == 200:
-            models_data = response.json()
-            logger.debug(
-                "Successfully fetched %d models", len(models_data.get("models", []))
-            )
-            return models_data.get("models", [])
-        logger.error("Failed to fetch models. Status code: %d", response.status_code)
-        return []
+        return fetch_models(api_url, session)
     except requests.RequestException as e:
         logger.error("Error fetching models: %s", e)
         return []
 
 
+def fetch_models(api_url=None, session=None):
+    """
+    Get all the models currently installed in the Ollama server, raising
+    requests.RequestException if they can't be listed
+    """
+    api_url = api_url or OLLAMA_API_URL
+    try:
+        logger.debug("Fetching models from %s", api_url)
+        with metrics.timer(
+            "ollama_mgmt_get_models_seconds", "Time to list the installed models"
+        ):
+            response = (session or requests).get(f"{api_url}/tags", timeout=30)
+        metrics.inc(
+            "ollama_mgmt_http_response_bytes_total",
+            len(response.content),
+            "Bytes received from the Ollama API",
+            endpoint="tags",
+        )
+        response.raise_for_status()
+        models_data = response.json()
+    except requests.RequestException:
+        metrics.inc("ollama_mgmt_get_models_errors_total", help_text="Failed listings")
+        raise
+    logger.debug("Successfully fetched %d models", len(models_data.get("models", [])))
+    return models_data.get("models", [])
+
+
 def select_models_by_size(model_list):
     """
     Select models based on size in bytes
@@ -44,34 +90,569 @@ def select_models_by_size(model_list):
     return [model for model in model_list if model["size"] < MAX_MODEL_SIZE]
 
 
-def pull_models(model_list):
+def score_models(model_list, library, usage):
+    """
+    Score each model by how much it's worth keeping: its usage count from
+    usage.json plus a recency score between 0 and 1 from library.json
+    """
+    now = time.time()
+    days_by_name = {entry.get("name"): model_age_days(entry, now) for entry in library}
+
+    scores = {}
+    for model in model_list:
+        base_name = model["name"].split(":")[0].split("/")[-1]
+        days_ago = days_by_name.get(base_name, float("inf"))
+        recency = 90 / (90 + days_ago)
+        scores[model["name"]] = usage.get(model["name"], 0) + recency
+    return scores
+
+
+def select_models_by_budget(model_list, budget=DISK_BUDGET, pinned=None):
+    """
+    Pick the set of models to keep that fits in `budget` bytes and has the
+    highest total score, always keeping pinned models.
+
+    Returns a (keep, remove) tuple of model lists.
+    """
+    pinned = PINNED_MODELS if pinned is None else pinned
+    library = load_json_file(LIBRARY_JSON, [])
+    usage = load_json_file(USAGE_JSON, {})
+    scores = score_models(model_list, library, usage)
+
+    keep = [model for model in model_list if model["name"] in pinned]
+    candidates = [model for model in model_list if model["name"] not in pinned]
+
+    remaining = budget - sum(model["size"] for model in keep)
+    if remaining < 0:
+        logger.warning(
+            "Pinned models need %d bytes, more than the %d byte budget",
+            budget - remaining,
+            budget,
+        )
+        remaining = 0
+
+    # 0/1 knapsack over sizes rounded up to BUDGET_UNIT so the budget holds
+    capacity = remaining // BUDGET_UNIT
+    units = [-(-model["size"] // BUDGET_UNIT) for model in candidates]
+    best = [0.0] * (capacity + 1)
+    chosen = [[] for _ in range(capacity + 1)]
+    for index, model in enumerate(candidates):
+        weight = units[index]
+        for space in range(capacity, weight - 1, -1):
+            value = best[space - weight] + scores[model["name"]]
+            if value > best[space]:
+                best[space] = value
+                chosen[space] = chosen[space - weight] + [index]
+
+    kept_indexes = set(chosen[capacity])
+    keep += [model for index, model in enumerate(candidates) if index in kept_indexes]
+    remove = [
+        model for index, model in enumerate(candidates) if index not in kept_indexes
+    ]
+    return keep, remove
+
+
+def select_outdated_models(model_list):
+    """
+    Select models whose installed digest differs from the registry manifest.
+    Models whose manifest can't be fetched are kept so they still get pulled.
+    """
+    outdated = []
+    with requests.Session() as session:
+        for model in model_list:
+            remote_digest, _ = get_manifest(model["name"], session=session)
+            local_digest = model.get("digest", "").removeprefix("sha256:")
+            if remote_digest and remote_digest == local_digest:
+                logger.debug("%s is up to date (%s)", model["name"], local_digest)
+                continue
+            outdated.append(model)
+    return outdated
+
+
+def blob_exists(digest, session):
+    """
+    Check whether the Ollama server already has a blob
     """
-    Pull models from the Ollama model registry
+    try:
+        response = session.head(f"{OLLAMA_API_URL}/blobs/{digest}", timeout=30)
+        return response.status_code == 200
+    except requests.RequestException as e:
+        logger.error("Error checking blob %s: %s", digest, e)
+        return False
+
+
+def plan_pulls(model_list, max_new_bytes=MAX_PULL_BYTES):
     """
-    for model_item in model_list:
-        model_name = model_item["name"]
+    Work out which blobs each model would download and group the pulls into
+    batches in which no two models fetch the same new blob, so that shared
+    layers are downloaded once and are already local for later batches.
 
-        try:
-            response = ollama.pull(model_name)
-            if response.get("status") == "success":
-                print(f"- {model_name} pulled successfully")
+    Models that would download more than `max_new_bytes` are left out.
+
+    Returns a (batches, up_to_date, too_large) tuple where each batch is a
+    list of plan entries with the model, its new blobs and their total bytes.
+    """
+    entries = []
+    up_to_date = []
+    too_large = []
+    local_blobs = {}
+
+    with requests.Session() as session:
+        for model in model_list:
+            remote_digest, manifest = get_manifest(model["name"], session=session)
+            if manifest is None:
+                # Can't tell what it needs, so pull it without sharing blobs
+                entries.append({"model": model, "new_blobs": {}, "new_bytes": None})
+                continue
+
+            local_digest = model.get("digest", "").removeprefix("sha256:")
+            if remote_digest == local_digest:
+                up_to_date.append(model)
+                continue
+
+            blobs = list(manifest.get("layers", []))
+            if manifest.get("config"):
+                blobs.append(manifest["config"])
+
+            new_blobs = {}
+            for blob in blobs:
+                digest = blob["digest"]
+                if digest not in local_blobs:
+                    local_blobs[digest] = blob_exists(digest, session)
+                if not local_blobs[digest]:
+                    new_blobs[digest] = blob.get("size", 0)
+
+            entry = {
+                "model": model,
+                "new_blobs": new_blobs,
+                "new_bytes": sum(new_blobs.values()),
+            }
+            if entry["new_bytes"] > max_new_bytes:
+                too_large.append(entry)
+            else:
+                entries.append(entry)
+
+    batches = []
+    while entries:
+        batch = []
+        claimed = set()
+        deferred = []
+        for entry in entries:
+            if claimed.intersection(entry["new_blobs"]):
+                deferred.append(entry)
             else:
+                batch.append(entry)
+                claimed.update(entry["new_blobs"])
+        batches.append(batch)
+        entries = deferred
+
+    # Blobs fetched by an earlier batch are local by the time later ones run
+    fetched = set()
+    for batch in batches:
+        for entry in batch:
+            entry["new_blobs"] = {
+                digest: size
+                for digest, size in entry["new_blobs"].items()
+                if digest not in fetched
+            }
+            if entry["new_bytes"] is not None:
+                entry["new_bytes"] = sum(entry["new_blobs"].values())
+        for entry in batch:
+            fetched.update(entry["new_blobs"])
+
+    return batches, up_to_date, too_large
+
+
+def print_plan(batches, up_to_date, too_large):
+    """
+    Print a pull plan produced by plan_pulls()
+    """
+    total_bytes = 0
+    model_bytes = 0
+    print("\nPull plan:")
+    for number, batch in enumerate(batches, 1):
+        print(f"Batch {number}:")
+        for entry in batch:
+            model = entry["model"]
+            model_bytes += model["size"]
+            if entry["new_bytes"] is None:
+                print(f"- {model['name']}: manifest unavailable, size unknown")
+                continue
+            total_bytes += entry["new_bytes"]
+            print(
+                f"- {model['name']}: {len(entry['new_blobs'])} new blobs, "
+                f"{format_bytes(entry['new_bytes'])}"
+            )
+
+    if up_to_date:
+        print("Up to date:")
+        for model in up_to_date:
+            print(f"- {model['name']}")
+
+    if too_large:
+        print(f"Over {format_bytes(MAX_PULL_BYTES)} of new blobs:")
+        for entry in too_large:
+            print(f"- {entry['model']['name']}: {format_bytes(entry['new_bytes'])}")
+
+    print(
+        f"\nTotal new bytes: {total_bytes} ({format_bytes(total_bytes)}) "
+        f"for models totalling {format_bytes(model_bytes)}"
+    )
+
+
+def order_models(model_list, order=PULL_ORDER):
+    """
+    Order models for pulling: "smallest" first, most "recent"ly modified
+    first, or leave them in the order returned by the server
+    """
+    if order == "smallest":
+        return sorted(model_list, key=lambda model: model["size"])
+    if order == "recent":
+        return sorted(
+            model_list,
+            key=lambda model: datetime.fromisoformat(model["modified_at"]),
+            reverse=True,
+        )
+    if order != "default":
+        logger.warning("Unknown pull order '%s', keeping server order", order)
+    return list(model_list)
+
+
+def format_bytes(num_bytes):
+    """
+    Format a byte count as a human readable MB/GB string
+    """
+    if num_bytes >= 1024**3:
+        return f"{num_bytes / (1024 ** 3):.2f} GB"
+    return f"{num_bytes / (1024 ** 2):.1f} MB"
+
+
+def stream_pull(client, model_name, layers, timeout=None):
+    """
+    Consume the progress events of one pull attempt, recording per-layer byte
+    counts in `layers`, and return the final status.
+
+    Returns "stalled" when no progress is seen for PULL_STALL_TIMEOUT seconds
+    (0 disables the check) and "timed out" when the attempt runs past
+    `timeout` seconds.
+    """
+    start = last_progress = last_report = time.monotonic()
+    last_report_bytes = 0
+    status = "unknown"
+
+    progress = client.pull(model_name, insecure=bool(OLLAMA_MIRROR), stream=True)
+    try:
+        for event in progress:
+            now = time.monotonic()
+            if event.get("status") and event.get("status") != status:
+                status = event.get("status")
+                last_progress = now
+
+            digest = event.get("digest")
+            completed = event.get("completed")
+            if digest and completed is not None:
+                layer = layers.setdefault(
+                    digest,
+                    {
+                        "initial": completed,
+                        "completed": completed,
+                        "total": event.get("total") or 0,
+                        "started": now,
+                        "updated": now,
+                    },
+                )
+                if completed > layer["completed"]:
+                    layer["completed"] = completed
+                    layer["updated"] = now
+                    last_progress = now
+
+            if PULL_STALL_TIMEOUT and now - last_progress > PULL_STALL_TIMEOUT:
+                return "stalled"
+            if timeout and now - start > timeout:
+                return "timed out"
+
+            if now - last_report >= PULL_PROGRESS_INTERVAL:
+                # Report the rate since the last report so slowdowns show up
+                transferred = sum(
+                    layer["completed"] - layer["initial"] for layer in layers.values()
+                )
+                interval_rate = (transferred - last_report_bytes) / (now - last_report)
                 print(
-                    f"- {model_name} pull status: {response.get('status', 'unknown')}"
+                    f"  {model_name}: {status}, {format_bytes(transferred)} so far, "
+                    f"{format_bytes(interval_rate)}/s"
                 )
+                last_report = now
+                last_report_bytes = transferred
+    except httpx.TimeoutException:
+        # The client read timeout is the stall timeout, so no events at all
+        return "stalled"
+    finally:
+        progress.close()
 
-        except (ollama.ResponseError, requests.RequestException) as e:
-            print(f"Error pulling model {model_name}: {e}")
+    return status
 
 
-if __name__ == "__main__":
+def pull_model_streaming(client, model_name, timeout=None):
+    """
+    Pull a single model while tracking throughput, retrying stalled pulls up
+    to PULL_RETRIES times. Ollama resumes partial layers on retry.
+    """
+    start = time.monotonic()
+    layers = {}
+
+    for attempt in range(PULL_RETRIES + 1):
+        remaining = timeout - (time.monotonic() - start) if timeout else None
+        status = stream_pull(client, model_name, layers, timeout=remaining)
+        if status != "stalled" or attempt == PULL_RETRIES:
+            break
+        logger.warning(
+            "%s stalled, retrying (%d/%d)", model_name, attempt + 1, PULL_RETRIES
+        )
+
+    elapsed = time.monotonic() - start
+    transferred = sum(
+        layer["completed"] - layer["initial"] for layer in layers.values()
+    )
+    result = {
+        "status": status,
+        "seconds": elapsed,
+        "bytes": transferred,
+        "rate": transferred / elapsed if elapsed else 0,
+        "slowest_layer": None,
+    }
+
+    # Find the layer that took the longest per byte actually downloaded
+    slowest_rate = None
+    for digest, layer in layers.items():
+        layer_bytes = layer["completed"] - layer["initial"]
+        layer_time = layer["updated"] - layer["started"]
+        if layer_bytes and layer_time:
+            layer_rate = layer_bytes / layer_time
+            if slowest_rate is None or layer_rate < slowest_rate:
+                slowest_rate = layer_rate
+                result["slowest_layer"] = {"digest": digest, "rate": layer_rate}
+
+    return result
+
+
+def mirror_name(model_name):
+    """
+    Name a model so that Ollama pulls it through the OLLAMA_MIRROR mirror
+    """
+    _, namespace, model, tag = parse_model_name(model_name)
+    return f"{OLLAMA_MIRROR}/{namespace}/{model}:{tag}"
+
+
+def pull_model(client, model_name, stream=False, timeout=None):
+    """
+    Pull a single model and return a result dict with its status and timing
+    """
+    start = time.monotonic()
+    pull_name = mirror_name(model_name) if OLLAMA_MIRROR else model_name
+    try:
+        if stream:
+            result = pull_model_streaming(client, pull_name, timeout=timeout)
+        else:
+            response = client.pull(pull_name, insecure=bool(OLLAMA_MIRROR))
+            result = {"status": response.get("status", "unknown")}
+
+        if OLLAMA_MIRROR and result["status"] == "success":
+            # Ollama keeps the mirror's name, so hand the model back its own.
+            # The blobs are shared, so this is only a manifest copy.
+            client.copy(pull_name, model_name)
+            client.delete(pull_name)
+    except httpx.TimeoutException:
+        result = {"status": "timed out"}
+    except (
+        ollama.ResponseError,
+        requests.RequestException,
+        httpx.HTTPError,
+        ConnectionError,
+    ) as e:
+        # The streaming generator raises httpx errors without wrapping them
+        result = {"status": f"error: {e}"}
+    result["seconds"] = time.monotonic() - start
+    record_pull(result)
+    return result
+
+
+def record_pull(result):
+    """
+    Count a finished pull and its time and bytes in the shared metrics
+    """
+    # Error messages would make a label value per failure, so group them
+    status = "error" if result["status"].startswith("error") else result["status"]
+    metrics.inc("ollama_mgmt_pulls_total", help_text="Model pulls", status=status)
+    metrics.observe(
+        "ollama_mgmt_pull_seconds",
+        result["seconds"],
+        "Time per model pull",
+        status=status,
+    )
+    if "bytes" in result:
+        metrics.inc(
+            "ollama_mgmt_pull_bytes_total",
+            result["bytes"],
+            "Bytes downloaded by streamed pulls",
+        )
+
+
+def make_client(host=None, timeout=PULL_TIMEOUT, stream=PULL_STREAM):
+    """
+    Create an Ollama client whose read timeout suits the pull mode
+    """
+    if stream:
+        # Progress events keep arriving while a pull is healthy, so the client
+        # read timeout catches pulls that stop sending anything at all
+        return ollama.Client(host=host, timeout=PULL_STALL_TIMEOUT or None)
+    # Without streaming the server only answers once the pull is done, so the
+    # client read timeout doubles as a per-model time limit
+    return ollama.Client(host=host, timeout=timeout or None)
+
+
+def pull_models(
+    model_list,
+    concurrency=PULL_CONCURRENCY,
+    timeout=PULL_TIMEOUT,
+    stream=PULL_STREAM,
+):
+    """
+    Pull models from the Ollama model registry using a bounded worker pool
+    """
+    client = make_client(timeout=timeout, stream=stream)
+    results = {}
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = {
+            executor.submit(
+                pull_model, client, model_item["name"], stream, timeout or None
+            ): model_item["name"]
+            for model_item in model_list
+        }
+        for future in as_completed(futures):
+            model_name = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                # Keep one failed worker from aborting the rest of the report
+                logger.error("Unexpected error pulling %s: %s", model_name, e)
+                result = {"status": f"error: {e}", "seconds": 0.0}
+            results[model_name] = result
+
+            details = f"{result['seconds']:.1f}s"
+            if "bytes" in result:
+                details += (
+                    f", {format_bytes(result['bytes'])} at "
+                    f"{format_bytes(result['rate'])}/s"
+                )
+            if result["status"] == "success":
+                print(f"- {model_name} pulled successfully ({details})")
+            else:
+                print(f"- {model_name} pull status: {result['status']} ({details})")
+            if result.get("slowest_layer"):
+                layer = result["slowest_layer"]
+                logger.info(
+                    "%s slowest layer %s at %s/s",
+                    model_name,
+                    layer["digest"],
+                    format_bytes(layer["rate"]),
+                )
+    wall_time = time.monotonic() - start
+
+    summed_time = sum(result["seconds"] for result in results.values())
+    print(
+        f"\nPulled {len(results)} models with {max(1, concurrency)} workers "
+        f"in {wall_time:.1f}s wall time ({summed_time:.1f}s summed per-model time, "
+        f"{summed_time / wall_time if wall_time else 0:.2f}x overlap)"
+    )
+    if stream:
+        total_bytes = sum(result.get("bytes", 0) for result in results.values())
+        print(
+            f"Transferred {format_bytes(total_bytes)} at "
+            f"{format_bytes(total_bytes / wall_time if wall_time else 0)}/s overall"
+        )
+
+    return results
+
+
+def parse_args(args=None):
+    """
+    Parse command line arguments
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="show the blobs each model would download without pulling anything",
+    )
+    parser.add_argument(
+        "--batched",
+        action="store_true",
+        help="pull in planned batches so shared layers are downloaded once",
+    )
+    return parser.parse_args(args)
+
+
+def main(argv=None):
+    """
+    Main function to orchestrate the script execution.
+    """
+    args = parse_args(argv)
+    metrics.start()
+    try:
+        update(args)
+    finally:
+        metrics.dump()
+
+
+def update(args):
+    """
+    List, select and pull the models
+    """
     models = get_models()
     print(f"Found {len(models)} models...")
 
-    selected_models = select_models_by_size(models)
-    print(f"Found {len(selected_models)} models smaller than {MAX_MODEL_SIZE} Bytes...")
+    if args.plan or args.batched:
+        # The plan filters on the bytes a pull would actually download rather
+        # than on the total model size
+        batches, up_to_date, too_large = plan_pulls(order_models(models))
+        print_plan(batches, up_to_date, too_large)
+        if args.batched:
+            for batch in batches:
+                pull_models([entry["model"] for entry in batch])
+        return
 
-    pull_models(selected_models)
+    if DISK_BUDGET:
+        selected_models, removed_models = select_models_by_budget(models)
+        print(
+            f"Keeping {len(selected_models)} models within the "
+            f"{format_bytes(DISK_BUDGET)} disk budget..."
+        )
+    else:
+        selected_models = select_models_by_size(models)
+        print(
+            f"Found {len(selected_models)} models smaller than {MAX_MODEL_SIZE} Bytes..."
+        )
+
+    if SKIP_UP_TO_DATE:
+        outdated_models = select_outdated_models(selected_models)
+        print(
+            f"Skipping {len(selected_models) - len(outdated_models)} models "
+            "that match the registry digest..."
+        )
+    else:
+        outdated_models = selected_models
+
+    pull_models(order_models(outdated_models))
+
+    if DISK_BUDGET:
+        if removed_models:
+            print("\nModels to remove to stay under the disk budget:")
+
+            for model in removed_models:
+                print(f"- {model['name']} (Size: {model['size'] / (1024 ** 3):.2f} GB)")
+        return
 
     skipped_models = [model for model in models if model not in selected_models]
 
@@ -80,3 +661,7 @@ if __name__ == "__main__":
 
         for model in skipped_models:
             print(f"- {model['name']} (Size: {model['size'] / (1024 ** 3):.2f} GB)")
+
+
+if __name__ == "__main__":
+    main()